@@ -0,0 +1,73 @@
+#!/usr/bin/env python3
+"""
+Bulk-ingest a directory or zip archive of documents.
+Stores, extracts, embeds and indexes every .pdf, .txt and .docx file, with
+chunks from many documents sharing encoder batches and index writes.
+
+Run from the repository root while the API server is stopped (both write
+the same document and index stores):
+    python -m backend.bulk_ingest path/to/documents
+    python -m backend.bulk_ingest path/to/documents.zip
+"""
+
+import argparse
+import asyncio
+import sys
+from pathlib import Path
+
+from backend.services.bulk_ingest_service import BulkIngestService
+from backend.services.document_service import DocumentService
+from backend.services.embedding_service import EmbeddingService
+from backend.services.ingestion_pipeline import IngestionPipeline
+from backend.services.ingestion_queue import IngestionQueue
+
+
+def print_progress(report):
+    done = report["files_processed"] + report["files_failed"]
+    print(
+        f"\r{done}/{report['total_files']} files, {report['chunks_indexed']} chunks indexed, "
+        f"{report['files_failed']} failed, {report['elapsed_seconds']:.0f}s",
+        end="",
+        flush=True
+    )
+
+
+async def run(path: Path) -> int:
+    document_service = DocumentService()
+    embedding_service = EmbeddingService()
+    pipeline = IngestionPipeline(document_service, embedding_service)
+    # Only records jobs; if this run dies, the API server's workers finish them on start
+    ingestion_queue = IngestionQueue(processor=None)
+    bulk_ingest_service = BulkIngestService(document_service, embedding_service, pipeline, ingestion_queue)
+
+    try:
+        sources, close = bulk_ingest_service.open_source(path)
+        print(f"Found {len(sources)} documents in {path}")
+        try:
+            report = await bulk_ingest_service.ingest(sources, on_progress=print_progress)
+        finally:
+            close()
+    finally:
+        ingestion_queue.close()
+        document_service.close()
+        embedding_service.close()
+
+    print()
+    print(f"Processed {report['files_processed']} files ({report['duplicates']} duplicates), "
+          f"{report['chunks_indexed']} chunks in {report['elapsed_seconds']:.1f}s")
+    if report["errors"]:
+        print(f"{len(report['errors'])} files failed:")
+        for error in report["errors"]:
+            print(f"  {error['file']}: {error['error']}")
+    return 1 if report["errors"] else 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("path", type=Path, help="Directory or zip archive to ingest")
+    args = parser.parse_args()
+    sys.exit(asyncio.run(run(args.path)))
+
+
+if __name__ == "__main__":
+    main()
@@ -3,7 +3,7 @@ from pathlib import Path
 
 # API Configuration
 GROK_API_KEY = os.getenv("GROK_API_KEY", "your-grok-api-key-here")
-GROK_BASE_URL = "https://api.x.ai/v1"
+GROK_BASE_URL = os.getenv("GROK_BASE_URL", "https://api.x.ai/v1")
 
 # File paths
 DATA_DIR = Path("data")
@@ -13,9 +13,19 @@ EMBEDDINGS_DIR = DATA_DIR / "embeddings"
 
 # Document processing settings
 MAX_FILE_SIZE = 10 * 1024 * 1024  # 10MB
+UPLOAD_BLOCK_SIZE = 1024 * 1024  # Uploads are streamed to disk in 1MB blocks
 ALLOWED_EXTENSIONS = ['.pdf', '.txt', '.docx']
 CHUNK_SIZE = 1000
 CHUNK_OVERLAP = 100
+# "tokens" packs sentences up to the embedding model's token limit, so no chunk
+# text is truncated away by the encoder; "characters" splits on CHUNK_SIZE
+CHUNKING_STRATEGY = os.getenv("CHUNKING_STRATEGY", "tokens")
+# Token budget per chunk; 0 uses the model's max sequence length minus special tokens
+CHUNK_MAX_TOKENS = int(os.getenv("CHUNK_MAX_TOKENS", "0"))
+CHUNK_OVERLAP_TOKENS = int(os.getenv("CHUNK_OVERLAP_TOKENS", "32"))
+# What to do with a byte-identical re-upload: "reference" links it to the
+# already-processed document, "reject" refuses it
+DUPLICATE_UPLOAD_POLICY = os.getenv("DUPLICATE_UPLOAD_POLICY", "reference")
 
 # Embedding settings
 EMBEDDING_MODEL = "all-MiniLM-L6-v2"
@@ -28,6 +38,135 @@ GROK_MODEL = "grok-beta"
 MAX_TOKENS = 1000
 TEMPERATURE = 0.7
 
+# Chat history settings
+# "jsonl" keeps an append-only log file per session; "sqlite" keeps all sessions
+# in one indexed SQLite database (better with very many sessions)
+HISTORY_BACKEND = os.getenv("HISTORY_BACKEND", "jsonl")
+HISTORY_DB_FILE = CHAT_HISTORY_DIR / "history.db"
+# "always" fsyncs every append, "interval" fsyncs pending appends every
+# HISTORY_FSYNC_INTERVAL_SECONDS, "never" leaves it to the OS
+HISTORY_FSYNC_POLICY = os.getenv("HISTORY_FSYNC_POLICY", "interval")
+HISTORY_FSYNC_INTERVAL_SECONDS = float(os.getenv("HISTORY_FSYNC_INTERVAL_SECONDS", "1"))
+# How often cleared sessions are compacted
+HISTORY_COMPACT_INTERVAL_SECONDS = float(os.getenv("HISTORY_COMPACT_INTERVAL_SECONDS", "300"))
+
+# Chat history cache settings
+# Recent messages of up to HISTORY_CACHE_SESSIONS hot sessions are kept in memory
+HISTORY_CACHE_SESSIONS = int(os.getenv("HISTORY_CACHE_SESSIONS", "1000"))
+HISTORY_CACHE_MESSAGES = int(os.getenv("HISTORY_CACHE_MESSAGES", "50"))
+# Durability window: new messages reach the history store in batches at most this
+# many seconds later (sooner once HISTORY_FLUSH_BATCH_SIZE are waiting); 0 writes through
+HISTORY_WRITE_BEHIND_SECONDS = float(os.getenv("HISTORY_WRITE_BEHIND_SECONDS", "1"))
+HISTORY_FLUSH_BATCH_SIZE = int(os.getenv("HISTORY_FLUSH_BATCH_SIZE", "1000"))
+HISTORY_FLUSH_ON_SHUTDOWN = os.getenv("HISTORY_FLUSH_ON_SHUTDOWN", "true").lower() == "true"
+
+# LLM client settings
+# One pooled HTTP client is shared by all chat requests
+LLM_MAX_CONNECTIONS = int(os.getenv("LLM_MAX_CONNECTIONS", "100"))
+LLM_MAX_KEEPALIVE_CONNECTIONS = int(os.getenv("LLM_MAX_KEEPALIVE_CONNECTIONS", "20"))
+LLM_CONNECT_TIMEOUT_SECONDS = float(os.getenv("LLM_CONNECT_TIMEOUT_SECONDS", "5"))
+# Timeout for each HTTP attempt (connect, and each read while streaming)
+LLM_REQUEST_TIMEOUT_SECONDS = float(os.getenv("LLM_REQUEST_TIMEOUT_SECONDS", "60"))
+LLM_MAX_RETRIES = int(os.getenv("LLM_MAX_RETRIES", "1"))
+# Hard deadline for a whole completion, retries and streaming included
+LLM_DEADLINE_SECONDS = float(os.getenv("LLM_DEADLINE_SECONDS", "90"))
+# After this many consecutive LLM failures, chat answers with the fallback
+# response for CIRCUIT_BREAKER_RESET_SECONDS before trying the LLM again
+CIRCUIT_BREAKER_FAILURE_THRESHOLD = int(os.getenv("CIRCUIT_BREAKER_FAILURE_THRESHOLD", "5"))
+CIRCUIT_BREAKER_RESET_SECONDS = float(os.getenv("CIRCUIT_BREAKER_RESET_SECONDS", "30"))
+
+# Encoder pool settings
+ENCODER_WORKERS = int(os.getenv("ENCODER_WORKERS", "2"))
+ENCODER_TORCH_THREADS = int(os.getenv("ENCODER_TORCH_THREADS", "0"))  # 0 keeps torch's default
+ENCODER_USE_PROCESSES = os.getenv("ENCODER_USE_PROCESSES", "false").lower() == "true"
+
+# Query micro-batching settings
+QUERY_BATCH_WINDOW_MS = float(os.getenv("QUERY_BATCH_WINDOW_MS", "5"))
+QUERY_BATCH_MAX_SIZE = int(os.getenv("QUERY_BATCH_MAX_SIZE", "32"))
+
+# Query embedding cache settings
+QUERY_CACHE_SIZE = int(os.getenv("QUERY_CACHE_SIZE", "10000"))
+QUERY_CACHE_TTL_SECONDS = int(os.getenv("QUERY_CACHE_TTL_SECONDS", "86400"))
+QUERY_CACHE_PERSIST = os.getenv("QUERY_CACHE_PERSIST", "true").lower() == "true"
+QUERY_CACHE_FILE = EMBEDDINGS_DIR / "query_cache.npz"
+
+# Chunk embedding cache settings
+CHUNK_CACHE_ENABLED = os.getenv("CHUNK_CACHE_ENABLED", "true").lower() == "true"
+CHUNK_CACHE_FILE = EMBEDDINGS_DIR / "chunk_cache.db"
+
+# Vector store settings
+# "chroma" uses ChromaDB's HNSW index; "mmap" does exact search over a memory-mapped matrix
+VECTOR_STORE = os.getenv("VECTOR_STORE", "chroma")
+MMAP_STORE_DIR = EMBEDDINGS_DIR / "mmap"
+
+# Embedding storage settings
+# "float32" searches the vector store directly; "int8" or "float16" scan a
+# quantized copy of the vectors and re-score the best candidates in float32
+EMBEDDING_STORAGE = os.getenv("EMBEDDING_STORAGE", "float32")
+QUANTIZED_INDEX_DIR = EMBEDDINGS_DIR / "quantized"
+RESCORE_CANDIDATES_FACTOR = int(os.getenv("RESCORE_CANDIDATES_FACTOR", "10"))
+
+# Hybrid retrieval settings
+# When true, vector search is fused with BM25 keyword search via reciprocal rank fusion
+HYBRID_SEARCH = os.getenv("HYBRID_SEARCH", "true").lower() == "true"
+BM25_INDEX_FILE = EMBEDDINGS_DIR / "bm25.db"
+HYBRID_CANDIDATES_FACTOR = 4
+RRF_K = 60
+# Query terms found in more than this fraction of chunks are skipped (stopwords)
+BM25_MAX_DF_RATIO = float(os.getenv("BM25_MAX_DF_RATIO", "0.5"))
+
+# Search request limits
+MAX_SEARCH_TOP_K = int(os.getenv("MAX_SEARCH_TOP_K", "50"))
+MAX_BATCH_QUERIES = int(os.getenv("MAX_BATCH_QUERIES", "64"))
+
+# Ingestion job queue settings
+JOBS_DB_FILE = DATA_DIR / "jobs.db"
+INGESTION_WORKERS = int(os.getenv("INGESTION_WORKERS", "2"))
+INGESTION_MAX_ATTEMPTS = int(os.getenv("INGESTION_MAX_ATTEMPTS", "3"))
+INGESTION_RETRY_BACKOFF_SECONDS = float(os.getenv("INGESTION_RETRY_BACKOFF_SECONDS", "5"))
+
+# Streaming ingestion pipeline settings
+# Chunks per embed/index batch; each batch is searchable as soon as it is indexed
+PIPELINE_BATCH_SIZE = int(os.getenv("PIPELINE_BATCH_SIZE", "64"))
+# Batches buffered between pipeline stages before the upstream stage waits
+PIPELINE_QUEUE_SIZE = int(os.getenv("PIPELINE_QUEUE_SIZE", "2"))
+
+# Index write settings
+# New chunks are written in batches of at most this many rows (fewer if the vector
+# store's own limit is lower); the index lock is released between batches so
+# concurrent searches are not starved by a large ingest
+INDEX_WRITE_BATCH_SIZE = int(os.getenv("INDEX_WRITE_BATCH_SIZE", "1000"))
+# Encoded batches the ingestion pipeline and bulk ingest let wait for an index
+# write before encoding pauses (encoding overlaps with writing up to this many batches)
+INDEX_WRITE_QUEUE_SIZE = int(os.getenv("INDEX_WRITE_QUEUE_SIZE", "2"))
+
+# Bulk ingestion settings
+# Server-side directories (and uploaded archives) for /bulk-ingest live under here
+BULK_INGEST_ROOT = DATA_DIR / "imports"
+BULK_MAX_ARCHIVE_SIZE = int(os.getenv("BULK_MAX_ARCHIVE_SIZE", str(1024 * 1024 * 1024)))  # 1GB
+BULK_EXTRACT_CONCURRENCY = int(os.getenv("BULK_EXTRACT_CONCURRENCY", str(os.cpu_count() or 2)))
+# Chunks from many documents are pooled into encoder batches and index writes of these sizes
+BULK_ENCODE_BATCH_SIZE = int(os.getenv("BULK_ENCODE_BATCH_SIZE", "512"))
+BULK_INDEX_BATCH_SIZE = int(os.getenv("BULK_INDEX_BATCH_SIZE", "4096"))
+# Reports of finished bulk jobs kept for GET /bulk-ingest/{id}
+BULK_MAX_REPORTS = int(os.getenv("BULK_MAX_REPORTS", "100"))
+
+# Extracted text cache settings
+# Parsed PDF/DOCX text is kept (gzip-compressed) per content hash and extractor version
+TEXT_CACHE_ENABLED = os.getenv("TEXT_CACHE_ENABLED", "true").lower() == "true"
+TEXT_CACHE_DIR = DATA_DIR / "text_cache"
+
+# PDF extraction settings
+# PDFs with at least this many pages are extracted page-parallel in a process pool
+PDF_PARALLEL_MIN_PAGES = int(os.getenv("PDF_PARALLEL_MIN_PAGES", "20"))
+PDF_EXTRACT_WORKERS = int(os.getenv("PDF_EXTRACT_WORKERS", str(os.cpu_count() or 2)))
+PDF_PAGES_PER_TASK = int(os.getenv("PDF_PAGES_PER_TASK", "16"))
+
+# Startup settings
+# When true, the embedding model and ChromaDB load in the background after the server
+# starts (or on first use, if that comes sooner) instead of before it accepts requests
+LAZY_LOAD_MODELS = os.getenv("LAZY_LOAD_MODELS", "false").lower() == "true"
+
 # Create directories if they don't exist
 for directory in [DATA_DIR, DOCUMENTS_DIR, CHAT_HISTORY_DIR, EMBEDDINGS_DIR]:
     directory.mkdir(parents=True, exist_ok=True)
\ No newline at end of file
@@ -1,21 +1,57 @@
-from fastapi import FastAPI, File, UploadFile, HTTPException, Depends, BackgroundTasks
+from fastapi import FastAPI, File, Form, UploadFile, HTTPException, Depends, BackgroundTasks, Request, Query
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
-from pydantic import BaseModel
+from fastapi.responses import JSONResponse, StreamingResponse
+from pydantic import BaseModel, Field
 from typing import List, Optional, Dict, Any
 import os
 import json
 import uuid
 from datetime import datetime
 import asyncio
+from contextlib import asynccontextmanager
 from pathlib import Path
 
+from backend import config
 from backend.models.chat_model import ChatMessage, ChatResponse, DocumentInfo
-from backend.services.document_service import DocumentService
+from backend.services.document_service import (
+    DocumentService, DuplicateDocumentError, FileTooLargeError, SharedDocumentError
+)
+from backend.services.bulk_ingest_service import BulkIngestService
 from backend.services.chat_service import ChatService
 from backend.services.embedding_service import EmbeddingService
+from backend.services.ingestion_pipeline import IngestionPipeline
+from backend.services.ingestion_queue import IngestionQueue
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Load models at startup (in the background if loading is deferred), and release them on shutdown"""
+    warm_up_task = None
+    if config.LAZY_LOAD_MODELS:
+        # The server answers at once; /ready reports 200 when the models are loaded
+        warm_up_task = asyncio.create_task(warm_up_embedding_service())
+    else:
+        await embedding_service.initialize()
+    await ingestion_queue.start()
+    await chat_service.start()
+    yield
+    if warm_up_task is not None:
+        warm_up_task.cancel()
+        await asyncio.gather(warm_up_task, return_exceptions=True)
+    await bulk_ingest_service.stop()
+    await ingestion_queue.stop()
+    ingestion_queue.close()
+    document_service.close()
+    embedding_service.close()
+    await chat_service.close()
 
-app = FastAPI(title="RAG ChatBot API", version="1.0.0")
+async def warm_up_embedding_service():
+    """Load the models in the background; a failure leaves loading to the first request"""
+    try:
+        await embedding_service.initialize()
+    except Exception as e:
+        print(f"Error loading models in the background: {str(e)}")
+
+app = FastAPI(title="RAG ChatBot API", version="1.0.0", lifespan=lifespan)
 
 # CORS middleware
 app.add_middleware(
@@ -26,30 +62,119 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# Initialize services
+@app.middleware("http")
+async def reject_oversized_uploads(request: Request, call_next):
+    """Reject uploads whose declared size is over the limit before the body is read"""
+    is_document_upload = request.url.path == "/upload-document" or (
+        request.method == "PUT" and request.url.path.startswith("/documents/")
+    )
+    if is_document_upload:
+        content_length = request.headers.get("content-length")
+        # Allow some headroom for the multipart envelope
+        if content_length and content_length.isdigit() and int(content_length) > config.MAX_FILE_SIZE + 64 * 1024:
+            return JSONResponse(
+                status_code=413,
+                content={"detail": f"File exceeds the maximum size of {config.MAX_FILE_SIZE // (1024 * 1024)}MB"}
+            )
+    return await call_next(request)
+
+# Initialize services (cheap; the embedding model loads in the lifespan or on first use)
 document_service = DocumentService()
 embedding_service = EmbeddingService()
 chat_service = ChatService()
+ingestion_pipeline = IngestionPipeline(document_service, embedding_service)
 
 # Ensure directories exist
 Path("data/documents").mkdir(parents=True, exist_ok=True)
 Path("data/chat_history").mkdir(parents=True, exist_ok=True)
 Path("data/embeddings").mkdir(parents=True, exist_ok=True)
 
-class ChatRequest(BaseModel):
+class SearchFilters(BaseModel):
+    # Optional filters restricting retrieval to matching documents
+    document_ids: Optional[List[str]] = None
+    filename: Optional[str] = None
+    uploaded_after: Optional[datetime] = None
+    uploaded_before: Optional[datetime] = None
+
+class ChatRequest(SearchFilters):
     message: str
     session_id: str
 
+class SearchRequest(SearchFilters):
+    query: str
+    top_k: int = Field(5, ge=1, le=config.MAX_SEARCH_TOP_K)
+
+class BatchSearchRequest(SearchFilters):
+    queries: List[str] = Field(..., max_length=config.MAX_BATCH_QUERIES)
+    top_k: int = Field(5, ge=1, le=config.MAX_SEARCH_TOP_K)
+
+class SearchResult(BaseModel):
+    chunk_id: str
+    content: str
+    metadata: Dict[str, Any]
+    score: float
+    distance: Optional[float] = None
+
+class SearchResponse(BaseModel):
+    query: str
+    results: List[SearchResult]
+
+class BatchSearchResponse(BaseModel):
+    results: List[SearchResponse]
+
 class DocumentUploadResponse(BaseModel):
     message: str
     document_id: str
     filename: str
+    job_id: Optional[str] = None
+
+class DocumentUpdateResponse(BaseModel):
+    message: str
+    document_id: str
+    filename: str
+    revision: int
+    chunk_count: int
+    added: int
+    removed: int
+    unchanged: int
+
+class BulkIngestStatus(BaseModel):
+    id: str
+    status: str
+    total_files: int
+    files_processed: int
+    files_failed: int
+    duplicates: int
+    chunks_indexed: int
+    elapsed_seconds: float
+    errors: List[Dict[str, Optional[str]]]
+
+class ChatSessionSummary(BaseModel):
+    session_id: str
+    message_count: int
+    created_at: datetime
+    last_activity: datetime
+
+class ChatSessionList(BaseModel):
+    total: int
+    offset: int
+    limit: int
+    sessions: List[ChatSessionSummary]
+
+class JobStatus(BaseModel):
+    id: str
+    document_id: str
+    filename: str
+    status: str
+    stage: str
+    attempts: int
+    error: Optional[str] = None
+    progress: Optional[Dict[str, Any]] = None
+    created_at: datetime
+    updated_at: datetime
 
 @app.post("/upload-document", response_model=DocumentUploadResponse)
-async def upload_document(
-    file: UploadFile = File(...),
-    background_tasks: BackgroundTasks = BackgroundTasks()
-):
+async def upload_document(file: UploadFile = File(...)):
     """Upload and process a document"""
     try:
         # Validate file type
@@ -67,44 +192,190 @@ async def upload_document(
         # Save file
         file_path = await document_service.save_document(file, doc_id)
         
-        # Process document in background
-        background_tasks.add_task(
-            process_document_background, 
-            file_path, 
-            doc_id, 
-            file.filename
-        )
+        # Byte-identical re-uploads reuse the existing processed document
+        existing_id = document_service.get_canonical_id(doc_id)
+        if existing_id != doc_id:
+            return DocumentUploadResponse(
+                message=f"Document already uploaded. Linked to existing document {existing_id}.",
+                document_id=doc_id,
+                filename=file.filename
+            )
+        
+        # Queue the document for processing by the ingestion workers
+        job_id = await asyncio.to_thread(ingestion_queue.enqueue, doc_id, file_path, file.filename)
+        document_service.set_job_id(doc_id, job_id)
         
         return DocumentUploadResponse(
             message="Document uploaded successfully. Processing in background.",
             document_id=doc_id,
-            filename=file.filename
+            filename=file.filename,
+            job_id=job_id
         )
     
+    except HTTPException:
+        raise
+    except FileTooLargeError as e:
+        raise HTTPException(status_code=413, detail=str(e))
+    except DuplicateDocumentError as e:
+        raise HTTPException(status_code=409, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
-async def process_document_background(file_path: str, doc_id: str, filename: str):
-    """Background task to process document"""
+# Updates and re-indexing are applied one at a time so revisions can't interleave
+document_update_lock = asyncio.Lock()
+
+async def process_document_job(job: Dict[str, Any], set_stage):
+    """Ingestion job: index a new document, or re-index a processed one in place"""
+    doc_id = job["document_id"]
+    filename = job["filename"]
+    
+    if doc_id not in document_service.metadata:
+        print(f"Skipping job for deleted document {filename}")
+        return
+    
     try:
-        # Extract text from document
-        text_chunks = await document_service.extract_text(file_path)
+        if document_service.metadata[doc_id].get("processed"):
+            await reindex_document(doc_id, set_stage)
+            return
         
-        # Create embeddings
-        await embedding_service.create_embeddings(text_chunks, doc_id, filename)
+        # Replace anything a previous, interrupted attempt indexed
+        set_stage("extracting")
+        await embedding_service.delete_document_embeddings(doc_id)
         
+        # Stream the document through extract -> chunk -> embed -> index in batches
+        file_path = document_service.metadata[doc_id]["file_path"]
+        chunk_count = await ingestion_pipeline.run(doc_id, file_path, filename, progress=set_stage)
+        
+        document_service.mark_processed(doc_id, chunk_count)
         print(f"Document {filename} processed successfully")
     except Exception as e:
         print(f"Error processing document {filename}: {str(e)}")
+        raise
+
+async def reindex_document(doc_id: str, set_stage):
+    """Re-chunk a processed document and swap in only the chunks that changed.
+    
+    The old chunks stay searchable until the new ones replace them. The
+    document's current file is used, since a PUT may have replaced the one
+    the job was queued with.
+    """
+    async with document_update_lock:
+        metadata = document_service.metadata.get(doc_id)
+        if metadata is None:
+            return
+        
+        set_stage("extracting")
+        chunks = await ingestion_pipeline.chunk_document(metadata["file_path"])
+        generation = metadata.get("index_generation", 0) + 1
+        set_stage("indexing")
+        await embedding_service.update_document_chunks(
+            chunks, doc_id, metadata["filename"], metadata.get("revision", 0), generation
+        )
+        document_service.mark_processed(doc_id, len(chunks), index_generation=generation)
+
+async def cleanup_failed_job(job: Dict[str, Any]):
+    """A document that failed for good must not stay partly searchable"""
+    doc_id = job["document_id"]
+    metadata = document_service.metadata.get(doc_id)
+    # A failed re-index leaves the old chunks in place, so a processed document is intact
+    if metadata is not None and not metadata.get("processed"):
+        await embedding_service.delete_document_embeddings(doc_id)
+        print(f"Removed partial embeddings of failed document {job['filename']}")
+
+ingestion_queue = IngestionQueue(process_document_job, on_failed=cleanup_failed_job)
+bulk_ingest_service = BulkIngestService(document_service, embedding_service, ingestion_pipeline, ingestion_queue)
+
+def resolve_search_filters(filters: SearchFilters) -> Optional[List[str]]:
+    """Resolve request filters to document IDs (None means no filtering)"""
+    return document_service.resolve_filters(
+        document_ids=filters.document_ids,
+        filename=filters.filename,
+        uploaded_after=filters.uploaded_after,
+        uploaded_before=filters.uploaded_before
+    )
+
+def to_search_response(query: str, docs: List[Dict[str, Any]]) -> SearchResponse:
+    """Convert search hits to the API response model"""
+    return SearchResponse(
+        query=query,
+        results=[
+            SearchResult(
+                chunk_id=doc["id"],
+                content=doc["content"],
+                metadata=doc["metadata"],
+                score=doc["score"],
+                distance=doc.get("distance")
+            )
+            for doc in docs
+        ]
+    )
+
+@app.post("/bulk-ingest", response_model=BulkIngestStatus)
+async def bulk_ingest(file: Optional[UploadFile] = File(None), directory: Optional[str] = Form(None)):
+    """Ingest a zip archive, or a directory under the server's import root, in the background"""
+    if (file is None) == (directory is None):
+        raise HTTPException(status_code=400, detail="Provide either a zip archive or a directory")
+    
+    try:
+        if file is not None:
+            archive_path = await bulk_ingest_service.save_archive(file)
+            try:
+                sources, close = bulk_ingest_service.open_source(archive_path)
+            except BaseException:
+                archive_path.unlink(missing_ok=True)
+                raise
+            
+            def cleanup():
+                close()
+                archive_path.unlink(missing_ok=True)
+        else:
+            sources, cleanup = bulk_ingest_service.open_source(bulk_ingest_service.resolve_directory(directory))
+        
+        return bulk_ingest_service.start(sources, cleanup)
+    
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.get("/bulk-ingest/{job_id}", response_model=BulkIngestStatus)
+async def get_bulk_ingest(job_id: str):
+    """Get the progress report and per-file errors of a bulk ingest"""
+    report = bulk_ingest_service.get_job(job_id)
+    if report is None:
+        raise HTTPException(status_code=404, detail="Bulk ingest job not found")
+    return report
+
+@app.get("/jobs/{job_id}", response_model=JobStatus)
+async def get_job(job_id: str):
+    """Get the status of an ingestion job"""
+    job = await asyncio.to_thread(ingestion_queue.get_job, job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Job {job_id} not found")
+    
+    return JobStatus(
+        id=job["id"],
+        document_id=job["document_id"],
+        filename=job["filename"],
+        status=job["status"],
+        stage=job["stage"],
+        attempts=job["attempts"],
+        error=job["error"],
+        progress=job["progress"],
+        created_at=datetime.fromtimestamp(job["created_at"]),
+        updated_at=datetime.fromtimestamp(job["updated_at"])
+    )
 
 @app.post("/chat", response_model=ChatResponse)
 async def chat(request: ChatRequest):
     """Chat with the RAG system"""
     try:
         # Get relevant documents
+        document_ids = resolve_search_filters(request)
         relevant_docs = await embedding_service.search_similar_documents(
             request.message, 
-            top_k=3
+            top_k=3,
+            document_ids=document_ids
         )
         
         # Generate response using Grok
@@ -119,6 +390,69 @@ async def chat(request: ChatRequest):
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.post("/chat/stream")
+async def chat_stream(request: ChatRequest):
+    """Chat with the RAG system, streaming the answer as server-sent events.
+    
+    Events: "sources" (retrieved documents), one "token" per piece of the
+    answer as it arrives, and "done" with timings in its metadata.
+    """
+    try:
+        # Retrieve before streaming starts, so retrieval errors are a normal 500
+        document_ids = resolve_search_filters(request)
+        relevant_docs = await embedding_service.search_similar_documents(
+            request.message,
+            top_k=3,
+            document_ids=document_ids
+        )
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+    
+    async def events():
+        try:
+            async for event in chat_service.stream_response(request.message, relevant_docs, request.session_id):
+                name = event.pop("event")
+                yield f"event: {name}\ndata: {json.dumps(event)}\n\n"
+        except Exception as e:
+            # Headers are already sent, so report the failure in the stream
+            yield f"event: error\ndata: {json.dumps({'detail': str(e)})}\n\n"
+    
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+@app.post("/search", response_model=SearchResponse)
+async def search(request: SearchRequest):
+    """Retrieve relevant chunks for a query without calling the LLM"""
+    try:
+        docs = await embedding_service.search_similar_documents(
+            request.query,
+            top_k=request.top_k,
+            document_ids=resolve_search_filters(request)
+        )
+        return to_search_response(request.query, docs)
+    
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.post("/search/batch", response_model=BatchSearchResponse)
+async def search_batch(request: BatchSearchRequest):
+    """Retrieve relevant chunks for many queries with one encode and one index query"""
+    try:
+        results = await embedding_service.search_batch(
+            request.queries,
+            top_k=request.top_k,
+            document_ids=resolve_search_filters(request)
+        )
+        return BatchSearchResponse(
+            results=[to_search_response(query, docs) for query, docs in zip(request.queries, results)]
+        )
+    
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
 @app.get("/chat-history/{session_id}", response_model=List[ChatMessage])
 async def get_chat_history(session_id: str):
     """Get chat history for a session"""
@@ -137,6 +471,24 @@ async def clear_chat_history(session_id: str):
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.get("/chat-sessions", response_model=ChatSessionList)
+async def list_chat_sessions(offset: int = Query(0, ge=0), limit: int = Query(100, ge=1, le=1000)):
+    """List chat sessions, most recently active first, with message counts"""
+    try:
+        total, sessions = await chat_service.list_sessions(offset, limit)
+        return ChatSessionList(total=total, offset=offset, limit=limit, sessions=sessions)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.delete("/chat-sessions")
+async def delete_old_chat_sessions(before: datetime):
+    """Delete chat sessions with no activity since the given time"""
+    try:
+        deleted = await chat_service.delete_sessions_before(before)
+        return {"message": f"Deleted {deleted} chat sessions", "deleted": deleted}
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
 @app.get("/documents", response_model=List[DocumentInfo])
 async def get_documents():
     """Get list of uploaded documents"""
@@ -150,17 +502,112 @@ async def get_documents():
 async def delete_document(doc_id: str):
     """Delete a document and its embeddings"""
     try:
-        await document_service.delete_document(doc_id)
-        await embedding_service.delete_document_embeddings(doc_id)
+        # Embeddings go only when no duplicate still references the content
+        for removed_id in await document_service.delete_document(doc_id):
+            await embedding_service.delete_document_embeddings(removed_id)
         return {"message": "Document deleted successfully"}
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.post("/documents/reindex")
+async def reindex_documents():
+    """Re-chunk and re-embed every document, e.g. after changing chunking settings or the model.
+    
+    Parsed text comes from the extracted-text cache, so documents aren't re-parsed.
+    Only chunks that changed are re-embedded, and documents stay searchable meanwhile.
+    """
+    try:
+        jobs = 0
+        for doc_id, metadata in list(document_service.metadata.items()):
+            # Duplicates share the embeddings of the document they reference;
+            # unprocessed documents already have a job on the way
+            if metadata.get("duplicate_of") or not metadata.get("processed"):
+                continue
+            job_id = await asyncio.to_thread(
+                ingestion_queue.enqueue, doc_id, metadata["file_path"], metadata["filename"]
+            )
+            document_service.set_job_id(doc_id, job_id)
+            jobs += 1
+        return {"message": f"Queued {jobs} documents for re-indexing", "jobs": jobs}
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.put("/documents/{doc_id}", response_model=DocumentUpdateResponse)
+async def update_document(doc_id: str, file: UploadFile = File(...)):
+    """Replace a document with a new version, re-embedding only the chunks that changed"""
+    try:
+        file_ext = Path(file.filename).suffix.lower()
+        if file_ext not in config.ALLOWED_EXTENSIONS:
+            raise HTTPException(
+                status_code=400,
+                detail=f"File type {file_ext} not supported. Allowed types: {config.ALLOWED_EXTENSIONS}"
+            )
+        
+        metadata = document_service.metadata.get(doc_id)
+        if metadata is None or metadata.get("deleted"):
+            raise HTTPException(status_code=404, detail="Document not found")
+        if not document_service.metadata[document_service.get_canonical_id(doc_id)]["processed"]:
+            raise HTTPException(status_code=409, detail="Document is still being processed")
+        
+        async with document_update_lock:
+            revision = await document_service.save_revision(doc_id, file)
+            try:
+                chunks = await ingestion_pipeline.chunk_document(revision["file_path"])
+                counts = await embedding_service.update_document_chunks(
+                    chunks, doc_id, file.filename, revision["revision"]
+                )
+            except BaseException:
+                document_service.discard_revision(revision)
+                raise
+            
+            for removed_id in document_service.commit_revision(revision, len(chunks)):
+                await embedding_service.delete_document_embeddings(removed_id)
+        
+        return DocumentUpdateResponse(
+            message="Document updated successfully",
+            document_id=doc_id,
+            filename=file.filename,
+            revision=revision["revision"],
+            chunk_count=len(chunks),
+            **counts
+        )
+    
+    except HTTPException:
+        raise
+    except FileTooLargeError as e:
+        raise HTTPException(status_code=413, detail=str(e))
+    except SharedDocumentError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
 @app.get("/health")
 async def health_check():
     """Health check endpoint"""
     return {"status": "healthy", "timestamp": datetime.now().isoformat()}
 
+@app.get("/ready")
+async def readiness_check():
+    """Readiness check: models are loaded and the service can answer queries"""
+    if not embedding_service.is_ready:
+        return JSONResponse(
+            status_code=503,
+            content={"status": "not ready", "lazy_loading": config.LAZY_LOAD_MODELS}
+        )
+    return {"status": "ready", "timestamp": datetime.now().isoformat()}
+
+@app.get("/metrics")
+async def get_metrics():
+    """Runtime metrics for the embedding, ingestion and chat pipelines"""
+    return {
+        **embedding_service.get_stats(),
+        "llm": chat_service.get_stats(),
+        "chat_history": await asyncio.to_thread(chat_service.history_store.get_stats),
+        "chat_history_cache": chat_service.history_cache.get_stats(),
+        "ingestion": await asyncio.to_thread(ingestion_queue.get_stats),
+        "text_cache": document_service.text_cache.get_stats() if document_service.text_cache else None
+    }
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run(app, host="0.0.0.0", port=8000)
\ No newline at end of file
@@ -0,0 +1,274 @@
+import math
+import re
+import sqlite3
+import threading
+from collections import Counter, defaultdict
+from pathlib import Path
+from typing import List, Dict, Any, Optional, Tuple, Iterator
+
+from backend import config
+
+# Words plus identifiers joined by - . / _ (part numbers, error codes, clause IDs)
+TOKEN_PATTERN = re.compile(r"\w+(?:[-./]\w+)*")
+
+
+def tokenize(text: str) -> List[str]:
+    """Lowercased tokens; compound identifiers are also indexed by their parts"""
+    tokens = []
+    for match in TOKEN_PATTERN.finditer(text.lower()):
+        token = match.group()
+        tokens.append(token)
+        if any(sep in token for sep in "-./"):
+            tokens.extend(part for part in re.split(r"[-./]", token) if part)
+    return tokens
+
+
+def reciprocal_rank_fusion(rankings: List[List[str]], k: int = 60) -> List[Tuple[str, float]]:
+    """Fuse ranked id lists with reciprocal rank fusion, best first"""
+    scores: Dict[str, float] = defaultdict(float)
+    for ranking in rankings:
+        for rank, chunk_id in enumerate(ranking):
+            scores[chunk_id] += 1.0 / (k + rank + 1)
+    return sorted(scores.items(), key=lambda item: item[1], reverse=True)
+
+
+class BM25Index:
+    """On-disk inverted index over chunk text with BM25 scoring.
+
+    Postings live in a clustered SQLite table keyed by (term, chunk_id), so a
+    query only reads the postings of its own terms. Document frequencies are
+    kept in their own table, updated as chunks come and go. Terms in more
+    than ``max_df_ratio`` of all chunks (stopwords, boilerplate) carry almost
+    no weight and have the longest posting lists, so queries skip them unless
+    a query has nothing else. Chunks can be added and removed per document as
+    uploads and deletes happen.
+    """
+
+    def __init__(
+        self,
+        db_path: Path = config.BM25_INDEX_FILE,
+        k1: float = 1.2,
+        b: float = 0.75,
+        max_df_ratio: float = config.BM25_MAX_DF_RATIO
+    ):
+        self.db_path = Path(db_path)
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self.k1 = k1
+        self.b = b
+        self.max_df_ratio = max_df_ratio
+
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(self.db_path), check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS chunks (
+                chunk_id TEXT PRIMARY KEY,
+                document_id TEXT NOT NULL,
+                length INTEGER NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS idx_chunks_document_id ON chunks(document_id);
+            CREATE TABLE IF NOT EXISTS postings (
+                term TEXT NOT NULL,
+                chunk_id TEXT NOT NULL,
+                tf INTEGER NOT NULL,
+                PRIMARY KEY (term, chunk_id)
+            ) WITHOUT ROWID;
+            CREATE INDEX IF NOT EXISTS idx_postings_chunk_id ON postings(chunk_id);
+            CREATE TEMP TABLE IF NOT EXISTS filter_documents (document_id TEXT PRIMARY KEY);
+            """
+        )
+        has_terms = self._conn.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'terms'"
+        ).fetchone()
+        if not has_terms:
+            # Indexes built before document frequencies were stored get them once
+            self._conn.executescript(
+                """
+                CREATE TABLE terms (term TEXT PRIMARY KEY, df INTEGER NOT NULL) WITHOUT ROWID;
+                INSERT INTO terms (term, df) SELECT term, COUNT(*) FROM postings GROUP BY term;
+                """
+            )
+        self._conn.commit()
+
+        # Corpus statistics, kept in memory and updated incrementally
+        self._chunk_count, total_length = self._conn.execute(
+            "SELECT COUNT(*), COALESCE(SUM(length), 0) FROM chunks"
+        ).fetchone()
+        self._total_length = total_length
+
+    def __len__(self) -> int:
+        return self._chunk_count
+
+    def add(self, chunk_ids: List[str], texts: List[str], document_ids: List[str]):
+        """Index chunks (replacing any existing chunks with the same ids)"""
+        chunk_rows = []
+        posting_rows = []
+        for chunk_id, text, document_id in zip(chunk_ids, texts, document_ids):
+            counts = Counter(tokenize(text))
+            chunk_rows.append((chunk_id, document_id, sum(counts.values())))
+            posting_rows.extend((term, chunk_id, tf) for term, tf in counts.items())
+
+        with self._lock:
+            self._delete_chunks(chunk_ids)
+            self._conn.executemany("INSERT INTO chunks (chunk_id, document_id, length) VALUES (?, ?, ?)", chunk_rows)
+            self._conn.executemany("INSERT INTO postings (term, chunk_id, tf) VALUES (?, ?, ?)", posting_rows)
+            self._conn.executemany(
+                "INSERT INTO terms (term, df) VALUES (?, ?) ON CONFLICT(term) DO UPDATE SET df = df + excluded.df",
+                Counter(term for term, _, _ in posting_rows).items()
+            )
+            self._conn.commit()
+            self._chunk_count += len(chunk_rows)
+            self._total_length += sum(length for _, _, length in chunk_rows)
+
+    def _delete_chunks(self, chunk_ids: List[str]):
+        for start in range(0, len(chunk_ids), 500):
+            batch = chunk_ids[start:start + 500]
+            placeholders = ",".join("?" * len(batch))
+            count, length = self._conn.execute(
+                f"SELECT COUNT(*), COALESCE(SUM(length), 0) FROM chunks WHERE chunk_id IN ({placeholders})",
+                batch
+            ).fetchone()
+            if not count:
+                continue
+            term_counts = self._conn.execute(
+                f"SELECT term, COUNT(*) FROM postings WHERE chunk_id IN ({placeholders}) GROUP BY term",
+                batch
+            ).fetchall()
+            self._conn.executemany(
+                "UPDATE terms SET df = df - ? WHERE term = ?",
+                [(n, term) for term, n in term_counts]
+            )
+            self._conn.execute("DELETE FROM terms WHERE df <= 0")
+            self._conn.execute(f"DELETE FROM postings WHERE chunk_id IN ({placeholders})", batch)
+            self._conn.execute(f"DELETE FROM chunks WHERE chunk_id IN ({placeholders})", batch)
+            self._chunk_count -= count
+            self._total_length -= length
+
+    def delete(self, chunk_ids: List[str]):
+        """Remove chunks from the index"""
+        with self._lock:
+            self._delete_chunks(chunk_ids)
+            self._conn.commit()
+
+    def delete_document(self, document_id: str):
+        """Remove all chunks of a document from the index"""
+        with self._lock:
+            chunk_ids = [chunk_id for (chunk_id,) in self._conn.execute(
+                "SELECT chunk_id FROM chunks WHERE document_id = ?", (document_id,)
+            )]
+            self._delete_chunks(chunk_ids)
+            self._conn.commit()
+
+    def iter_ids(self, page_size: int = 50000) -> Iterator[List[str]]:
+        """Yield the indexed chunk ids in pages"""
+        last_id = ""
+        while True:
+            with self._lock:
+                ids = [chunk_id for (chunk_id,) in self._conn.execute(
+                    "SELECT chunk_id FROM chunks WHERE chunk_id > ? ORDER BY chunk_id LIMIT ?",
+                    (last_id, page_size)
+                )]
+            if not ids:
+                return
+            last_id = ids[-1]
+            yield ids
+
+    def search(self, query: str, top_k: int, document_ids: Optional[List[str]] = None) -> List[Tuple[str, float]]:
+        """Return up to top_k (chunk_id, BM25 score) pairs, best first.
+
+        ``document_ids`` restricts matching to chunks of those documents.
+        """
+        return self.search_batch([query], top_k, document_ids)[0]
+
+    def search_batch(
+        self,
+        queries: List[str],
+        top_k: int,
+        document_ids: Optional[List[str]] = None
+    ) -> List[List[Tuple[str, float]]]:
+        """Search for many queries at once; each distinct term's postings are read once"""
+        query_terms = [set(tokenize(query)) for query in queries]
+        all_terms = list(set().union(*query_terms))
+        if not all_terms or document_ids == []:
+            return [[] for _ in queries]
+
+        # term -> (idf, [(chunk_id, term weight)])
+        postings: Dict[str, Tuple[float, List[Tuple[str, float]]]] = {}
+        with self._lock:
+            if not self._chunk_count:
+                return [[] for _ in queries]
+            avg_length = self._total_length / self._chunk_count
+
+            # Document frequency is corpus-wide so filtered scores stay comparable
+            dfs: Dict[str, int] = {}
+            for start in range(0, len(all_terms), 500):
+                batch = all_terms[start:start + 500]
+                dfs.update(self._conn.execute(
+                    f"SELECT term, df FROM terms WHERE term IN ({','.join('?' * len(batch))})", batch
+                ).fetchall())
+
+            # Skip near-ubiquitous terms, but never all of a query's terms
+            max_df = self.max_df_ratio * self._chunk_count
+            scored_terms = []
+            for terms in query_terms:
+                known = [term for term in terms if term in dfs]
+                kept = [term for term in known if dfs[term] <= max_df]
+                scored_terms.append(kept or sorted(known, key=dfs.get)[:1])
+
+            document_join = ""
+            if document_ids is not None:
+                # A temp table keeps large filters clear of SQLite's parameter limit
+                self._conn.execute("DELETE FROM filter_documents")
+                self._conn.executemany(
+                    "INSERT OR IGNORE INTO filter_documents (document_id) VALUES (?)",
+                    ((document_id,) for document_id in document_ids)
+                )
+                document_join = " JOIN filter_documents f ON f.document_id = c.document_id"
+
+            for term in set().union(*scored_terms):
+                rows = self._conn.execute(
+                    "SELECT p.chunk_id, p.tf, c.length FROM postings p "
+                    "JOIN chunks c ON c.chunk_id = p.chunk_id" + document_join + " WHERE p.term = ?",
+                    (term,)
+                ).fetchall()
+
+                df = dfs[term]
+                idf = math.log(1 + (self._chunk_count - df + 0.5) / (df + 0.5))
+                postings[term] = (idf, [
+                    (chunk_id, tf * (self.k1 + 1) / (tf + self.k1 * (1 - self.b + self.b * length / avg_length)))
+                    for chunk_id, tf, length in rows
+                ])
+
+        results = []
+        for terms in scored_terms:
+            scores: Dict[str, float] = defaultdict(float)
+            for term in terms:
+                idf, weights = postings[term]
+                for chunk_id, weight in weights:
+                    scores[chunk_id] += idf * weight
+            results.append(sorted(scores.items(), key=lambda item: item[1], reverse=True)[:top_k])
+        return results
+
+    def clear(self):
+        """Drop the whole index"""
+        with self._lock:
+            self._conn.execute("DELETE FROM postings")
+            self._conn.execute("DELETE FROM terms")
+            self._conn.execute("DELETE FROM chunks")
+            self._conn.commit()
+            self._chunk_count = 0
+            self._total_length = 0
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get index size metrics"""
+        return {
+            "chunks": self._chunk_count,
+            "avg_chunk_length": (self._total_length / self._chunk_count) if self._chunk_count else 0.0
+        }
+
+    def close(self):
+        """Close the SQLite connection"""
+        with self._lock:
+            self._conn.close()
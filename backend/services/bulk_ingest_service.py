@@ -0,0 +1,367 @@
+import asyncio
+import time
+import uuid
+import zipfile
+from pathlib import Path
+from typing import List, Dict, Any, Optional, Tuple, BinaryIO, Callable
+
+import numpy as np
+from fastapi import UploadFile
+
+from backend import config
+
+# (file name, function opening the file's bytes)
+Source = Tuple[str, Callable[[], BinaryIO]]
+
+ProgressCallback = Callable[[Dict[str, Any]], None]
+
+
+class BulkIngestService:
+    """Ingests many documents at once from a directory or zip archive.
+
+    Files are stored and extracted concurrently. Their chunks are then pooled
+    across documents, so the encoder gets large batches and the indexes are
+    written in large batches instead of once per (often small) document.
+
+    Every stored document gets a running job in the ingestion queue, closed
+    when the document is indexed or fails. If the process dies mid-ingest,
+    the queue re-runs those jobs on its next start, so no document is left
+    half-indexed.
+    """
+
+    def __init__(
+        self,
+        document_service,
+        embedding_service,
+        pipeline,
+        ingestion_queue,
+        extract_concurrency: int = config.BULK_EXTRACT_CONCURRENCY,
+        encode_batch_size: int = config.BULK_ENCODE_BATCH_SIZE,
+        index_batch_size: int = config.BULK_INDEX_BATCH_SIZE,
+        max_reports: int = config.BULK_MAX_REPORTS
+    ):
+        self.document_service = document_service
+        self.embedding_service = embedding_service
+        self.pipeline = pipeline
+        self.ingestion_queue = ingestion_queue
+        self.extract_concurrency = max(1, extract_concurrency)
+        self.encode_batch_size = max(1, encode_batch_size)
+        self.index_batch_size = max(self.encode_batch_size, index_batch_size)
+        self.max_reports = max(1, max_reports)
+
+        # Reports of bulk jobs started through the API, by job id (oldest first)
+        self.jobs: Dict[str, Dict[str, Any]] = {}
+        self._tasks: Dict[str, asyncio.Task] = {}
+
+    def resolve_directory(self, directory: str) -> Path:
+        """Resolve a server-side directory, which must be inside BULK_INGEST_ROOT"""
+        root = Path(config.BULK_INGEST_ROOT).resolve()
+        path = (root / directory).resolve()
+        if path != root and root not in path.parents:
+            raise ValueError(f"Directory must be inside {root}")
+        if not path.is_dir():
+            raise ValueError(f"Directory {directory} not found")
+        return path
+
+    def open_source(self, path: Path) -> Tuple[List[Source], Callable[[], None]]:
+        """List the supported files in a directory or zip archive.
+
+        Returns the sources and a function releasing the archive.
+        """
+        path = Path(path)
+        if path.is_dir():
+            files = sorted(
+                file for file in path.rglob("*")
+                if file.is_file() and file.suffix.lower() in config.ALLOWED_EXTENSIONS
+            )
+            sources = [
+                (str(file.relative_to(path)), lambda file=file: open(file, 'rb'))
+                for file in files
+            ]
+            return sources, lambda: None
+
+        if zipfile.is_zipfile(path):
+            archive = zipfile.ZipFile(path)
+            members = [
+                member for member in archive.infolist()
+                if not member.is_dir() and Path(member.filename).suffix.lower() in config.ALLOWED_EXTENSIONS
+            ]
+            sources = [
+                (member.filename, lambda member=member: archive.open(member))
+                for member in members
+            ]
+            return sources, archive.close
+
+        raise ValueError(f"{path} is not a directory or zip archive")
+
+    async def save_archive(self, file: UploadFile) -> Path:
+        """Stream an uploaded zip archive to the imports directory"""
+        upload_dir = Path(config.BULK_INGEST_ROOT) / ".uploads"
+        upload_dir.mkdir(parents=True, exist_ok=True)
+        path = upload_dir / f"{uuid.uuid4()}.zip"
+
+        size = 0
+        try:
+            with open(path, 'wb') as f:
+                while True:
+                    block = await file.read(config.UPLOAD_BLOCK_SIZE)
+                    if not block:
+                        break
+                    size += len(block)
+                    if size > config.BULK_MAX_ARCHIVE_SIZE:
+                        raise ValueError(
+                            f"Archive exceeds the maximum size of {config.BULK_MAX_ARCHIVE_SIZE // (1024 * 1024)}MB"
+                        )
+                    await asyncio.to_thread(f.write, block)
+        except BaseException:
+            path.unlink(missing_ok=True)
+            raise
+        return path
+
+    def start(self, sources: List[Source], cleanup: Callable[[], None]) -> Dict[str, Any]:
+        """Run a bulk ingest in the background and return its (live) report"""
+        report = self._new_report(len(sources))
+        self.jobs[report["id"]] = report
+        self._evict_reports()
+
+        async def run():
+            try:
+                await self.ingest(sources, report)
+            except Exception as e:
+                # Already recorded in the report
+                print(f"Bulk ingest {report['id']} failed: {str(e)}")
+            finally:
+                cleanup()
+                self._tasks.pop(report["id"], None)
+
+        self._tasks[report["id"]] = asyncio.create_task(run())
+        return report
+
+    def _evict_reports(self):
+        """Drop the oldest finished reports beyond ``max_reports``"""
+        finished = [job_id for job_id, report in self.jobs.items() if report["status"] != "running"]
+        for job_id in finished[:max(0, len(self.jobs) - self.max_reports)]:
+            del self.jobs[job_id]
+
+    def get_job(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """Get a bulk job's report, or None if it doesn't exist"""
+        return self.jobs.get(job_id)
+
+    async def stop(self):
+        """Cancel running bulk jobs"""
+        tasks = list(self._tasks.values())
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    @staticmethod
+    def _new_report(total_files: int) -> Dict[str, Any]:
+        return {
+            "id": str(uuid.uuid4()),
+            "status": "running",
+            "total_files": total_files,
+            "files_processed": 0,
+            "files_failed": 0,
+            "duplicates": 0,
+            "chunks_indexed": 0,
+            "elapsed_seconds": 0.0,
+            "errors": []
+        }
+
+    async def ingest(
+        self,
+        sources: List[Source],
+        report: Optional[Dict[str, Any]] = None,
+        on_progress: Optional[ProgressCallback] = None
+    ) -> Dict[str, Any]:
+        """Store, extract, encode and index every source; returns the final report"""
+        report = report if report is not None else self._new_report(len(sources))
+        started_at = time.perf_counter()
+
+        def progress():
+            report["elapsed_seconds"] = round(time.perf_counter() - started_at, 3)
+            if on_progress is not None:
+                on_progress(report)
+
+        # Extracted documents, and encoded batches, waiting for the next stage
+        doc_queue: asyncio.Queue = asyncio.Queue(maxsize=self.extract_concurrency)
+        write_queue: asyncio.Queue = asyncio.Queue(maxsize=max(1, config.INDEX_WRITE_QUEUE_SIZE))
+
+        filenames: Dict[str, str] = {}
+        chunk_counts: Dict[str, int] = {}
+        remaining: Dict[str, int] = {}
+        job_ids: Dict[str, str] = {}
+        ingesting: set = set()
+        failed: set = set()
+        # In-batch duplicates of documents still being ingested, by canonical id;
+        # they only count as processed once their canonical document is
+        waiting_duplicates: Dict[str, List[Tuple[str, str]]] = {}
+
+        async def fail(doc_id: Optional[str], filename: str, error: Exception):
+            if doc_id is not None:
+                if doc_id in failed:
+                    return
+                failed.add(doc_id)
+                ingesting.discard(doc_id)
+                # Duplicates linked to this document would point at nothing
+                for duplicate_id, duplicate_name in waiting_duplicates.pop(doc_id, []):
+                    try:
+                        await self.document_service.delete_document(duplicate_id)
+                    except ValueError:
+                        pass
+                    report["duplicates"] -= 1
+                    report["files_failed"] += 1
+                    report["errors"].append({"file": duplicate_name, "error": f"Duplicate of failed file {filename}"})
+                # Don't leave a half-ingested document behind
+                await self.embedding_service.delete_document_embeddings(doc_id)
+                try:
+                    await self.document_service.delete_document(doc_id)
+                except ValueError:
+                    pass
+                if doc_id in job_ids:
+                    await asyncio.to_thread(self.ingestion_queue.close_job, job_ids[doc_id], error)
+            report["files_failed"] += 1
+            report["errors"].append({"file": filename, "error": str(error)})
+            print(f"Bulk ingest failed for {filename}: {error}")
+            progress()
+
+        async def finish_document(doc_id: str):
+            ingesting.discard(doc_id)
+            self.document_service.mark_processed(doc_id, chunk_counts[doc_id])
+            await asyncio.to_thread(self.ingestion_queue.close_job, job_ids[doc_id])
+            report["files_processed"] += 1 + len(waiting_duplicates.pop(doc_id, []))
+            progress()
+
+        async def load(filename: str, opener: Callable[[], BinaryIO]):
+            doc_id = None
+            try:
+                stream = await asyncio.to_thread(opener)
+                try:
+                    doc_id = str(uuid.uuid4())
+                    file_path = await self.document_service.save_document_from_stream(stream, filename, doc_id)
+                finally:
+                    stream.close()
+
+                canonical_id = self.document_service.get_canonical_id(doc_id)
+                if canonical_id != doc_id:
+                    # Byte-identical to a stored document: nothing to index
+                    report["duplicates"] += 1
+                    if canonical_id in ingesting:
+                        waiting_duplicates.setdefault(canonical_id, []).append((doc_id, filename))
+                    else:
+                        report["files_processed"] += 1
+                        progress()
+                    return
+
+                ingesting.add(doc_id)
+                job_ids[doc_id] = await asyncio.to_thread(
+                    self.ingestion_queue.open_job, doc_id, file_path, filename
+                )
+                self.document_service.set_job_id(doc_id, job_ids[doc_id])
+                chunks = await self.pipeline.chunk_document(file_path, parallel=True)
+            except Exception as e:
+                await fail(doc_id if doc_id in self.document_service.metadata else None, filename, e)
+                return
+            # Waiting here keeps at most extract_concurrency extracted documents in flight
+            await doc_queue.put((doc_id, filename, chunks))
+
+        async def produce():
+            pending = iter(sources)
+
+            async def extractor():
+                for filename, opener in pending:
+                    await load(filename, opener)
+
+            await asyncio.gather(*[extractor() for _ in range(self.extract_concurrency)])
+            await doc_queue.put(None)
+
+        async def encode_batch(entries: List[Tuple[str, str, int, str]]):
+            try:
+                embeddings = await self.embedding_service.embed_chunks([text for _, _, _, text in entries])
+            except Exception as e:
+                for doc_id in dict.fromkeys(doc_id for doc_id, _, _, _ in entries):
+                    await fail(doc_id, filenames[doc_id], e)
+                return
+            await write_queue.put((entries, embeddings))
+
+        async def encode():
+            # Chunks from many documents share each encoder batch
+            pending: List[Tuple[str, str, int, str]] = []
+            while (item := await doc_queue.get()) is not None:
+                doc_id, filename, chunks = item
+                filenames[doc_id] = filename
+                chunk_counts[doc_id] = len(chunks)
+                if not chunks:
+                    await finish_document(doc_id)
+                    continue
+
+                remaining[doc_id] = len(chunks)
+                pending.extend((doc_id, filename, i, chunk) for i, chunk in enumerate(chunks))
+                while len(pending) >= self.encode_batch_size:
+                    await encode_batch(pending[:self.encode_batch_size])
+                    pending = pending[self.encode_batch_size:]
+            if pending:
+                await encode_batch(pending)
+            await write_queue.put(None)
+
+        async def write(entries, embeddings):
+            live = [i for i, (doc_id, _, _, _) in enumerate(entries) if doc_id not in failed]
+            entries = [entries[i] for i in live]
+            try:
+                await self.embedding_service.index_chunk_batch(entries, embeddings[live])
+            except Exception as e:
+                for doc_id in dict.fromkeys(doc_id for doc_id, _, _, _ in entries):
+                    await fail(doc_id, filenames[doc_id], e)
+                return
+
+            # A document that failed while the write was in flight got its chunks
+            # deleted before they landed; delete them again
+            for doc_id in dict.fromkeys(doc_id for doc_id, _, _, _ in entries):
+                if doc_id in failed:
+                    await self.embedding_service.delete_document_embeddings(doc_id)
+            entries = [entry for entry in entries if entry[0] not in failed]
+
+            report["chunks_indexed"] += len(entries)
+            for doc_id, _, _, _ in entries:
+                remaining[doc_id] -= 1
+                if not remaining[doc_id] and doc_id not in failed:
+                    await finish_document(doc_id)
+            progress()
+
+        async def index():
+            # Encoded batches are merged into large index writes
+            buffered: List[Tuple[list, np.ndarray]] = []
+            buffered_count = 0
+            while (item := await write_queue.get()) is not None:
+                buffered.append(item)
+                buffered_count += len(item[0])
+                if buffered_count >= self.index_batch_size:
+                    await write(*self._merge(buffered))
+                    buffered, buffered_count = [], 0
+            if buffered:
+                await write(*self._merge(buffered))
+
+        tasks = [asyncio.create_task(stage()) for stage in (produce, encode, index)]
+        try:
+            await asyncio.gather(*tasks)
+            report["status"] = "completed"
+        except BaseException as e:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            report["status"] = "failed"
+            if not isinstance(e, asyncio.CancelledError):
+                report["errors"].append({"file": None, "error": str(e)})
+            raise
+        finally:
+            progress()
+
+        print(f"Bulk ingest finished: {report['files_processed']} files, {report['chunks_indexed']} chunks, "
+              f"{report['files_failed']} failed in {report['elapsed_seconds']:.1f}s")
+        return report
+
+    @staticmethod
+    def _merge(batches: List[Tuple[list, np.ndarray]]) -> Tuple[list, np.ndarray]:
+        entries = [entry for batch_entries, _ in batches for entry in batch_entries]
+        embeddings = np.concatenate([embeddings for _, embeddings in batches])
+        return entries, embeddings
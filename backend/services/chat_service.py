@@ -2,22 +2,52 @@ import os
 import json
 import uuid
 import time
-from typing import List, Dict, Any, Optional
+import asyncio
+from typing import List, Dict, Any, Optional, AsyncIterator, Tuple
 from datetime import datetime
 from pathlib import Path
-from openai import OpenAI
-from backend.models.chat_model import ChatHistory, ChatMessage, ChatResponse, DocumentInfo, MessageRole
+import httpx
+from openai import APIStatusError, AsyncOpenAI
+from backend import config
+from backend.models.chat_model import ChatMessage, ChatResponse, DocumentInfo, MessageRole
+from backend.services.circuit_breaker import CircuitBreaker, CircuitOpenError
+from backend.services.history_cache import HistoryCache
+from backend.services.history_store import create_history_store
 class ChatService:
     def __init__(self):
+        # One pooled HTTP client shared by every chat request
+        self.http_client = httpx.AsyncClient(
+            limits=httpx.Limits(
+                max_connections=config.LLM_MAX_CONNECTIONS,
+                max_keepalive_connections=config.LLM_MAX_KEEPALIVE_CONNECTIONS
+            ),
+            timeout=httpx.Timeout(config.LLM_REQUEST_TIMEOUT_SECONDS, connect=config.LLM_CONNECT_TIMEOUT_SECONDS)
+        )
+        
         # Initialize Grok client
-        self.grok_client = OpenAI(
-            api_key=os.getenv("GROK_API_KEY", "your-grok-api-key-here"),
-            base_url="https://api.x.ai/v1"
+        self.grok_client = AsyncOpenAI(
+            api_key=config.GROK_API_KEY,
+            base_url=config.GROK_BASE_URL,
+            http_client=self.http_client,
+            max_retries=config.LLM_MAX_RETRIES
         )
+        self.circuit_breaker = CircuitBreaker()
+        
+        # LLM call metrics
+        self._llm_calls = 0
+        self._llm_failures = 0
+        self._llm_client_errors = 0
+        self._llm_fallbacks = 0
+        self._llm_total = 0.0
+        self._llm_max = 0.0
+        self._streams = 0
+        self._ttft_total = 0.0
+        self._ttft_max = 0.0
         
         # Chat history storage
-        self.chat_history_dir = Path("data/chat_history")
-        self.chat_history_dir.mkdir(parents=True, exist_ok=True)
+        self.history_store = create_history_store()
+        self.history_cache = HistoryCache(self.history_store)
+        self._compaction_task: Optional[asyncio.Task] = None
     
     async def generate_response(
         self, 
@@ -28,49 +58,18 @@ class ChatService:
         """Generate response using Grok AI with RAG context"""
         start_time = time.time()
         
-        # Build context from relevant documents
-        context = self._build_context(relevant_docs)
-        
-        # Build system prompt
-        system_prompt = self._build_system_prompt(context)
-        
-        # Get conversation history
-        history = await self.get_chat_history(session_id)
-        
-        # Build messages for Grok
-        messages = [{"role": "system", "content": system_prompt}]
-        
-        # Add recent conversation history (last 10 messages)
-        for msg in history[-10:]:
-            messages.append({
-                "role": msg.role.value,
-                "content": msg.content
-            })
-        
-        # Add current user message
-        messages.append({"role": "user", "content": user_message})
+        messages = await self._build_messages(user_message, relevant_docs, session_id)
         
         try:
             # Call Grok API
-            response = self.grok_client.chat.completions.create(
-                model="grok-beta",  # Use the lowest/cheapest model
-                messages=messages,
-                max_tokens=1000,
-                temperature=0.7
-            )
+            response = await self._complete(messages)
             
             assistant_response = response.choices[0].message.content
             
             # Save messages to history
-            await self._save_message_to_history(
-                session_id, 
-                user_message, 
-                MessageRole.USER
-            )
-            await self._save_message_to_history(
-                session_id, 
-                assistant_response, 
-                MessageRole.ASSISTANT
+            await self._save_messages_to_history(
+                session_id,
+                [(user_message, MessageRole.USER), (assistant_response, MessageRole.ASSISTANT)]
             )
             
             # Extract sources
@@ -92,17 +91,12 @@ class ChatService:
         
         except Exception as e:
             # Fallback response
+            self._llm_fallbacks += 1
             fallback_response = self._generate_fallback_response(user_message, relevant_docs)
             
-            await self._save_message_to_history(
-                session_id, 
-                user_message, 
-                MessageRole.USER
-            )
-            await self._save_message_to_history(
-                session_id, 
-                fallback_response, 
-                MessageRole.ASSISTANT
+            await self._save_messages_to_history(
+                session_id,
+                [(user_message, MessageRole.USER), (fallback_response, MessageRole.ASSISTANT)]
             )
             
             response_time = time.time() - start_time
@@ -115,6 +109,226 @@ class ChatService:
                 metadata={"error": str(e)}
             )
     
+    async def stream_response(
+        self,
+        user_message: str,
+        relevant_docs: List[Dict[str, Any]],
+        session_id: str
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """Stream a response as events: sources, then tokens as they arrive, then done.
+        
+        Both messages are written to the history once, after the last token.
+        The done event reports time to first token and total time.
+        """
+        start_time = time.perf_counter()
+        sources = list(set(doc["metadata"]["filename"] for doc in relevant_docs))
+        yield {"event": "sources", "sources": sources, "relevant_docs_count": len(relevant_docs)}
+        
+        messages = await self._build_messages(user_message, relevant_docs, session_id)
+        
+        parts = []
+        metadata: Dict[str, Any] = {"relevant_docs_count": len(relevant_docs)}
+        first_token_time = None
+        try:
+            async for token in self._stream_completion(messages):
+                if first_token_time is None:
+                    first_token_time = time.perf_counter() - start_time
+                parts.append(token)
+                yield {"event": "token", "content": token}
+        except Exception as e:
+            metadata["error"] = str(e)
+            if not parts:
+                # Nothing streamed yet: answer with the fallback instead
+                self._llm_fallbacks += 1
+                fallback_response = self._generate_fallback_response(user_message, relevant_docs)
+                first_token_time = time.perf_counter() - start_time
+                parts.append(fallback_response)
+                yield {"event": "token", "content": fallback_response}
+        
+        assistant_response = "".join(parts)
+        await self._save_messages_to_history(
+            session_id,
+            [(user_message, MessageRole.USER), (assistant_response, MessageRole.ASSISTANT)]
+        )
+        
+        total_time = time.perf_counter() - start_time
+        if first_token_time is not None:
+            self._streams += 1
+            self._ttft_total += first_token_time
+            self._ttft_max = max(self._ttft_max, first_token_time)
+        metadata["time_to_first_token"] = first_token_time
+        metadata["total_time"] = total_time
+        yield {
+            "event": "done",
+            "session_id": session_id,
+            "sources": sources,
+            "response_time": total_time,
+            "metadata": metadata
+        }
+    
+    async def _build_messages(
+        self,
+        user_message: str,
+        relevant_docs: List[Dict[str, Any]],
+        session_id: str
+    ) -> List[Dict[str, str]]:
+        """Build the prompt messages: system prompt with context, recent history, user message"""
+        # Build context from relevant documents
+        context = self._build_context(relevant_docs)
+        
+        # Build system prompt
+        system_prompt = self._build_system_prompt(context)
+        
+        # Get recent conversation history (only the tail of the log is read)
+        history = await self.get_chat_history(session_id, limit=config.MAX_HISTORY_MESSAGES)
+        
+        # Build messages for Grok
+        messages = [{"role": "system", "content": system_prompt}]
+        
+        # Add recent conversation history
+        for msg in history:
+            messages.append({
+                "role": msg.role.value,
+                "content": msg.content
+            })
+        
+        # Add current user message
+        messages.append({"role": "user", "content": user_message})
+        return messages
+    
+    async def _complete(self, messages: List[Dict[str, str]]):
+        """Call the chat completions API through the circuit breaker.
+        
+        Raises CircuitOpenError without calling the API while the breaker is
+        open, and TimeoutError if the call (retries included) overruns
+        LLM_DEADLINE_SECONDS.
+        """
+        ticket = self.circuit_breaker.allow_request()
+        if ticket is None:
+            raise CircuitOpenError("LLM circuit breaker is open")
+        
+        self._llm_calls += 1
+        start = time.perf_counter()
+        try:
+            async with asyncio.timeout(config.LLM_DEADLINE_SECONDS):
+                response = await self.grok_client.chat.completions.create(
+                    model=config.GROK_MODEL,
+                    messages=messages,
+                    max_tokens=config.MAX_TOKENS,
+                    temperature=config.TEMPERATURE,
+                    timeout=config.LLM_REQUEST_TIMEOUT_SECONDS
+                )
+        except asyncio.CancelledError:
+            self.circuit_breaker.release(ticket)
+            raise
+        except Exception as e:
+            self._record_failure(ticket, e)
+            raise
+        
+        elapsed = time.perf_counter() - start
+        self._llm_total += elapsed
+        self._llm_max = max(self._llm_max, elapsed)
+        self.circuit_breaker.record_success(ticket)
+        return response
+    
+    async def _stream_completion(self, messages: List[Dict[str, str]]) -> AsyncIterator[str]:
+        """Stream completion tokens through the circuit breaker.
+        
+        Raises CircuitOpenError without calling the API while the breaker is
+        open, and TimeoutError if the whole stream overruns LLM_DEADLINE_SECONDS.
+        """
+        ticket = self.circuit_breaker.allow_request()
+        if ticket is None:
+            raise CircuitOpenError("LLM circuit breaker is open")
+        
+        self._llm_calls += 1
+        start = time.perf_counter()
+        # The deadline is applied around each await rather than across the
+        # yields, so it never fires while the consumer holds control
+        deadline = asyncio.get_running_loop().time() + config.LLM_DEADLINE_SECONDS
+        try:
+            async with asyncio.timeout_at(deadline):
+                stream = await self.grok_client.chat.completions.create(
+                    model=config.GROK_MODEL,
+                    messages=messages,
+                    max_tokens=config.MAX_TOKENS,
+                    temperature=config.TEMPERATURE,
+                    timeout=config.LLM_REQUEST_TIMEOUT_SECONDS,
+                    stream=True
+                )
+            async with stream:
+                chunks = stream.__aiter__()
+                while True:
+                    try:
+                        async with asyncio.timeout_at(deadline):
+                            chunk = await chunks.__anext__()
+                    except StopAsyncIteration:
+                        break
+                    if chunk.choices and chunk.choices[0].delta.content:
+                        yield chunk.choices[0].delta.content
+        except (asyncio.CancelledError, GeneratorExit):
+            # The client went away mid-stream
+            self.circuit_breaker.release(ticket)
+            raise
+        except Exception as e:
+            self._record_failure(ticket, e)
+            raise
+        
+        elapsed = time.perf_counter() - start
+        self._llm_total += elapsed
+        self._llm_max = max(self._llm_max, elapsed)
+        self.circuit_breaker.record_success(ticket)
+    
+    def _record_failure(self, ticket: int, error: Exception):
+        """Count a failed call; only upstream trouble counts against the breaker"""
+        self._llm_failures += 1
+        status = getattr(error, "status_code", None)
+        # A rejected request (bad input, auth) says nothing about the upstream's
+        # health, except for timeouts and rate limiting
+        if isinstance(error, APIStatusError) and 400 <= status < 500 and status not in (408, 429):
+            self._llm_client_errors += 1
+            self.circuit_breaker.release(ticket)
+        else:
+            self.circuit_breaker.record_failure(ticket)
+    
+    async def start(self):
+        """Start chat history write-behind and periodic compaction"""
+        await self.history_cache.start()
+        self._compaction_task = asyncio.create_task(self._compact_periodically())
+    
+    async def _compact_periodically(self):
+        while True:
+            await asyncio.sleep(config.HISTORY_COMPACT_INTERVAL_SECONDS)
+            try:
+                await asyncio.to_thread(self.history_store.compact)
+            except Exception as e:
+                print(f"Error compacting chat history: {str(e)}")
+    
+    async def close(self):
+        """Stop compaction, flush the chat history and close the pooled HTTP client"""
+        if self._compaction_task is not None:
+            self._compaction_task.cancel()
+            await asyncio.gather(self._compaction_task, return_exceptions=True)
+        await self.history_cache.close()
+        await asyncio.to_thread(self.history_store.close)
+        await self.http_client.aclose()
+    
+    def get_stats(self) -> Dict[str, Any]:
+        """Get LLM call metrics and the circuit breaker state"""
+        succeeded = self._llm_calls - self._llm_failures
+        return {
+            "calls": self._llm_calls,
+            "failures": self._llm_failures,
+            "client_errors": self._llm_client_errors,
+            "fallbacks": self._llm_fallbacks,
+            "avg_latency_ms": (self._llm_total / succeeded * 1000) if succeeded > 0 else 0.0,
+            "max_latency_ms": self._llm_max * 1000,
+            "streams": self._streams,
+            "avg_time_to_first_token_ms": (self._ttft_total / self._streams * 1000) if self._streams else 0.0,
+            "max_time_to_first_token_ms": self._ttft_max * 1000,
+            "circuit_breaker": self.circuit_breaker.get_stats()
+        }
+    
     def _build_context(self, relevant_docs: List[Dict[str, Any]]) -> str:
         """Build context string from relevant documents"""
         if not relevant_docs:
@@ -160,71 +374,40 @@ Remember: Your knowledge comes from the documents provided above. Focus on provi
         
         return response
     
-    async def _save_message_to_history(self, session_id: str, content: str, role: MessageRole):
-        """Save a message to chat history"""
-        history_file = self.chat_history_dir / f"{session_id}.json"
-        
-        # Create new message
-        message = ChatMessage(
-            id=str(uuid.uuid4()),
-            role=role,
-            content=content,
-            timestamp=datetime.now(),
-            session_id=session_id
-        )
-        
-        # Load existing history or create new
-        if history_file.exists():
-            with open(history_file, 'r') as f:
-                history_data = json.load(f)
-                history = ChatHistory(**history_data)
-        else:
-            history = ChatHistory(
-                session_id=session_id,
-                messages=[],
-                created_at=datetime.now(),
-                updated_at=datetime.now()
+    async def _save_messages_to_history(self, session_id: str, entries: List[Tuple[str, MessageRole]]):
+        """Append messages to a session's chat history with one write"""
+        new_messages = [
+            ChatMessage(
+                id=str(uuid.uuid4()),
+                role=role,
+                content=content,
+                timestamp=datetime.now(),
+                session_id=session_id
             )
-        
-        # Add message and update timestamp
-        history.messages.append(message)
-        history.updated_at = datetime.now()
-        
-        # Save to file
-        with open(history_file, 'w') as f:
-            json.dump(history.model_dump(), f, indent=2, default=str)
+            for content, role in entries
+        ]
+        await self.history_cache.append(session_id, new_messages)
     
-    async def get_chat_history(self, session_id: str) -> List[ChatMessage]:
-        """Get chat history for a session"""
-        history_file = self.chat_history_dir / f"{session_id}.json"
-        
-        if not history_file.exists():
-            return []
-        
+    async def get_chat_history(self, session_id: str, limit: Optional[int] = None) -> List[ChatMessage]:
+        """Get chat history for a session (only the last ``limit`` messages if given)"""
         try:
-            with open(history_file, 'r') as f:
-                history_data = json.load(f)
-                # Convert timestamp strings back to datetime objects
-                for msg in history_data.get('messages', []):
-                    if isinstance(msg['timestamp'], str):
-                        msg['timestamp'] = datetime.fromisoformat(msg['timestamp'])
-                
-                history = ChatHistory(**history_data)
-                return history.messages
+            return await self.history_cache.read(session_id, limit)
         except Exception as e:
             print(f"Error loading chat history: {str(e)}")
             return []
     
     async def clear_chat_history(self, session_id: str):
         """Clear chat history for a session"""
-        history_file = self.chat_history_dir / f"{session_id}.json"
-        
-        if history_file.exists():
-            history_file.unlink()
+        await self.history_cache.clear(session_id)
+    
+    async def list_sessions(self, offset: int = 0, limit: int = 100) -> Tuple[int, List[Dict[str, Any]]]:
+        """Get the total session count and a page of sessions, most recently active first"""
+        return await self.history_cache.list_session_summaries(offset, limit)
+    
+    async def delete_sessions_before(self, cutoff: datetime) -> int:
+        """Delete sessions with no activity since the cutoff"""
+        return await self.history_cache.delete_sessions_before(cutoff)
     
     async def get_all_sessions(self) -> List[str]:
         """Get all session IDs"""
-        sessions = []
-        for file in self.chat_history_dir.glob("*.json"):
-            sessions.append(file.stem)
-        return sessions
\ No newline at end of file
+        return await self.history_cache.list_sessions()
@@ -0,0 +1,183 @@
+import hashlib
+import re
+from bisect import bisect_left, bisect_right
+from typing import Iterator
+
+from backend import config
+
+
+def chunk_hash(text: str) -> str:
+    """Content hash identifying a chunk across document versions"""
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+class StreamingChunker:
+    """Character chunker: chunks of ``chunk_size`` characters overlapping by
+    ``overlap``, each ending at a sentence or paragraph break when one falls
+    near its end.
+
+    Text is fed in pieces (pages, file blocks, paragraphs); complete chunks
+    are emitted as soon as the text after them is known, and only the
+    unfinished tail is kept buffered. Produces the same chunks as splitting
+    the whole text at once.
+    """
+
+    # The boundary scan looks back at most this far from the chunk end
+    LOOKBACK = 200
+
+    def __init__(self, chunk_size: int = config.CHUNK_SIZE, overlap: int = config.CHUNK_OVERLAP):
+        self.chunk_size = chunk_size
+        self.overlap = overlap
+        self._buffer = ""
+        self._start = 0
+
+    def _next_end(self, text: str, start: int) -> int:
+        end = start + self.chunk_size
+        if end < len(text):
+            # Look for sentence endings or paragraph breaks
+            for i in range(end, max(start + self.chunk_size // 2, end - self.LOOKBACK), -1):
+                if text[i] in '.!?\n':
+                    return i + 1
+        return end
+
+    def feed(self, text: str) -> Iterator[str]:
+        """Add text and yield every chunk that is now complete"""
+        self._buffer += text
+        # A chunk is final once the text extends past its nominal end
+        while len(self._buffer) - self._start > self.chunk_size:
+            end = self._next_end(self._buffer, self._start)
+            chunk = self._buffer[self._start:end].strip()
+            if chunk:
+                yield chunk
+            self._start = end - self.overlap
+
+        # Drop text no later chunk can reach
+        self._buffer = self._buffer[self._start:]
+        self._start = 0
+
+    def finish(self) -> Iterator[str]:
+        """Yield the chunks left in the buffer at the end of the document"""
+        if self._buffer.strip():
+            while self._start < len(self._buffer):
+                end = self._next_end(self._buffer, self._start)
+                chunk = self._buffer[self._start:end].strip()
+                if chunk:
+                    yield chunk
+                self._start = end - self.overlap
+        self._buffer = ""
+        self._start = 0
+
+
+
+# Sentence ends: terminal punctuation (and closing quotes/brackets) before whitespace, or a line break
+SENTENCE_BOUNDARY = re.compile(r"[.!?]+[\"')\]]*\s+|\n\s*")
+
+
+class TokenChunker:
+    """Packs whole sentences into chunks that fit the embedding model's token limit.
+
+    Buffered text is tokenized once with the fast tokenizer's offset mapping;
+    chunks are then cut at sentence starts (or at a token boundary when a
+    sentence alone exceeds the budget) and overlap by up to
+    ``overlap_tokens``. Text is processed in windows of ``window_chars`` so
+    it can be fed incrementally like StreamingChunker.
+    """
+
+    def __init__(
+        self,
+        tokenizer,
+        max_tokens: int,
+        overlap_tokens: int = config.CHUNK_OVERLAP_TOKENS,
+        window_chars: int = 65536
+    ):
+        self.tokenizer = tokenizer
+        self.max_tokens = max(1, max_tokens)
+        self.overlap_tokens = max(0, min(overlap_tokens, self.max_tokens // 2))
+        self.window_chars = window_chars
+        self._buffer = ""
+
+    @classmethod
+    def from_model(cls, model, max_tokens: int = config.CHUNK_MAX_TOKENS) -> "TokenChunker":
+        """Chunker sized to a SentenceTransformer's max sequence length"""
+        if not max_tokens:
+            special_tokens = model.tokenizer.num_special_tokens_to_add(pair=False)
+            max_tokens = model.max_seq_length - special_tokens
+        return cls(model.tokenizer, max_tokens)
+
+    def feed(self, text: str) -> Iterator[str]:
+        """Add text and yield the chunks that are complete once a window has filled"""
+        self._buffer += text
+        if len(self._buffer) >= self.window_chars:
+            yield from self._pack(final=False)
+
+    def finish(self) -> Iterator[str]:
+        """Yield the remaining chunks at the end of the document"""
+        yield from self._pack(final=True)
+        self._buffer = ""
+
+    def _pack(self, final: bool) -> Iterator[str]:
+        text = self._buffer
+        encoding = self.tokenizer(text, add_special_tokens=False, return_offsets_mapping=True, verbose=False)
+        offsets = encoding["offset_mapping"]
+        token_count = len(offsets)
+        if not token_count:
+            if final:
+                self._buffer = ""
+            return
+
+        # Token index at which each sentence starts
+        token_starts = [start for start, _ in offsets]
+        boundaries = sorted({
+            index for index in (bisect_left(token_starts, match.end()) for match in SENTENCE_BOUNDARY.finditer(text))
+            if 0 < index < token_count
+        })
+
+        usable = token_count
+        if not final:
+            # The last word may continue in the next piece of text
+            last_space = max(text.rfind(" "), text.rfind("\n"), text.rfind("\t"))
+            usable = bisect_left(token_starts, last_space)
+            if token_count - usable > self.max_tokens:
+                # No whitespace within a chunk of the end (a long unbroken run of
+                # characters): hold back only the last token and cut at token boundaries
+                usable = token_count - 1
+
+        start = 0
+        while start < token_count:
+            limit = start + self.max_tokens
+            if limit >= usable:
+                if not final:
+                    # Unfinished: carry the rest into the next window
+                    break
+                end = token_count
+            else:
+                # Last sentence start that fits, unless that would make the chunk too short
+                i = bisect_right(boundaries, limit) - 1
+                end = boundaries[i] if i >= 0 and boundaries[i] > start + self.max_tokens // 2 else limit
+
+            chunk = text[offsets[start][0]:offsets[end - 1][1]].strip()
+            if chunk:
+                yield chunk
+            if end >= token_count:
+                start = token_count
+                break
+
+            # Overlap the next chunk, starting it at a sentence if one begins inside the overlap
+            next_start = max(end - self.overlap_tokens, start + 1)
+            i = bisect_left(boundaries, next_start)
+            if i < len(boundaries) and boundaries[i] < end:
+                next_start = boundaries[i]
+            start = next_start
+
+        self._buffer = text[offsets[start][0]:] if start < token_count else ""
+
+
+def create_chunker(model=None, strategy: str = config.CHUNKING_STRATEGY):
+    """Create the chunker selected in config; the token strategy needs the embedding model"""
+    if strategy == "characters":
+        return StreamingChunker()
+    if strategy == "tokens":
+        if model is None:
+            raise ValueError("Token chunking needs the embedding model's tokenizer")
+        return TokenChunker.from_model(model)
+    raise ValueError(f"Unknown chunking strategy: {strategy}. Supported: tokens, characters")
@@ -0,0 +1,106 @@
+import time
+from typing import Dict, Any, Optional
+
+from backend import config
+
+
+class CircuitOpenError(Exception):
+    """Raised when a call is refused because the circuit breaker is open"""
+
+
+class CircuitBreaker:
+    """Stops calling an upstream that keeps failing.
+
+    After ``failure_threshold`` consecutive failures the breaker opens and
+    refuses calls for ``reset_timeout`` seconds. It then lets a single trial
+    call through (half-open): success closes the breaker, failure opens it
+    again for another ``reset_timeout``.
+
+    ``allow_request`` hands out a ticket that the caller passes back with
+    the call's outcome. Opening the breaker starts a new generation of
+    tickets, so calls admitted before it opened can't close it, re-open it or
+    free the trial slot when they finish late.
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(
+        self,
+        failure_threshold: int = config.CIRCUIT_BREAKER_FAILURE_THRESHOLD,
+        reset_timeout: float = config.CIRCUIT_BREAKER_RESET_SECONDS
+    ):
+        self.failure_threshold = max(1, failure_threshold)
+        self.reset_timeout = max(0.0, reset_timeout)
+
+        self._state = self.CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._trial_in_flight = False
+        self._generation = 1
+
+        # Metrics
+        self._rejected = 0
+        self._times_opened = 0
+        self._stale_outcomes = 0
+
+    @property
+    def state(self) -> str:
+        if self._state == self.OPEN and time.monotonic() - self._opened_at >= self.reset_timeout:
+            return self.HALF_OPEN
+        return self._state
+
+    def allow_request(self) -> Optional[int]:
+        """A ticket for calling the upstream now, or None if the call is refused"""
+        state = self.state
+        if state == self.CLOSED:
+            return self._generation
+        if state == self.HALF_OPEN and not self._trial_in_flight:
+            self._state = self.HALF_OPEN
+            self._trial_in_flight = True
+            return self._generation
+        self._rejected += 1
+        return None
+
+    def _is_stale(self, ticket: int) -> bool:
+        if ticket != self._generation:
+            self._stale_outcomes += 1
+            return True
+        return False
+
+    def record_success(self, ticket: int):
+        if self._is_stale(ticket):
+            return
+        self._state = self.CLOSED
+        self._failures = 0
+        self._trial_in_flight = False
+
+    def record_failure(self, ticket: int):
+        if self._is_stale(ticket):
+            return
+        self._failures += 1
+        if self._state == self.HALF_OPEN or self._failures >= self.failure_threshold:
+            self._state = self.OPEN
+            self._opened_at = time.monotonic()
+            self._generation += 1
+            self._times_opened += 1
+            self._trial_in_flight = False
+
+    def release(self, ticket: int):
+        """A call ended without telling anything about the upstream's health
+        (it was cancelled, or the request itself was rejected)"""
+        if self._is_stale(ticket):
+            return
+        if self._state == self.HALF_OPEN:
+            self._trial_in_flight = False
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get the breaker state and counters"""
+        return {
+            "state": self.state,
+            "consecutive_failures": self._failures,
+            "times_opened": self._times_opened,
+            "rejected": self._rejected,
+            "stale_outcomes": self._stale_outcomes
+        }
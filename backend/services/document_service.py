@@ -1,14 +1,73 @@
 import os
 import json
+import time
+import codecs
 import uuid
+import asyncio
+import hashlib
+import itertools
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
-from typing import List, Dict, Any
-from datetime import datetime
+from typing import List, Dict, Any, Optional, Tuple, AsyncIterator, Awaitable, BinaryIO, Callable
+from datetime import datetime, timezone
 from fastapi import UploadFile
 import PyPDF2
 import docx
 
+from backend import config
 from backend.models.chat_model import DocumentInfo
+from backend.services.text_cache import ExtractedTextCache
+
+# Bump when a change to text extraction should invalidate cached text
+EXTRACTOR_VERSION = 1
+
+class FileTooLargeError(ValueError):
+    """Raised when an upload exceeds the configured size limit"""
+
+class DuplicateDocumentError(ValueError):
+    """Raised when a byte-identical document exists and duplicates are rejected"""
+    
+    def __init__(self, existing_id: str):
+        super().__init__(f"Document already uploaded as {existing_id}")
+        self.existing_id = existing_id
+
+class SharedDocumentError(ValueError):
+    """Raised when replacing a document whose content other uploads still reference"""
+    
+    def __init__(self, doc_id: str):
+        super().__init__(f"Document {doc_id} is referenced by duplicate uploads and can't be replaced")
+        self.doc_id = doc_id
+
+def _extract_pdf_pages(file_path: str, start: int, end: int) -> List[Tuple[str, float]]:
+    """Extract pages [start, end) of a PDF as (text, seconds) pairs; runs in a worker process"""
+    pages = []
+    with open(file_path, 'rb') as file:
+        pdf_reader = PyPDF2.PdfReader(file)
+        for page_number in range(start, end):
+            page_start = time.perf_counter()
+            text = pdf_reader.pages[page_number].extract_text() or ""
+            pages.append((text, time.perf_counter() - page_start))
+    return pages
+
+def _to_utc(value: datetime) -> datetime:
+    """Aware UTC datetime; naive values (as stored in metadata) are taken as server local time"""
+    return value.astimezone(timezone.utc)
+
+def _sync_file(f):
+    """Flush a file through to disk"""
+    f.flush()
+    os.fsync(f.fileno())
+
+def _hash_file(file_path: Path) -> str:
+    hasher = hashlib.sha256()
+    with open(file_path, 'rb') as file:
+        while block := file.read(config.UPLOAD_BLOCK_SIZE):
+            hasher.update(block)
+    return hasher.hexdigest()
+
+def _count_pdf_pages(file_path: str) -> int:
+    with open(file_path, 'rb') as file:
+        return len(PyPDF2.PdfReader(file).pages)
 
 class DocumentService:
     def __init__(self):
@@ -18,6 +77,19 @@ class DocumentService:
         
         # Load existing metadata
         self.metadata = self._load_metadata()
+        
+        # Content hash -> ID of the document that owns the file and embeddings
+        self.hash_index = {
+            metadata["content_hash"]: doc_id
+            for doc_id, metadata in self.metadata.items()
+            if metadata.get("content_hash") and not metadata.get("duplicate_of")
+        }
+        
+        # Created on the first large PDF
+        self._pdf_executor: Optional[ProcessPoolExecutor] = None
+        
+        # Parsed PDF/DOCX text, reused when documents are re-chunked or re-embedded
+        self.text_cache = ExtractedTextCache() if config.TEXT_CACHE_ENABLED else None
     
     def _load_metadata(self) -> Dict[str, Any]:
         """Load document metadata from JSON file"""
@@ -35,146 +107,461 @@ class DocumentService:
             json.dump(self.metadata, f, indent=2, default=str)
     
     async def save_document(self, file: UploadFile, doc_id: str) -> str:
-        """Save uploaded document to disk"""
-        file_extension = Path(file.filename).suffix
+        """Stream an uploaded document to disk, enforcing the size limit and hashing it on the way"""
+        return await self._save(file.read, file.filename, doc_id)
+    
+    async def save_document_from_stream(self, stream: BinaryIO, filename: str, doc_id: str) -> str:
+        """Store a document read from a local file or archive member, like save_document"""
+        async def read(size: int) -> bytes:
+            return await asyncio.to_thread(stream.read, size)
+        return await self._save(read, filename, doc_id)
+    
+    async def _save(self, read: Callable[[int], Awaitable[bytes]], filename: str, doc_id: str) -> str:
+        file_extension = Path(filename).suffix
         file_path = self.document_dir / f"{doc_id}{file_extension}"
+        tmp_path = self.document_dir / f".{doc_id}{file_extension}.part"
+        
+        try:
+            file_size, content_hash = await self._stream_to_file(read, tmp_path)
+            existing_id = self.hash_index.get(content_hash)
+            if existing_id is None:
+                # Atomic rename, so a document file is never seen half-written
+                os.replace(tmp_path, file_path)
+            else:
+                # Byte-identical to a stored document: keep only the original file
+                tmp_path.unlink()
+        except BaseException:
+            tmp_path.unlink(missing_ok=True)
+            raise
         
-        # Save file
-        content = await file.read()
-        with open(file_path, 'wb') as f:
-            f.write(content)
+        if existing_id is not None:
+            if config.DUPLICATE_UPLOAD_POLICY == "reject":
+                raise DuplicateDocumentError(existing_id)
+            
+            # New reference to the already-processed document
+            self.metadata[doc_id] = {
+                "id": doc_id,
+                "filename": filename,
+                "file_size": file_size,
+                "content_hash": content_hash,
+                "upload_date": datetime.now().isoformat(),
+                "processed": False,
+                "file_path": self.metadata[existing_id]["file_path"],
+                "duplicate_of": existing_id
+            }
+            self._save_metadata()
+            return self.metadata[existing_id]["file_path"]
         
         # Update metadata
         self.metadata[doc_id] = {
             "id": doc_id,
-            "filename": file.filename,
-            "file_size": len(content),
+            "filename": filename,
+            "file_size": file_size,
+            "content_hash": content_hash,
             "upload_date": datetime.now().isoformat(),
             "processed": False,
             "file_path": str(file_path)
         }
+        self.hash_index[content_hash] = doc_id
         self._save_metadata()
         
         return str(file_path)
     
-    async def extract_text(self, file_path: str) -> List[str]:
-        """Extract text from document and split into chunks"""
+    async def _stream_to_file(self, read: Callable[[int], Awaitable[bytes]], path: Path) -> Tuple[int, str]:
+        """Write a stream to path, returning its size and SHA-256"""
+        # Stream in fixed-size blocks so uploads are never fully buffered in memory
+        hasher = hashlib.sha256()
+        file_size = 0
+        with open(path, 'wb') as f:
+            def write_block(block: bytes):
+                hasher.update(block)
+                f.write(block)
+            
+            while True:
+                block = await read(config.UPLOAD_BLOCK_SIZE)
+                if not block:
+                    break
+                
+                file_size += len(block)
+                if file_size > config.MAX_FILE_SIZE:
+                    raise FileTooLargeError(
+                        f"File exceeds the maximum size of {config.MAX_FILE_SIZE // (1024 * 1024)}MB"
+                    )
+                
+                # Hashing and disk writes run off the event loop
+                await asyncio.to_thread(write_block, block)
+            
+            await asyncio.to_thread(_sync_file, f)
+        
+        return file_size, hasher.hexdigest()
+    
+    async def save_revision(self, doc_id: str, file: UploadFile) -> Dict[str, Any]:
+        """Stream a new version of a document to disk next to the current one.
+        
+        The current version stays in place until commit_revision swaps the new
+        one in; discard_revision drops it instead.
+        """
+        if doc_id not in self.metadata or self.metadata[doc_id].get("deleted"):
+            raise ValueError(f"Document {doc_id} not found")
+        if self._references(doc_id):
+            raise SharedDocumentError(doc_id)
+        
+        revision = self.metadata[doc_id].get("revision", 0) + 1
+        tmp_path = self.document_dir / f".{doc_id}.r{revision}{Path(file.filename).suffix}"
+        try:
+            file_size, content_hash = await self._stream_to_file(file.read, tmp_path)
+        except BaseException:
+            tmp_path.unlink(missing_ok=True)
+            raise
+        
+        return {
+            "doc_id": doc_id,
+            "revision": revision,
+            "filename": file.filename,
+            "file_size": file_size,
+            "content_hash": content_hash,
+            "file_path": str(tmp_path)
+        }
+    
+    def commit_revision(self, revision: Dict[str, Any], chunk_count: int) -> List[str]:
+        """Make a staged revision the current version of its document.
+        
+        Returns the IDs whose embeddings should be deleted: replacing a
+        duplicate can release the hidden document it referenced.
+        """
+        doc_id = revision["doc_id"]
+        metadata = self.metadata[doc_id]
+        file_path = self.document_dir / f"{doc_id}{Path(revision['filename']).suffix}"
+        os.replace(revision["file_path"], file_path)
+        
+        # A duplicate's file belongs to the document it references
+        canonical_id = metadata.pop("duplicate_of", None)
+        old_path = Path(metadata["file_path"])
+        if canonical_id is None and old_path != file_path:
+            old_path.unlink(missing_ok=True)
+        
+        old_hash = metadata.get("content_hash")
+        if old_hash and self.hash_index.get(old_hash) == doc_id:
+            del self.hash_index[old_hash]
+        
+        metadata.update({
+            "filename": revision["filename"],
+            "file_size": revision["file_size"],
+            "content_hash": revision["content_hash"],
+            "file_path": str(file_path),
+            "revision": revision["revision"],
+            "updated_date": datetime.now().isoformat(),
+            "processed": True,
+            "chunk_count": chunk_count
+        })
+        
+        released = []
+        if canonical_id and self.metadata.get(canonical_id, {}).get("deleted") and not self._references(canonical_id):
+            self._purge(canonical_id)
+            released.append(canonical_id)
+        
+        self.hash_index.setdefault(revision["content_hash"], doc_id)
+        self._save_metadata()
+        if old_hash != revision["content_hash"]:
+            self._release_text_cache(old_hash)
+        return released
+    
+    def discard_revision(self, revision: Dict[str, Any]):
+        """Delete a staged revision that won't be committed"""
+        Path(revision["file_path"]).unlink(missing_ok=True)
+    
+    def get_canonical_id(self, doc_id: str) -> str:
+        """ID of the document whose file and embeddings back doc_id"""
+        return self.metadata.get(doc_id, {}).get("duplicate_of") or doc_id
+    
+    def _references(self, canonical_id: str) -> List[str]:
+        """IDs of documents that are duplicates of canonical_id"""
+        return [
+            doc_id for doc_id, metadata in self.metadata.items()
+            if metadata.get("duplicate_of") == canonical_id
+        ]
+    
+    async def iter_text(self, file_path: str, parallel: Optional[bool] = None) -> AsyncIterator[str]:
+        """Yield a document's text in pieces (PDF pages, file blocks, DOCX paragraphs), in order.
+        
+        Only a bounded amount of text is extracted ahead of the consumer.
+        ``parallel`` forces PDF extraction into (or out of) the process pool
+        regardless of page count. Parsed PDF and DOCX text is cached by
+        content hash, so re-chunking or re-embedding a document skips parsing.
+        """
         file_path = Path(file_path)
-        text = ""
-        
-        if file_path.suffix.lower() == '.pdf':
-            text = await self._extract_pdf_text(file_path)
-        elif file_path.suffix.lower() == '.txt':
-            text = await self._extract_txt_text(file_path)
-        elif file_path.suffix.lower() == '.docx':
-            text = await self._extract_docx_text(file_path)
-        else:
+        suffix = file_path.suffix.lower()
+        
+        if suffix == '.txt':
+            # Plain text is cheaper to re-read than to cache
+            encoding = await asyncio.to_thread(self._detect_text_encoding, file_path)
+            with open(file_path, 'r', encoding=encoding) as file:
+                while True:
+                    block = await asyncio.to_thread(file.read, config.UPLOAD_BLOCK_SIZE)
+                    if not block:
+                        break
+                    yield block
+            return
+        if suffix not in ('.pdf', '.docx'):
             raise ValueError(f"Unsupported file type: {file_path.suffix}")
         
-        # Split text into chunks
-        chunks = self._split_text_into_chunks(text)
+        version = self._extractor_version(suffix)
+        writer = None
+        # Pieces already served from the cache when its entry turned out to be corrupt
+        skip = 0
+        if self.text_cache is not None:
+            content_hash = await asyncio.to_thread(_hash_file, file_path)
+            cached = await asyncio.to_thread(self.text_cache.get, content_hash, version)
+            if cached is not None:
+                while True:
+                    try:
+                        batch = await asyncio.to_thread(lambda: list(itertools.islice(cached, 64)))
+                    except (OSError, EOFError, ValueError) as e:
+                        # A truncated or corrupt entry: drop it and extract again,
+                        # picking up after the pieces already yielded
+                        print(f"Dropping corrupt cached text of {file_path.name}: {str(e)}")
+                        cached.close()
+                        await asyncio.to_thread(self.text_cache.delete, content_hash)
+                        break
+                    if not batch:
+                        return
+                    for text in batch:
+                        skip += 1
+                        yield text
+            # Pieces are written to the cache as they are extracted
+            writer = await asyncio.to_thread(self.text_cache.writer, content_hash, version)
         
-        # Update metadata
-        doc_id = file_path.stem
+        try:
+            if suffix == '.pdf':
+                extracted = self._iter_pdf_text(file_path, parallel)
+            else:
+                extracted = self._iter_docx_text(file_path)
+            async for text in extracted:
+                if writer is not None:
+                    await asyncio.to_thread(writer.write, text)
+                if skip:
+                    skip -= 1
+                    continue
+                yield text
+        except BaseException as e:
+            if writer is not None:
+                writer.abort()
+            if isinstance(e, Exception):
+                raise ValueError(f"Error extracting {suffix[1:].upper()} text: {str(e)}")
+            raise
+        
+        if writer is not None:
+            await asyncio.to_thread(writer.commit)
+    
+    @staticmethod
+    def _extractor_version(suffix: str) -> str:
+        """Cache version of an extractor: changes whenever its output could"""
+        if suffix == '.pdf':
+            return f"{EXTRACTOR_VERSION}-pypdf2-{PyPDF2.__version__}"
+        return f"{EXTRACTOR_VERSION}-docx-{getattr(docx, '__version__', '0')}"
+    
+    async def _iter_docx_text(self, file_path: Path) -> AsyncIterator[str]:
+        doc = await asyncio.to_thread(docx.Document, file_path)
+        for paragraph in doc.paragraphs:
+            yield paragraph.text + "\n"
+    
+    def mark_processed(self, doc_id: str, chunk_count: int, index_generation: Optional[int] = None):
+        """Record that a document's chunks are indexed"""
         if doc_id in self.metadata:
             self.metadata[doc_id]["processed"] = True
-            self.metadata[doc_id]["chunk_count"] = len(chunks)
+            self.metadata[doc_id]["chunk_count"] = chunk_count
+            if index_generation is not None:
+                self.metadata[doc_id]["index_generation"] = index_generation
             self._save_metadata()
-        
-        return chunks
     
-    async def _extract_pdf_text(self, file_path: Path) -> str:
-        """Extract text from PDF file"""
-        text = ""
-        try:
-            with open(file_path, 'rb') as file:
-                pdf_reader = PyPDF2.PdfReader(file)
-                for page in pdf_reader.pages:
-                    text += page.extract_text() + "\n"
-        except Exception as e:
-            raise ValueError(f"Error extracting PDF text: {str(e)}")
-        return text
-    
-    async def _extract_txt_text(self, file_path: Path) -> str:
-        """Extract text from TXT file"""
-        try:
-            with open(file_path, 'r', encoding='utf-8') as file:
-                return file.read()
-        except UnicodeDecodeError:
-            # Try different encodings
-            encodings = ['latin-1', 'cp1252', 'iso-8859-1']
-            for encoding in encodings:
-                try:
-                    with open(file_path, 'r', encoding=encoding) as file:
-                        return file.read()
-                except:
-                    continue
-            raise ValueError("Unable to decode text file")
+    def set_job_id(self, doc_id: str, job_id: str):
+        """Remember the ingestion job processing a document"""
+        if doc_id in self.metadata:
+            self.metadata[doc_id]["job_id"] = job_id
+            self._save_metadata()
     
-    async def _extract_docx_text(self, file_path: Path) -> str:
-        """Extract text from DOCX file"""
+    async def _iter_pdf_text(self, file_path: Path, parallel: Optional[bool] = None) -> AsyncIterator[str]:
+        """Yield PDF text page by page, keeping a bounded number of page ranges in flight"""
+        page_count = await asyncio.to_thread(_count_pdf_pages, str(file_path))
+        if parallel is None:
+            parallel = page_count >= config.PDF_PARALLEL_MIN_PAGES and config.PDF_EXTRACT_WORKERS > 1
+        step = max(1, config.PDF_PAGES_PER_TASK)
+        ranges = [(start, min(start + step, page_count)) for start in range(0, page_count, step)]
+        
+        loop = asyncio.get_running_loop()
+        if parallel and self._pdf_executor is None:
+            self._pdf_executor = ProcessPoolExecutor(max_workers=config.PDF_EXTRACT_WORKERS)
+        window = config.PDF_EXTRACT_WORKERS * 2 if parallel else 1
+        
+        def submit(start: int, end: int):
+            if parallel:
+                return loop.run_in_executor(self._pdf_executor, _extract_pdf_pages, str(file_path), start, end)
+            return asyncio.ensure_future(asyncio.to_thread(_extract_pdf_pages, str(file_path), start, end))
+        
+        timings: List[float] = []
+        pending = [submit(*page_range) for page_range in ranges[:window]]
+        next_range = len(pending)
         try:
-            doc = docx.Document(file_path)
-            text = ""
-            for paragraph in doc.paragraphs:
-                text += paragraph.text + "\n"
-            return text
-        except Exception as e:
-            raise ValueError(f"Error extracting DOCX text: {str(e)}")
-    
-    def _split_text_into_chunks(self, text: str, chunk_size: int = 1000, overlap: int = 100) -> List[str]:
-        """Split text into overlapping chunks"""
-        if not text.strip():
-            return []
-        
-        chunks = []
-        start = 0
-        
-        while start < len(text):
-            end = start + chunk_size
-            
-            # If we're not at the end, try to find a good breaking point
-            if end < len(text):
-                # Look for sentence endings or paragraph breaks
-                for i in range(end, max(start + chunk_size // 2, end - 200), -1):
-                    if text[i] in '.!?\n':
-                        end = i + 1
-                        break
+            while pending:
+                pages = await pending.pop(0)
+                if next_range < len(ranges):
+                    pending.append(submit(*ranges[next_range]))
+                    next_range += 1
+                
+                for text, seconds in pages:
+                    timings.append(seconds)
+                    yield text + "\n"
+        finally:
+            for future in pending:
+                future.cancel()
+        
+        self._record_extraction(file_path.stem, timings, "parallel" if parallel else "serial")
+    
+    def _detect_text_encoding(self, file_path: Path) -> str:
+        """First of the supported encodings that decodes the whole file"""
+        for encoding in ['utf-8', 'latin-1', 'cp1252', 'iso-8859-1']:
+            decoder = codecs.getincrementaldecoder(encoding)()
+            try:
+                with open(file_path, 'rb') as file:
+                    while True:
+                        block = file.read(config.UPLOAD_BLOCK_SIZE)
+                        decoder.decode(block, final=not block)
+                        if not block:
+                            break
+                return encoding
+            except UnicodeDecodeError:
+                continue
+        raise ValueError("Unable to decode text file")
+    
+    def _record_extraction(self, doc_id: str, timings: List[float], mode: str):
+        """Store a per-page timing summary of the last extraction in the document's metadata"""
+        if not timings:
+            return
+        
+        slowest = sorted(range(len(timings)), key=lambda i: timings[i], reverse=True)[:5]
+        summary = {
+            "mode": mode,
+            "pages": len(timings),
+            "page_seconds_total": round(sum(timings), 4),
+            "page_seconds_avg": round(sum(timings) / len(timings), 4),
+            "page_seconds_max": round(timings[slowest[0]], 4),
+            "slowest_pages": [{"page": i + 1, "seconds": round(timings[i], 4)} for i in slowest]
+        }
+        print(f"Extracted {len(timings)} PDF pages ({mode}) for {doc_id}: "
+              f"avg {summary['page_seconds_avg'] * 1000:.1f}ms/page, slowest page {slowest[0] + 1} "
+              f"at {summary['page_seconds_max'] * 1000:.1f}ms")
+        
+        if doc_id in self.metadata:
+            self.metadata[doc_id]["extraction"] = summary
+            self._save_metadata()
+    
+    def resolve_filters(
+        self,
+        document_ids: Optional[List[str]] = None,
+        filename: Optional[str] = None,
+        uploaded_after: Optional[datetime] = None,
+        uploaded_before: Optional[datetime] = None
+    ) -> Optional[List[str]]:
+        """Resolve search filters to the matching document IDs.
+        
+        Returns None when no filter is set, so callers can search everything.
+        """
+        if document_ids is None and filename is None and uploaded_after is None and uploaded_before is None:
+            return None
+        
+        matches = []
+        for doc_id, metadata in self.metadata.items():
+            if metadata.get("deleted"):
+                continue
+            if document_ids is not None and doc_id not in document_ids:
+                continue
+            if filename is not None and metadata["filename"].lower() != filename.lower():
+                continue
             
-            chunk = text[start:end].strip()
-            if chunk:
-                chunks.append(chunk)
+            upload_date = _to_utc(datetime.fromisoformat(metadata["upload_date"]))
+            if uploaded_after is not None and upload_date < _to_utc(uploaded_after):
+                continue
+            if uploaded_before is not None and upload_date > _to_utc(uploaded_before):
+                continue
             
-            start = end - overlap
+            # Duplicates are searched through the document that holds their embeddings
+            canonical_id = self.get_canonical_id(doc_id)
+            if canonical_id not in matches:
+                matches.append(canonical_id)
         
-        return chunks
+        return matches
     
     async def get_document_list(self) -> List[DocumentInfo]:
         """Get list of all uploaded documents"""
         documents = []
         for doc_id, metadata in self.metadata.items():
+            if metadata.get("deleted"):
+                continue
+            
+            # Duplicates report the processing state of the document they reference
+            source = self.metadata.get(self.get_canonical_id(doc_id), metadata)
             doc_info = DocumentInfo(
                 id=doc_id,
                 filename=metadata["filename"],
                 file_size=metadata["file_size"],
                 upload_date=datetime.fromisoformat(metadata["upload_date"]),
-                processed=metadata["processed"],
-                chunk_count=metadata.get("chunk_count")
+                processed=source["processed"],
+                chunk_count=source.get("chunk_count")
             )
             documents.append(doc_info)
         
         return sorted(documents, key=lambda x: x.upload_date, reverse=True)
     
-    async def delete_document(self, doc_id: str):
-        """Delete a document and its metadata"""
-        if doc_id in self.metadata:
-            # Delete file
-            file_path = Path(self.metadata[doc_id]["file_path"])
-            if file_path.exists():
-                file_path.unlink()
-            
-            # Remove from metadata
+    async def delete_document(self, doc_id: str) -> List[str]:
+        """Delete a document and its metadata.
+        
+        The file (and the embeddings, which the caller removes) are only
+        deleted once no duplicate references the content any more. Returns
+        the IDs whose embeddings should be deleted.
+        """
+        if doc_id not in self.metadata or self.metadata[doc_id].get("deleted"):
+            raise ValueError(f"Document {doc_id} not found")
+        
+        canonical_id = self.get_canonical_id(doc_id)
+        if canonical_id != doc_id:
             del self.metadata[doc_id]
-            self._save_metadata()
-        else:
-            raise ValueError(f"Document {doc_id} not found")
\ No newline at end of file
+        elif self._references(doc_id):
+            # Still referenced: hide it, but keep the file and embeddings
+            self.metadata[doc_id]["deleted"] = True
+        
+        if canonical_id in self.metadata and (
+            self.metadata[canonical_id].get("deleted") or canonical_id == doc_id
+        ) and not self._references(canonical_id):
+            # Last reference gone
+            self._purge(canonical_id)
+            return [canonical_id]
+        
+        self._save_metadata()
+        return []
+    
+    def _purge(self, canonical_id: str):
+        """Delete a document's file and metadata"""
+        file_path = Path(self.metadata[canonical_id]["file_path"])
+        if file_path.exists():
+            file_path.unlink()
+        
+        # Remove from metadata
+        content_hash = self.metadata[canonical_id].get("content_hash")
+        if content_hash and self.hash_index.get(content_hash) == canonical_id:
+            del self.hash_index[content_hash]
+        del self.metadata[canonical_id]
+        self._save_metadata()
+        self._release_text_cache(content_hash)
+    
+    def _release_text_cache(self, content_hash: Optional[str]):
+        """Drop cached text no stored document has any more"""
+        if self.text_cache is None or not content_hash:
+            return
+        if not any(metadata.get("content_hash") == content_hash for metadata in self.metadata.values()):
+            self.text_cache.delete(content_hash)
+    
+    def close(self):
+        """Shut down the PDF extraction process pool"""
+        if self._pdf_executor is not None:
+            self._pdf_executor.shutdown()
+            self._pdf_executor = None
@@ -0,0 +1,243 @@
+import hashlib
+import re
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import List, Dict, Any, Optional
+
+import numpy as np
+
+from backend import config
+
+
+def normalize_query(query: str) -> str:
+    """Normalize query text so trivially different spellings share a cache entry"""
+    return re.sub(r"\s+", " ", query).strip().lower()
+
+
+class QueryEmbeddingCache:
+    """Bounded, thread-safe LRU cache of query embeddings with TTL expiry.
+
+    Entries are keyed on the model name plus the normalized query text. When a
+    cache file is given, the cache is loaded from it on startup and written
+    back by ``save``.
+    """
+
+    def __init__(
+        self,
+        model_name: str = config.EMBEDDING_MODEL,
+        max_size: int = config.QUERY_CACHE_SIZE,
+        ttl_seconds: float = config.QUERY_CACHE_TTL_SECONDS,
+        cache_file: Optional[Path] = config.QUERY_CACHE_FILE if config.QUERY_CACHE_PERSIST else None
+    ):
+        self.model_name = model_name
+        self.max_size = max(1, max_size)
+        self.ttl_seconds = ttl_seconds
+        self.cache_file = Path(cache_file) if cache_file else None
+
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+
+        # Metrics
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+        if self.cache_file:
+            self._load()
+
+    def _key(self, query: str) -> str:
+        return f"{self.model_name}\n{normalize_query(query)}"
+
+    def _expired(self, created_at: float, now: float) -> bool:
+        return self.ttl_seconds > 0 and now - created_at > self.ttl_seconds
+
+    def get(self, query: str) -> Optional[np.ndarray]:
+        """Get a cached embedding, or None on a miss"""
+        key = self._key(query)
+        now = time.time()
+
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+
+            embedding, created_at = entry
+            if self._expired(created_at, now):
+                del self._entries[key]
+                self.evictions += 1
+                self.misses += 1
+                return None
+
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return embedding
+
+    def put(self, query: str, embedding: np.ndarray, created_at: Optional[float] = None):
+        """Cache an embedding, evicting the least recently used entries if full"""
+        key = self._key(query)
+        embedding = np.asarray(embedding, dtype=np.float32)
+
+        with self._lock:
+            self._entries[key] = (embedding, created_at or time.time())
+            self._entries.move_to_end(key)
+
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        """Drop all cached entries"""
+        with self._lock:
+            self._entries.clear()
+
+    def save(self):
+        """Write unexpired entries to the cache file"""
+        if not self.cache_file:
+            return
+
+        now = time.time()
+        with self._lock:
+            items = [
+                (key, embedding, created_at)
+                for key, (embedding, created_at) in self._entries.items()
+                if not self._expired(created_at, now)
+            ]
+
+        if not items:
+            return
+
+        keys, embeddings, timestamps = zip(*items)
+        self.cache_file.parent.mkdir(parents=True, exist_ok=True)
+        tmp_file = self.cache_file.with_suffix(".tmp.npz")
+        np.savez(
+            tmp_file,
+            keys=np.array(keys, dtype=str),
+            embeddings=np.stack(embeddings),
+            timestamps=np.array(timestamps, dtype=np.float64)
+        )
+        tmp_file.replace(self.cache_file)
+
+    def _load(self):
+        """Load entries from the cache file, skipping expired ones"""
+        if not self.cache_file.exists():
+            return
+
+        try:
+            with np.load(self.cache_file) as data:
+                keys = data["keys"]
+                embeddings = data["embeddings"]
+                timestamps = data["timestamps"]
+        except Exception as e:
+            print(f"Error loading query cache: {str(e)}")
+            return
+
+        now = time.time()
+        # Oldest first, so the most recent entries survive the size bound
+        for i in np.argsort(timestamps):
+            key = str(keys[i])
+            if not key.startswith(f"{self.model_name}\n"):
+                continue
+            if self._expired(float(timestamps[i]), now):
+                continue
+            self._entries[key] = (embeddings[i], float(timestamps[i]))
+
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get cache size and hit/miss counters"""
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._entries),
+            "max_size": self.max_size,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": (self.hits / lookups) if lookups else 0.0,
+            "evictions": self.evictions
+        }
+
+
+class ChunkEmbeddingCache:
+    """Persistent, content-addressed cache of chunk embeddings.
+
+    Each embedding is stored in SQLite under a SHA-256 of the model id and
+    the chunk text, so identical chunks are only ever encoded once per model.
+    """
+
+    def __init__(self, model_name: str = config.EMBEDDING_MODEL, db_path: Path = config.CHUNK_CACHE_FILE):
+        self.model_name = model_name
+        self.db_path = Path(db_path)
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(self.db_path), check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS chunk_embeddings ("
+            "key TEXT PRIMARY KEY, dim INTEGER NOT NULL, embedding BLOB NOT NULL)"
+        )
+        self._conn.commit()
+
+        # Metrics
+        self.hits = 0
+        self.misses = 0
+
+    def key(self, text: str) -> str:
+        """Content address for a chunk under the current model"""
+        return hashlib.sha256(f"{self.model_name}\n{text}".encode("utf-8")).hexdigest()
+
+    def get_many(self, texts: List[str]) -> Dict[int, np.ndarray]:
+        """Look up cached embeddings, returning {index in texts: embedding} for hits"""
+        keys = [self.key(text) for text in texts]
+        found = {}
+
+        with self._lock:
+            unique_keys = list(set(keys))
+            # Stay under SQLite's bound-parameter limit
+            for start in range(0, len(unique_keys), 500):
+                batch = unique_keys[start:start + 500]
+                placeholders = ",".join("?" * len(batch))
+                rows = self._conn.execute(
+                    f"SELECT key, embedding FROM chunk_embeddings WHERE key IN ({placeholders})",
+                    batch
+                ).fetchall()
+                for key, blob in rows:
+                    found[key] = np.frombuffer(blob, dtype=np.float32)
+
+        hits = {i: found[key] for i, key in enumerate(keys) if key in found}
+        self.hits += len(hits)
+        self.misses += len(texts) - len(hits)
+        return hits
+
+    def put_many(self, texts: List[str], embeddings):
+        """Store embeddings for the given chunk texts"""
+        rows = []
+        for text, embedding in zip(texts, embeddings):
+            vector = np.asarray(embedding, dtype=np.float32)
+            rows.append((self.key(text), int(vector.shape[0]), vector.tobytes()))
+
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO chunk_embeddings (key, dim, embedding) VALUES (?, ?, ?)",
+                rows
+            )
+            self._conn.commit()
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get hit/miss counters"""
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": (self.hits / lookups) if lookups else 0.0
+        }
+
+    def close(self):
+        """Close the SQLite connection"""
+        with self._lock:
+            self._conn.close()
@@ -1,116 +1,605 @@
 import os
 import json
-import chromadb
-from chromadb.config import Settings
-from sentence_transformers import SentenceTransformer
-from typing import List, Dict, Any, Optional
+import time
+import asyncio
+import numpy as np
+from typing import List, Dict, Any, Optional, Tuple
 from pathlib import Path
 import uuid
 
+from backend import config
+from backend.services.bm25_index import BM25Index, reciprocal_rank_fusion
+from backend.services.chunking import chunk_hash
+from backend.services.embedding_cache import ChunkEmbeddingCache, QueryEmbeddingCache
+from backend.services.encoder_pool import EncoderPool
+from backend.services.quantized_index import QuantizedVectorIndex, id_set_checksum, normalize_rows
+from backend.services.query_batcher import QueryBatcher
+from backend.services.rw_lock import AsyncRWLock
+from backend.services.vector_store import VectorStore, create_vector_store
+
 class EmbeddingService:
     def __init__(self):
-        self.embedding_model = SentenceTransformer('all-MiniLM-L6-v2')
-        
-        # Initialize ChromaDB
-        self.chroma_client = chromadb.PersistentClient(
-            path="data/embeddings",
-            settings=Settings(anonymized_telemetry=False)
-        )
-        
-        # Create or get collection
-        self.collection = self.chroma_client.get_or_create_collection(
-            name="documents",
-            metadata={"hnsw:space": "cosine"}
-        )
-    
-    async def create_embeddings(self, text_chunks: List[str], doc_id: str, filename: str):
-        """Create embeddings for text chunks and store in ChromaDB"""
+        # The model and vector store are loaded by initialize(), not here, so
+        # that constructing the service (and importing the app) stays cheap
+        self.embedding_model = None
+        self.encoder_pool = None
+        self.query_batcher = None
+        self.vector_store: Optional[VectorStore] = None
+        self.quantized_index = None
+        self.bm25_index = None
+        
+        self._ready = False
+        self._init_lock = asyncio.Lock()
+        
+        # Searches read the indexes together; changes to stored chunks take the
+        # write side, so a query never sees a half-applied document update
+        self._index_lock = AsyncRWLock()
+        self._write_batches = 0
+        self._write_rows = 0
+        self._write_total = 0.0
+        self._write_max = 0.0
+        self._write_lock_wait_total = 0.0
+        self._write_lock_wait_max = 0.0
+        
+        # Repeated queries skip the transformer entirely
+        self.query_cache = QueryEmbeddingCache(config.EMBEDDING_MODEL)
+        
+        # Chunks seen before (boilerplate, re-uploads) are served from disk
+        self.chunk_cache = ChunkEmbeddingCache(config.EMBEDDING_MODEL) if config.CHUNK_CACHE_ENABLED else None
+    
+    @property
+    def is_ready(self) -> bool:
+        return self._ready
+    
+    def _load_model(self):
+        """Load the SentenceTransformer model"""
+        from sentence_transformers import SentenceTransformer
+        return SentenceTransformer(config.EMBEDDING_MODEL)
+    
+    async def initialize(self):
+        """Load the model and open the vector store concurrently, then warm up the encoder"""
+        async with self._init_lock:
+            if self._ready:
+                return
+            
+            start_time = time.time()
+            self.embedding_model, self.vector_store = await asyncio.gather(
+                asyncio.to_thread(self._load_model),
+                asyncio.to_thread(create_vector_store)
+            )
+            
+            # All encode calls run in the encoder pool, off the event loop
+            self.encoder_pool = EncoderPool(self.embedding_model)
+            
+            # Concurrent query encodes are coalesced into shared batches
+            self.query_batcher = QueryBatcher(self.encoder_pool)
+            
+            if config.EMBEDDING_STORAGE != "float32":
+                self.quantized_index = QuantizedVectorIndex(config.EMBEDDING_STORAGE)
+                await asyncio.to_thread(self._sync_quantized_index)
+            
+            if config.HYBRID_SEARCH:
+                self.bm25_index = BM25Index()
+                await asyncio.to_thread(self._sync_bm25_index)
+            
+            # Warm-up encode so the first real request doesn't pay for lazy torch setup
+            await self.encoder_pool.encode(["warm-up"], convert_to_tensor=False)
+            
+            self._ready = True
+            print(f"Embedding service ready in {time.time() - start_time:.2f}s")
+    
+    def _sync_quantized_index(self):
+        """Rebuild the quantized index from the vector store if it is missing or stale"""
+        total = self.vector_store.count()
+        # The index is saved on shutdown, so after a crash it can hold the right
+        # number of vectors for the wrong chunks; compare the id sets, not counts
+        if len(self.quantized_index) == total and (
+            self.quantized_index.checksum() == id_set_checksum(self.vector_store.iter_ids())
+        ):
+            return
+        
+        print(f"Rebuilding {self.quantized_index.dtype} index for {total} chunks")
+        self.quantized_index.clear()
+        for ids, embeddings in self.vector_store.iter_embeddings():
+            self.quantized_index.add(ids, embeddings)
+        self.quantized_index.save()
+    
+    def _sync_bm25_index(self):
+        """Rebuild the keyword index from the vector store if it is missing or stale"""
+        total = self.vector_store.count()
+        # As with the quantized index, matching counts can hide different chunks
+        if len(self.bm25_index) == total and (
+            id_set_checksum(self.bm25_index.iter_ids()) == id_set_checksum(self.vector_store.iter_ids())
+        ):
+            return
+        
+        print(f"Rebuilding keyword index for {total} chunks")
+        self.bm25_index.clear()
+        for ids, _ in self.vector_store.iter_embeddings():
+            stored = self.vector_store.get_by_ids(ids)
+            self.bm25_index.add(
+                stored['ids'],
+                stored['documents'],
+                [metadata["document_id"] for metadata in stored['metadatas']]
+            )
+    
+    async def ensure_ready(self):
+        """Initialize on first use when startup loading was deferred"""
+        if not self._ready:
+            await self.initialize()
+    
+    async def embed_chunks(self, text_chunks: List[str]) -> np.ndarray:
+        """Encode text chunks (cache misses only)"""
+        await self.ensure_ready()
+        return await self._encode_chunks(text_chunks)
+    
+    async def index_chunks(
+        self,
+        text_chunks: List[str],
+        embeddings: np.ndarray,
+        doc_id: str,
+        filename: str,
+        start_index: int = 0
+    ):
+        """Store encoded chunks in the vector store and secondary indexes.
+        
+        ``start_index`` is the position of the first chunk in the document,
+        so a document can be indexed in several batches.
+        """
         if not text_chunks:
             return
         
-        # Generate embeddings
-        embeddings = self.embedding_model.encode(text_chunks, convert_to_tensor=False)
+        await self.ensure_ready()
         
-        # Prepare data for ChromaDB
-        ids = [f"{doc_id}_{i}" for i in range(len(text_chunks))]
+        # Prepare data for the vector store
+        ids = [f"{doc_id}_{i}" for i in range(start_index, start_index + len(text_chunks))]
         metadatas = [
-            {
-                "document_id": doc_id,
-                "filename": filename,
-                "chunk_index": i,
-                "text_length": len(chunk)
-            }
-            for i, chunk in enumerate(text_chunks)
+            self._chunk_metadata(doc_id, filename, i, chunk)
+            for i, chunk in enumerate(text_chunks, start=start_index)
         ]
         
-        # Store in ChromaDB
-        self.collection.add(
-            ids=ids,
-            embeddings=embeddings.tolist(),
-            documents=text_chunks,
-            metadatas=metadatas
-        )
+        # Store in the vector store
+        await self._write_in_batches(ids, embeddings, text_chunks, metadatas)
         
         print(f"Created {len(text_chunks)} embeddings for document {filename}")
     
-    async def search_similar_documents(self, query: str, top_k: int = 3) -> List[Dict[str, Any]]:
-        """Search for similar documents using embeddings"""
+    async def index_chunk_batch(self, entries: List[Tuple[str, str, int, str]], embeddings: np.ndarray):
+        """Store encoded chunks from several documents in one index write.
+        
+        Each entry is (doc_id, filename, chunk_index, text).
+        """
+        if not entries:
+            return
+        
+        await self.ensure_ready()
+        
+        ids = [f"{doc_id}_{chunk_index}" for doc_id, _, chunk_index, _ in entries]
+        texts = [text for _, _, _, text in entries]
+        metadatas = [
+            self._chunk_metadata(doc_id, filename, chunk_index, text)
+            for doc_id, filename, chunk_index, text in entries
+        ]
+        
+        await self._write_in_batches(ids, embeddings, texts, metadatas)
+    
+    async def _write_in_batches(
+        self,
+        ids: List[str],
+        embeddings: np.ndarray,
+        text_chunks: List[str],
+        metadatas: List[Dict[str, Any]]
+    ):
+        """Add chunks in INDEX_WRITE_BATCH_SIZE batches, taking the index lock per batch.
+        
+        Searches waiting on the lock get in between batches instead of behind
+        the whole write. Ingestion callers encode the next batches while this
+        runs, up to INDEX_WRITE_QUEUE_SIZE batches ahead.
+        """
+        batch_size = max(1, config.INDEX_WRITE_BATCH_SIZE)
+        for start in range(0, len(ids), batch_size):
+            batch = slice(start, start + batch_size)
+            requested = time.perf_counter()
+            async with self._index_lock.write():
+                acquired = time.perf_counter()
+                await asyncio.to_thread(
+                    self._write_chunks,
+                    ids[batch], embeddings[batch], text_chunks[batch], metadatas[batch],
+                    [], [], []
+                )
+            self._record_write(len(ids[batch]), acquired - requested, time.perf_counter() - acquired)
+    
+    def _record_write(self, rows: int, lock_wait: float, duration: float):
+        self._write_batches += 1
+        self._write_rows += rows
+        self._write_total += duration
+        self._write_max = max(self._write_max, duration)
+        self._write_lock_wait_total += lock_wait
+        self._write_lock_wait_max = max(self._write_lock_wait_max, lock_wait)
+    
+    @staticmethod
+    def _chunk_metadata(doc_id: str, filename: str, chunk_index: int, chunk: str) -> Dict[str, Any]:
+        return {
+            "document_id": doc_id,
+            "filename": filename,
+            "chunk_index": chunk_index,
+            "text_length": len(chunk),
+            "chunk_hash": chunk_hash(chunk),
+            "embedding_model": config.EMBEDDING_MODEL
+        }
+    
+    def _write_chunks(
+        self,
+        ids: List[str],
+        embeddings: Optional[np.ndarray],
+        text_chunks: List[str],
+        metadatas: List[Dict[str, Any]],
+        updated_ids: List[str],
+        updated_metadatas: List[Dict[str, Any]],
+        removed_ids: List[str]
+    ):
+        """Apply added, re-positioned and removed chunks to every index"""
+        if ids:
+            self.vector_store.add(ids, embeddings, text_chunks, metadatas)
+            if self.quantized_index is not None:
+                self.quantized_index.add(ids, embeddings)
+            if self.bm25_index is not None:
+                self.bm25_index.add(ids, text_chunks, [metadata["document_id"] for metadata in metadatas])
+        
+        if updated_ids:
+            self.vector_store.update_metadata(updated_ids, updated_metadatas)
+        
+        if removed_ids:
+            self.vector_store.delete(removed_ids)
+            if self.quantized_index is not None:
+                self.quantized_index.remove(removed_ids)
+            if self.bm25_index is not None:
+                self.bm25_index.delete(removed_ids)
+    
+    async def update_document_chunks(
+        self,
+        text_chunks: List[str],
+        doc_id: str,
+        filename: str,
+        revision: int,
+        generation: int = 0
+    ) -> Dict[str, int]:
+        """Replace a document's chunks with a new version, embedding only what changed.
+        
+        Stored chunks are matched to the new ones by content hash; a stored
+        chunk embedded by a different model never matches. Matches are kept
+        (with their position updated), new chunks are embedded and added as
+        ``{doc_id}_r{revision}_{i}`` (``{doc_id}_r{revision}g{generation}_{i}``
+        when re-indexing an unchanged revision), and chunks no longer present
+        are deleted. New chunks are added in INDEX_WRITE_BATCH_SIZE batches, so
+        searches are not held up behind a large update; until the last write
+        swaps out the old chunks, searches can see both versions' chunks. If
+        adding fails, the chunks already added are removed again.
+        """
+        await self.ensure_ready()
+        
+        stored = await asyncio.to_thread(self.vector_store.get_document, doc_id)
+        stored_by_hash: Dict[str, List[str]] = {}
+        # Chunks from another (or an unrecorded) model must be re-embedded
+        stale_ids = []
+        for chunk_id, text, metadata in zip(stored['ids'], stored['documents'], stored['metadatas']):
+            if metadata.get("embedding_model") != config.EMBEDDING_MODEL:
+                stale_ids.append(chunk_id)
+                continue
+            # Chunks indexed before hashes were stored are hashed from their text
+            digest = metadata.get("chunk_hash") or chunk_hash(text)
+            stored_by_hash.setdefault(digest, []).append(chunk_id)
+        
+        id_prefix = f"{doc_id}_r{revision}" + (f"g{generation}" if generation else "")
+        kept_ids, kept_metadatas = [], []
+        new_ids, new_chunks, new_metadatas = [], [], []
+        for i, chunk in enumerate(text_chunks):
+            metadata = self._chunk_metadata(doc_id, filename, i, chunk)
+            matches = stored_by_hash.get(metadata["chunk_hash"])
+            if matches:
+                kept_ids.append(matches.pop())
+                kept_metadatas.append(metadata)
+            else:
+                new_ids.append(f"{id_prefix}_{i}")
+                new_chunks.append(chunk)
+                new_metadatas.append(metadata)
+        removed_ids = stale_ids + [chunk_id for chunk_ids in stored_by_hash.values() for chunk_id in chunk_ids]
+        
+        # Encode before taking the lock; searches keep using the old version meanwhile
+        embeddings = await self._encode_chunks(new_chunks) if new_chunks else None
+        
         try:
-            # Generate query embedding
-            query_embedding = self.embedding_model.encode([query], convert_to_tensor=False)
-            
-            # Search in ChromaDB
-            results = self.collection.query(
-                query_embeddings=query_embedding.tolist(),
-                n_results=top_k
+            await self._write_in_batches(new_ids, embeddings, new_chunks, new_metadatas)
+        except BaseException:
+            # Leave the old version in place, without a partial copy of the new one
+            async with self._index_lock.write():
+                await asyncio.to_thread(self._write_chunks, [], None, [], [], [], [], new_ids)
+            raise
+        
+        async with self._index_lock.write():
+            await asyncio.to_thread(
+                self._write_chunks,
+                [], None, [], [],
+                kept_ids, kept_metadatas,
+                removed_ids
             )
+        
+        print(f"Updated document {filename}: {len(new_ids)} chunks added, "
+              f"{len(removed_ids)} removed, {len(kept_ids)} unchanged")
+        return {"added": len(new_ids), "removed": len(removed_ids), "unchanged": len(kept_ids)}
+    
+    async def _encode_chunks(self, text_chunks: List[str]) -> np.ndarray:
+        """Encode chunks, sending only chunk-cache misses to the encoder"""
+        if self.chunk_cache is None:
+            return await self.encoder_pool.encode(text_chunks, convert_to_tensor=False)
+        
+        cached = await asyncio.to_thread(self.chunk_cache.get_many, text_chunks)
+        missing = [i for i in range(len(text_chunks)) if i not in cached]
+        
+        if missing:
+            missing_texts = [text_chunks[i] for i in missing]
+            encoded = await self.encoder_pool.encode(missing_texts, convert_to_tensor=False)
+            await asyncio.to_thread(self.chunk_cache.put_many, missing_texts, encoded)
+            for i, embedding in zip(missing, encoded):
+                cached[i] = embedding
+        
+        return np.stack([cached[i] for i in range(len(text_chunks))]).astype(np.float32)
+    
+    async def _encode_query(self, query: str):
+        """Get a query embedding from the cache, encoding it on a miss"""
+        query_embedding = self.query_cache.get(query)
+        if query_embedding is None:
+            query_embedding = await self.query_batcher.encode(query)
+            self.query_cache.put(query, query_embedding)
+        return query_embedding
+    
+    async def _encode_queries(self, queries: List[str]) -> List[np.ndarray]:
+        """Get embeddings for many queries, encoding all cache misses in one call"""
+        embeddings = [self.query_cache.get(query) for query in queries]
+        missing = [i for i, embedding in enumerate(embeddings) if embedding is None]
+        
+        if missing:
+            encoded = await self.encoder_pool.encode([queries[i] for i in missing], convert_to_tensor=False)
+            for i, embedding in zip(missing, encoded):
+                embeddings[i] = embedding
+                self.query_cache.put(queries[i], embedding)
+        
+        return embeddings
+    
+    async def search_batch(
+        self,
+        queries: List[str],
+        top_k: int = 3,
+        document_ids: Optional[List[str]] = None
+    ) -> List[List[Dict[str, Any]]]:
+        """Search for many queries with one encode call and one index round-trip"""
+        await self.ensure_ready()
+        
+        if not queries:
+            return []
+        if document_ids is not None and not document_ids:
+            return [[] for _ in queries]
+        
+        n_candidates = top_k * config.HYBRID_CANDIDATES_FACTOR if self.bm25_index is not None else top_k
+        
+        # Encode outside the lock, so index writers never wait on the encoder
+        query_embeddings = await self._encode_queries(queries)
+        
+        async def vector_search_all() -> List[List[Dict[str, Any]]]:
+            if self.quantized_index is not None:
+                results = await asyncio.to_thread(
+                    self._query_quantized, np.stack(query_embeddings), n_candidates, document_ids
+                )
+            else:
+                results = await asyncio.to_thread(
+                    self.vector_store.query, np.stack(query_embeddings), n_candidates, document_ids
+                )
+            return [self._format_results(results, i) for i in range(len(queries))]
+        
+        async with self._index_lock.read():
+            if self.bm25_index is None:
+                return await vector_search_all()
             
-            # Format results
-            similar_docs = []
-            if results['documents'] and results['documents'][0]:
-                for i, doc in enumerate(results['documents'][0]):
-                    similar_docs.append({
-                        "content": doc,
-                        "metadata": results['metadatas'][0][i],
-                        "distance": results['distances'][0][i] if results['distances'] else 0
-                    })
+            vector_docs, keyword_hits = await asyncio.gather(
+                vector_search_all(),
+                asyncio.to_thread(self.bm25_index.search_batch, queries, n_candidates, document_ids)
+            )
+            return await self._fuse_results(vector_docs, keyword_hits, top_k)
+    
+    async def search_similar_documents(
+        self,
+        query: str,
+        top_k: int = 3,
+        document_ids: Optional[List[str]] = None
+    ) -> List[Dict[str, Any]]:
+        """Search for similar documents using embeddings, fused with keyword search when enabled.
+        
+        When document_ids is given, only those documents' chunks are searched;
+        the restriction is applied inside each index query.
+        """
+        await self.ensure_ready()
+        
+        if document_ids is not None and not document_ids:
+            return []
+        
+        try:
+            # Encode outside the lock, so index writers never wait on the encoder
+            query_embedding = await self._encode_query(query)
             
-            return similar_docs
+            async with self._index_lock.read():
+                if self.bm25_index is None:
+                    return await self._vector_search(query_embedding, top_k, document_ids)
+                
+                # Vector and keyword search run in parallel over a wider candidate pool
+                n_candidates = top_k * config.HYBRID_CANDIDATES_FACTOR
+                vector_docs, keyword_hits = await asyncio.gather(
+                    self._vector_search(query_embedding, n_candidates, document_ids),
+                    asyncio.to_thread(self.bm25_index.search, query, n_candidates, document_ids)
+                )
+                return (await self._fuse_results([vector_docs], [keyword_hits], top_k))[0]
         
         except Exception as e:
             print(f"Error searching similar documents: {str(e)}")
             return []
     
+    async def _vector_search(
+        self,
+        query_embedding,
+        top_k: int,
+        document_ids: Optional[List[str]] = None
+    ) -> List[Dict[str, Any]]:
+        """Embedding search for a single encoded query"""
+        # Search the vector store, or the quantized vectors when enabled
+        if self.quantized_index is not None:
+            results = await asyncio.to_thread(self._query_quantized, query_embedding, top_k, document_ids)
+        else:
+            results = await asyncio.to_thread(self.vector_store.query, [query_embedding], top_k, document_ids)
+        
+        return self._format_results(results, 0)
+    
+    def _format_results(self, results: Dict[str, Any], query_index: int) -> List[Dict[str, Any]]:
+        """Format one query's rows of a VectorStore.query result"""
+        similar_docs = []
+        if results['documents'] and results['documents'][query_index]:
+            for i, doc in enumerate(results['documents'][query_index]):
+                distance = results['distances'][query_index][i] if results['distances'] else 0
+                similar_docs.append({
+                    "id": results['ids'][query_index][i],
+                    "content": doc,
+                    "metadata": results['metadatas'][query_index][i],
+                    "distance": distance,
+                    "score": 1 - distance
+                })
+        
+        return similar_docs
+    
+    async def _fuse_results(
+        self,
+        vector_docs: List[List[Dict[str, Any]]],
+        keyword_hits: List[List[Tuple[str, float]]],
+        top_k: int
+    ) -> List[List[Dict[str, Any]]]:
+        """Combine each query's vector and keyword rankings with reciprocal rank fusion.
+        
+        Keyword-only hits of every query are hydrated in one vector store read.
+        """
+        fused_per_query = [
+            reciprocal_rank_fusion(
+                [[doc["id"] for doc in docs], [chunk_id for chunk_id, _ in hits]],
+                k=config.RRF_K
+            )[:top_k]
+            for docs, hits in zip(vector_docs, keyword_hits)
+        ]
+        
+        # Keyword-only hits still need their text and metadata (but no distance);
+        # another query's vector results may already have them
+        keyword_only: Dict[str, Dict[str, Any]] = {}
+        for docs in vector_docs:
+            for doc in docs:
+                keyword_only.setdefault(doc["id"], {**doc, "distance": None})
+        missing = list(dict.fromkeys(
+            chunk_id for fused in fused_per_query for chunk_id, _ in fused if chunk_id not in keyword_only
+        ))
+        if missing:
+            stored = await asyncio.to_thread(self.vector_store.get_by_ids, missing)
+            for i, chunk_id in enumerate(stored['ids']):
+                keyword_only[chunk_id] = {
+                    "id": chunk_id,
+                    "content": stored['documents'][i],
+                    "metadata": stored['metadatas'][i],
+                    "distance": None
+                }
+        
+        results = []
+        for docs, fused in zip(vector_docs, fused_per_query):
+            docs_by_id = {doc["id"]: doc for doc in docs}
+            similar_docs = []
+            for chunk_id, score in fused:
+                doc = docs_by_id.get(chunk_id) or keyword_only.get(chunk_id)
+                if doc is not None:
+                    similar_docs.append({**doc, "score": score})
+            results.append(similar_docs)
+        
+        return results
+    
+    def _query_quantized(
+        self,
+        query_embeddings,
+        top_k: int,
+        document_ids: Optional[List[str]] = None
+    ) -> Dict[str, Any]:
+        """Scan the quantized index, then re-score candidates with the float32 vectors.
+        
+        Takes one query embedding or several, and returns results in the same
+        shape as VectorStore.query. The document filter is resolved once and the
+        candidates of all queries are fetched from the vector store together.
+        """
+        queries = normalize_rows(np.asarray(query_embeddings, dtype=np.float32))
+        restrict_to = self.vector_store.get_chunk_ids(document_ids) if document_ids is not None else None
+        candidates = [
+            [chunk_id for chunk_id, _ in self.quantized_index.search(
+                query,
+                n_candidates=top_k * config.RESCORE_CANDIDATES_FACTOR,
+                restrict_to=restrict_to
+            )]
+            for query in queries
+        ]
+        
+        results = {"ids": [], "documents": [], "metadatas": [], "distances": []}
+        wanted = list(dict.fromkeys(chunk_id for ids in candidates for chunk_id in ids))
+        stored = self.vector_store.get_by_ids(wanted, include_embeddings=True) if wanted else {"ids": []}
+        if not stored['ids']:
+            for key in results:
+                results[key] = [[] for _ in queries]
+            return results
+        
+        positions = {chunk_id: i for i, chunk_id in enumerate(stored['ids'])}
+        vectors = normalize_rows(np.asarray(stored['embeddings'], dtype=np.float32))
+        for query, ids in zip(queries, candidates):
+            rows = np.asarray([positions[chunk_id] for chunk_id in ids if chunk_id in positions], dtype=np.int64)
+            # Exact cosine similarity against the full-precision vectors
+            similarities = vectors[rows] @ query
+            order = rows[np.argsort(-similarities)[:top_k]]
+            scores = np.sort(similarities)[::-1][:top_k]
+            results["ids"].append([stored['ids'][i] for i in order])
+            results["documents"].append([stored['documents'][i] for i in order])
+            results["metadatas"].append([stored['metadatas'][i] for i in order])
+            results["distances"].append([float(1 - score) for score in scores])
+        return results
+    
     async def delete_document_embeddings(self, doc_id: str):
         """Delete all embeddings for a specific document"""
+        await self.ensure_ready()
+        
         try:
-            # Get all IDs for this document
-            results = self.collection.get(
-                where={"document_id": doc_id}
-            )
+            async with self._index_lock.write():
+                deleted_ids = await asyncio.to_thread(self.vector_store.delete_document, doc_id)
+                if self.bm25_index is not None:
+                    await asyncio.to_thread(self.bm25_index.delete_document, doc_id)
+                if deleted_ids and self.quantized_index is not None:
+                    await asyncio.to_thread(self.quantized_index.remove, deleted_ids)
             
-            if results['ids']:
-                # Delete the embeddings
-                self.collection.delete(ids=results['ids'])
+            if deleted_ids:
                 print(f"Deleted embeddings for document {doc_id}")
         
         except Exception as e:
             print(f"Error deleting embeddings for document {doc_id}: {str(e)}")
     
     async def get_document_count(self) -> int:
-        """Get total number of document chunks in the collection"""
+        """Get total number of document chunks in the vector store"""
+        await self.ensure_ready()
+        
         try:
-            count = self.collection.count()
+            count = self.vector_store.count()
             return count
         except:
             return 0
     
     async def get_documents_by_id(self, doc_id: str) -> List[Dict[str, Any]]:
         """Get all chunks for a specific document"""
+        await self.ensure_ready()
+        
         try:
-            results = self.collection.get(
-                where={"document_id": doc_id}
-            )
+            results = await asyncio.to_thread(self.vector_store.get_document, doc_id)
             
             documents = []
             if results['documents']:
@@ -125,4 +614,40 @@ class EmbeddingService:
         
         except Exception as e:
             print(f"Error getting documents for {doc_id}: {str(e)}")
-            return []
\ No newline at end of file
+            return []
+    
+    def get_stats(self) -> Dict[str, Any]:
+        """Get runtime metrics for the embedding pipeline"""
+        return {
+            "ready": self._ready,
+            "vector_store": config.VECTOR_STORE,
+            "encoder": self.encoder_pool.get_stats() if self.encoder_pool else None,
+            "query_batcher": self.query_batcher.get_stats() if self.query_batcher else None,
+            "query_cache": self.query_cache.get_stats(),
+            "chunk_cache": self.chunk_cache.get_stats() if self.chunk_cache else None,
+            "quantized_index": self.quantized_index.get_stats() if self.quantized_index else None,
+            "bm25_index": self.bm25_index.get_stats() if self.bm25_index else None,
+            "index_writes": {
+                "batch_size": config.INDEX_WRITE_BATCH_SIZE,
+                "batches": self._write_batches,
+                "rows": self._write_rows,
+                "avg_write_ms": (self._write_total / self._write_batches * 1000) if self._write_batches else 0.0,
+                "max_write_ms": self._write_max * 1000,
+                "avg_lock_wait_ms": (self._write_lock_wait_total / self._write_batches * 1000) if self._write_batches else 0.0,
+                "max_lock_wait_ms": self._write_lock_wait_max * 1000
+            }
+        }
+    
+    def close(self):
+        """Persist caches and release the encoder pool"""
+        self.query_cache.save()
+        if self.quantized_index is not None:
+            self.quantized_index.save()
+        if self.chunk_cache:
+            self.chunk_cache.close()
+        if self.encoder_pool:
+            self.encoder_pool.shutdown()
+        if self.bm25_index is not None:
+            self.bm25_index.close()
+        if self.vector_store:
+            self.vector_store.close()
\ No newline at end of file
@@ -0,0 +1,138 @@
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+from typing import List, Dict, Any, Optional, Tuple
+
+from backend import config
+
+# Model instance owned by each worker process when running in process-pool mode
+_process_model = None
+
+
+def _configure_torch_threads(num_threads: int):
+    """Limit torch intra-op threads so encoder workers don't oversubscribe the CPU"""
+    if num_threads <= 0:
+        return
+    try:
+        import torch
+        torch.set_num_threads(num_threads)
+    except ImportError:
+        pass
+
+
+def _init_process_worker(model_name: str, torch_threads: int):
+    """Load the embedding model once per worker process"""
+    global _process_model
+    from sentence_transformers import SentenceTransformer
+
+    _configure_torch_threads(torch_threads)
+    _process_model = SentenceTransformer(model_name)
+
+
+def _encode_in_process(texts: List[str], kwargs: Dict[str, Any]) -> Tuple[float, Any]:
+    """Encode texts with the worker process's model"""
+    started_at = time.time()
+    return started_at, _process_model.encode(texts, **kwargs)
+
+
+class EncoderPool:
+    """Runs SentenceTransformer encode calls off the event loop.
+
+    All encoding goes through a dedicated executor so that a large ingest
+    cannot block request handling. By default a thread pool shares the
+    already-loaded model; with ``use_processes`` each worker process loads
+    its own copy of the model instead.
+    """
+
+    def __init__(
+        self,
+        model=None,
+        model_name: str = config.EMBEDDING_MODEL,
+        max_workers: int = config.ENCODER_WORKERS,
+        torch_threads: int = config.ENCODER_TORCH_THREADS,
+        use_processes: bool = config.ENCODER_USE_PROCESSES
+    ):
+        self.model = model
+        self.model_name = model_name
+        self.max_workers = max(1, max_workers)
+        self.use_processes = use_processes
+
+        if use_processes:
+            self.executor = ProcessPoolExecutor(
+                max_workers=self.max_workers,
+                initializer=_init_process_worker,
+                initargs=(model_name, torch_threads)
+            )
+        else:
+            if model is None:
+                raise ValueError("A loaded model is required for the thread-pool encoder")
+            _configure_torch_threads(torch_threads)
+            self.executor = ThreadPoolExecutor(
+                max_workers=self.max_workers,
+                thread_name_prefix="encoder"
+            )
+
+        # Metrics (queue depth counts calls submitted but not yet finished)
+        self._lock = threading.Lock()
+        self._queued = 0
+        self._calls = 0
+        self._texts = 0
+        self._total_wait = 0.0
+        self._max_wait = 0.0
+        self._total_encode = 0.0
+
+    def _encode_in_thread(self, texts: List[str], kwargs: Dict[str, Any]) -> Tuple[float, Any]:
+        """Encode texts with the shared model"""
+        started_at = time.time()
+        return started_at, self.model.encode(texts, **kwargs)
+
+    async def encode(self, texts: List[str], **kwargs):
+        """Encode texts in the executor and return the embeddings"""
+        kwargs.setdefault("convert_to_tensor", False)
+        loop = asyncio.get_running_loop()
+        submitted_at = time.time()
+
+        with self._lock:
+            self._queued += 1
+
+        try:
+            if self.use_processes:
+                future = loop.run_in_executor(self.executor, _encode_in_process, texts, kwargs)
+            else:
+                future = loop.run_in_executor(self.executor, self._encode_in_thread, texts, kwargs)
+            started_at, embeddings = await future
+        finally:
+            with self._lock:
+                self._queued -= 1
+
+        finished_at = time.time()
+        wait_time = max(0.0, started_at - submitted_at)
+
+        with self._lock:
+            self._calls += 1
+            self._texts += len(texts)
+            self._total_wait += wait_time
+            self._max_wait = max(self._max_wait, wait_time)
+            self._total_encode += finished_at - started_at
+
+        return embeddings
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get queue depth and timing metrics for the encoder"""
+        with self._lock:
+            calls = self._calls
+            return {
+                "mode": "process" if self.use_processes else "thread",
+                "workers": self.max_workers,
+                "queue_depth": self._queued,
+                "calls": calls,
+                "texts_encoded": self._texts,
+                "avg_wait_ms": (self._total_wait / calls * 1000) if calls else 0.0,
+                "max_wait_ms": self._max_wait * 1000,
+                "avg_encode_ms": (self._total_encode / calls * 1000) if calls else 0.0
+            }
+
+    def shutdown(self, wait: bool = True):
+        """Shut down the executor"""
+        self.executor.shutdown(wait=wait)
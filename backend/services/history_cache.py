@@ -0,0 +1,259 @@
+import asyncio
+import time
+from collections import OrderedDict, deque
+from datetime import datetime
+from typing import List, Dict, Any, Optional, Tuple
+
+from backend import config
+from backend.models.chat_model import ChatMessage
+from backend.services.history_store import HistoryStore
+
+# A pending write: ("append", messages) or ("clear", None)
+Operation = Tuple[str, Optional[List[ChatMessage]]]
+
+
+class _CachedSession:
+    __slots__ = ("messages", "complete")
+
+    def __init__(self, messages: List[ChatMessage], max_messages: int, complete: bool):
+        self.messages = deque(messages, maxlen=max_messages)
+        # Whether ``messages`` holds the session's entire history
+        self.complete = complete and len(messages) <= max_messages
+
+
+class HistoryCache:
+    """LRU cache of hot sessions' recent messages with write-behind to a HistoryStore.
+
+    Reads of a cached session never touch the store. Writes update the cache
+    immediately and are queued; a background task applies them to the store
+    in one batch every ``write_behind_seconds`` (the durability window: a
+    crash loses at most that much history), or sooner once
+    ``flush_batch_size`` messages are waiting. A window of 0 writes through.
+    Pending writes are kept apart from the LRU, so evicting a session never
+    drops them.
+    """
+
+    def __init__(
+        self,
+        store: HistoryStore,
+        max_sessions: int = config.HISTORY_CACHE_SESSIONS,
+        max_messages: int = config.HISTORY_CACHE_MESSAGES,
+        write_behind_seconds: float = config.HISTORY_WRITE_BEHIND_SECONDS,
+        flush_batch_size: int = config.HISTORY_FLUSH_BATCH_SIZE,
+        flush_on_shutdown: bool = config.HISTORY_FLUSH_ON_SHUTDOWN
+    ):
+        self.store = store
+        self.max_sessions = max(1, max_sessions)
+        self.max_messages = max(1, max_messages)
+        self.write_behind_seconds = max(0.0, write_behind_seconds)
+        self.flush_batch_size = max(1, flush_batch_size)
+        self.flush_on_shutdown = flush_on_shutdown
+
+        self._sessions: "OrderedDict[str, _CachedSession]" = OrderedDict()
+        self._pending: Dict[str, List[Operation]] = {}
+        self._pending_messages = 0
+        # Serializes flushes with loads from the store, so a load never misses
+        # writes that are on their way to the store
+        self._io_lock = asyncio.Lock()
+        self._flush_requested = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+
+        # Metrics
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._flushes = 0
+        self._flushed_messages = 0
+        self._flush_total = 0.0
+        self._flush_max = 0.0
+
+    @property
+    def write_through(self) -> bool:
+        return self.write_behind_seconds == 0
+
+    async def start(self):
+        """Start the write-behind task"""
+        if not self.write_through:
+            self._task = asyncio.create_task(self._flush_periodically())
+
+    async def close(self):
+        """Stop the write-behind task, flushing pending writes if configured to"""
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+        if self.flush_on_shutdown:
+            await self.flush()
+        elif self._pending:
+            print(f"Discarding pending chat history for {len(self._pending)} sessions")
+
+    async def _flush_periodically(self):
+        while True:
+            try:
+                await asyncio.wait_for(self._flush_requested.wait(), timeout=self.write_behind_seconds)
+            except asyncio.TimeoutError:
+                pass
+            self._flush_requested.clear()
+            try:
+                await self.flush()
+            except Exception as e:
+                print(f"Error flushing chat history: {str(e)}")
+
+    async def append(self, session_id: str, messages: List[ChatMessage]):
+        """Append messages to a session"""
+        session = self._sessions.get(session_id)
+        if session is not None:
+            self._sessions.move_to_end(session_id)
+            if len(session.messages) + len(messages) > self.max_messages:
+                session.complete = False
+            session.messages.extend(messages)
+        await self._queue(session_id, ("append", messages))
+
+    async def clear(self, session_id: str):
+        """Remove all of a session's messages"""
+        self._cache(session_id, _CachedSession([], self.max_messages, complete=True))
+        # Earlier writes for the session are moot
+        self._pending_messages -= self._count(self._pending.pop(session_id, []))
+        await self._queue(session_id, ("clear", None))
+
+    async def _queue(self, session_id: str, operation: Operation):
+        self._pending.setdefault(session_id, []).append(operation)
+        self._pending_messages += self._count([operation])
+        if self.write_through:
+            await self.flush()
+        elif self._pending_messages >= self.flush_batch_size:
+            self._flush_requested.set()
+
+    @staticmethod
+    def _count(operations: List[Operation]) -> int:
+        return sum(len(messages) for op, messages in operations if op == "append")
+
+    async def read(self, session_id: str, limit: Optional[int] = None) -> List[ChatMessage]:
+        """Get a session's messages, oldest first; only the last ``limit`` if given"""
+        session = self._sessions.get(session_id)
+        if session is not None and (session.complete or (limit is not None and limit <= len(session.messages))):
+            self._sessions.move_to_end(session_id)
+            self.hits += 1
+            return self._last(list(session.messages), limit)
+
+        self.misses += 1
+        # Read enough to fill the cache entry when that covers the request
+        load_limit = self.max_messages if limit is not None and limit <= self.max_messages else limit
+        async with self._io_lock:
+            await self._flush_session(session_id)
+            messages = await asyncio.to_thread(self.store.read, session_id, load_limit)
+            complete = load_limit is None or len(messages) < load_limit
+            # Writes queued while the store was being read
+            for op, queued in self._pending.get(session_id, []):
+                if op == "append":
+                    messages = messages + queued
+                else:
+                    messages, complete = [], True
+            self._cache(session_id, _CachedSession(messages, self.max_messages, complete))
+        return self._last(messages, limit)
+
+    @staticmethod
+    def _last(messages: List[ChatMessage], limit: Optional[int]) -> List[ChatMessage]:
+        return messages[-limit:] if limit is not None and limit > 0 else messages
+
+    def _cache(self, session_id: str, session: _CachedSession):
+        self._sessions[session_id] = session
+        self._sessions.move_to_end(session_id)
+        while len(self._sessions) > self.max_sessions:
+            self._sessions.popitem(last=False)
+            self.evictions += 1
+
+    async def list_sessions(self) -> List[str]:
+        """Get the ids of sessions that have messages"""
+        await self.flush()
+        return await asyncio.to_thread(self.store.list_sessions)
+
+    async def list_session_summaries(self, offset: int, limit: int) -> Tuple[int, List[Dict[str, Any]]]:
+        """Get the total session count and one page of session summaries"""
+        await self.flush()
+        return await asyncio.to_thread(self.store.list_session_summaries, offset, limit)
+
+    async def delete_sessions_before(self, cutoff: datetime) -> int:
+        """Delete sessions with no activity since ``cutoff``"""
+        async with self._io_lock:
+            pending, self._pending = self._pending, {}
+            message_count, self._pending_messages = self._pending_messages, 0
+            await self._apply(pending, message_count)
+            deleted = await asyncio.to_thread(self.store.delete_sessions_before, cutoff)
+            # Which sessions went isn't known here; start the cache over
+            self._sessions.clear()
+        return deleted
+
+    async def flush(self):
+        """Apply every pending write to the store"""
+        async with self._io_lock:
+            pending, self._pending = self._pending, {}
+            message_count, self._pending_messages = self._pending_messages, 0
+            await self._apply(pending, message_count)
+
+    async def _flush_session(self, session_id: str):
+        """Apply one session's pending writes; the caller holds the I/O lock"""
+        operations = self._pending.pop(session_id, None)
+        if operations:
+            message_count = self._count(operations)
+            self._pending_messages -= message_count
+            await self._apply({session_id: operations}, message_count)
+
+    async def _apply(self, pending: Dict[str, List[Operation]], message_count: int):
+        if not pending:
+            return
+        start = time.perf_counter()
+        write = asyncio.ensure_future(asyncio.to_thread(self._write, pending))
+        try:
+            await asyncio.shield(write)
+        except BaseException:
+            if not write.done():
+                # Cancelled while the thread writes on; let it settle ``pending`` first
+                await asyncio.gather(write, return_exceptions=True)
+            # Put back the writes that didn't reach the store, ahead of anything queued since
+            for session_id, operations in pending.items():
+                self._pending[session_id] = operations + self._pending.get(session_id, [])
+                self._pending_messages += self._count(operations)
+            raise
+
+        elapsed = time.perf_counter() - start
+        self._flushes += 1
+        self._flushed_messages += message_count
+        self._flush_total += elapsed
+        self._flush_max = max(self._flush_max, elapsed)
+
+    def _write(self, pending: Dict[str, List[Operation]]):
+        """Apply pending writes, removing each from ``pending`` once it is in the
+        store, so a failure leaves only the unwritten ones behind"""
+        for session_id in list(pending):
+            operations = pending[session_id]
+            while operations:
+                count = 1
+                if operations[0][0] == "append":
+                    # Consecutive appends go to the store as one batch
+                    while count < len(operations) and operations[count][0] == "append":
+                        count += 1
+                    self.store.append(session_id, [message for _, messages in operations[:count] for message in messages])
+                else:
+                    self.store.clear(session_id)
+                del operations[:count]
+            del pending[session_id]
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get hit/miss counts and write-behind state"""
+        lookups = self.hits + self.misses
+        return {
+            "cached_sessions": len(self._sessions),
+            "max_sessions": self.max_sessions,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": (self.hits / lookups) if lookups else 0.0,
+            "evictions": self.evictions,
+            "dirty_sessions": len(self._pending),
+            "pending_messages": self._pending_messages,
+            "write_behind_seconds": self.write_behind_seconds,
+            "flushes": self._flushes,
+            "flushed_messages": self._flushed_messages,
+            "avg_flush_ms": (self._flush_total / self._flushes * 1000) if self._flushes else 0.0,
+            "max_flush_ms": self._flush_max * 1000
+        }
@@ -0,0 +1,567 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+import zlib
+from abc import ABC, abstractmethod
+from datetime import datetime
+from pathlib import Path
+from typing import List, Dict, Any, Optional, Tuple
+
+from backend import config
+from backend.models.chat_model import ChatMessage
+
+FSYNC_POLICIES = ("always", "interval", "never")
+
+
+class HistoryStore(ABC):
+    """Persistent chat history, one ordered message log per session"""
+
+    @abstractmethod
+    def append(self, session_id: str, messages: List[ChatMessage]):
+        """Append messages to a session"""
+
+    @abstractmethod
+    def read(self, session_id: str, limit: Optional[int] = None) -> List[ChatMessage]:
+        """Get a session's messages, oldest first; only the last ``limit`` if given"""
+
+    @abstractmethod
+    def clear(self, session_id: str):
+        """Remove all of a session's messages"""
+
+    @abstractmethod
+    def list_sessions(self) -> List[str]:
+        """Get the ids of sessions that have messages"""
+
+    @abstractmethod
+    def list_session_summaries(self, offset: int = 0, limit: int = 100) -> Tuple[int, List[Dict[str, Any]]]:
+        """Get the total session count and one page of sessions, most recently active first.
+
+        Each summary has session_id, message_count, created_at and last_activity.
+        """
+
+    @abstractmethod
+    def delete_sessions_before(self, cutoff: datetime) -> int:
+        """Delete sessions with no activity since ``cutoff``; returns how many were deleted"""
+
+    def compact(self):
+        """Reclaim space left by cleared history"""
+
+    def close(self):
+        """Flush and release resources"""
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {}
+
+
+class JsonlHistoryStore(HistoryStore):
+    """Append-only JSON Lines history, one ``{session_id}.jsonl`` file per session.
+
+    A turn is one append of a line per message, so writing no longer grows
+    with session length. Clearing appends a marker instead of rewriting;
+    ``compact`` later drops everything up to a session's last marker (or the
+    whole file). Reads scan the file backwards, so fetching the last N
+    messages only parses the tail.
+
+    ``fsync_policy`` is "always" (fsync every append), "interval" (fsync
+    pending appends once ``fsync_interval`` seconds have passed, on the next
+    append or on close) or "never" (leave it to the OS).
+    """
+
+    READ_BLOCK_SIZE = 64 * 1024
+
+    def __init__(
+        self,
+        history_dir: Path = config.CHAT_HISTORY_DIR,
+        fsync_policy: str = config.HISTORY_FSYNC_POLICY,
+        fsync_interval: float = config.HISTORY_FSYNC_INTERVAL_SECONDS
+    ):
+        if fsync_policy not in FSYNC_POLICIES:
+            raise ValueError(f"Unknown fsync policy: {fsync_policy}. Supported: {', '.join(FSYNC_POLICIES)}")
+
+        self.history_dir = Path(history_dir)
+        self.history_dir.mkdir(parents=True, exist_ok=True)
+        self.fsync_policy = fsync_policy
+        self.fsync_interval = max(0.0, fsync_interval)
+
+        # Appends, clears and compaction of one session are serialized by its stripe
+        self._locks = [threading.Lock() for _ in range(64)]
+        self._sync_lock = threading.Lock()
+        self._unsynced: set = set()
+        self._last_sync = time.monotonic()
+        self._cleared: set = set()
+
+        # Metrics
+        self._appends = 0
+        self._messages_appended = 0
+        self._fsyncs = 0
+        self._reads = 0
+        self._compactions = 0
+        self._bytes_reclaimed = 0
+
+        self.migrate_json_files()
+
+    def _path(self, session_id: str) -> Path:
+        return self.history_dir / f"{session_id}.jsonl"
+
+    def _lock(self, session_id: str) -> threading.Lock:
+        return self._locks[zlib.crc32(session_id.encode("utf-8")) % len(self._locks)]
+
+    @staticmethod
+    def _encode(records: List[Dict[str, Any]]) -> bytes:
+        return "".join(json.dumps(record) + "\n" for record in records).encode("utf-8")
+
+    @staticmethod
+    def _message_record(message: ChatMessage) -> Dict[str, Any]:
+        return {"type": "message", **message.model_dump(mode="json")}
+
+    def append(self, session_id: str, messages: List[ChatMessage]):
+        if not messages:
+            return
+        self._write(session_id, [self._message_record(message) for message in messages])
+        self._appends += 1
+        self._messages_appended += len(messages)
+
+    def clear(self, session_id: str):
+        path = self._path(session_id)
+        if not path.exists():
+            return
+        self._write(session_id, [{"type": "clear", "timestamp": datetime.now().isoformat()}])
+        self._cleared.add(session_id)
+
+    def _write(self, session_id: str, records: List[Dict[str, Any]]):
+        path = self._path(session_id)
+        data = self._encode(records)
+        with self._lock(session_id):
+            with open(path, 'a+b') as f:
+                # Don't glue the new records onto a line torn by a crash
+                if f.tell() > 0:
+                    f.seek(-1, os.SEEK_END)
+                    if f.read(1) != b"\n":
+                        data = b"\n" + data
+                f.write(data)
+                f.flush()
+                if self.fsync_policy == "always":
+                    os.fsync(f.fileno())
+                    self._fsyncs += 1
+
+        if self.fsync_policy == "interval":
+            with self._sync_lock:
+                self._unsynced.add(path)
+            if time.monotonic() - self._last_sync >= self.fsync_interval:
+                self.sync()
+
+    def sync(self):
+        """Fsync every file appended to since the last sync"""
+        with self._sync_lock:
+            paths, self._unsynced = self._unsynced, set()
+            self._last_sync = time.monotonic()
+        for path in paths:
+            try:
+                fd = os.open(path, os.O_RDONLY)
+            except FileNotFoundError:
+                continue
+            try:
+                os.fsync(fd)
+                self._fsyncs += 1
+            finally:
+                os.close(fd)
+
+    def read(self, session_id: str, limit: Optional[int] = None) -> List[ChatMessage]:
+        path = self._path(session_id)
+        if not path.exists():
+            return []
+        self._reads += 1
+        return [
+            ChatMessage(**{key: value for key, value in record.items() if key != "type"})
+            for record in self._tail(path, limit)
+        ]
+
+    def _tail(self, path: Path, limit: Optional[int]) -> List[Dict[str, Any]]:
+        """Read message records backwards from the end, stopping at a clear marker"""
+        records: List[Dict[str, Any]] = []
+        try:
+            f = open(path, 'rb')
+        except FileNotFoundError:
+            return records
+
+        with f:
+            position = f.seek(0, os.SEEK_END)
+            partial = b""
+            while position > 0 and (limit is None or len(records) < limit):
+                step = min(self.READ_BLOCK_SIZE, position)
+                position -= step
+                f.seek(position)
+                lines = (f.read(step) + partial).split(b"\n")
+                # The first line may continue in the previous block
+                partial = lines.pop(0) if position > 0 else b""
+                for line in reversed(lines):
+                    record = self._decode(line)
+                    if record is None:
+                        continue
+                    if record.get("type") == "clear":
+                        return records[::-1]
+                    records.append(record)
+                    if limit is not None and len(records) >= limit:
+                        break
+        records.reverse()
+        return records
+
+    @staticmethod
+    def _decode(line: bytes) -> Optional[Dict[str, Any]]:
+        if not line.strip():
+            return None
+        try:
+            return json.loads(line)
+        except ValueError:
+            # A record torn by a crash mid-append
+            return None
+
+    def list_sessions(self) -> List[str]:
+        return [path.stem for path in self.history_dir.glob("*.jsonl") if self._tail(path, 1)]
+
+    def list_session_summaries(self, offset: int = 0, limit: int = 100) -> Tuple[int, List[Dict[str, Any]]]:
+        # File modification time stands in for last activity; only the page is read
+        sessions = []
+        for path in self.history_dir.glob("*.jsonl"):
+            try:
+                sessions.append((path.stat().st_mtime, path))
+            except FileNotFoundError:
+                continue
+        sessions.sort(reverse=True)
+
+        summaries = []
+        for mtime, path in sessions[offset:offset + limit]:
+            records = self._tail(path, None)
+            if not records:
+                continue
+            summaries.append({
+                "session_id": path.stem,
+                "message_count": len(records),
+                "created_at": datetime.fromisoformat(records[0]["timestamp"]),
+                "last_activity": datetime.fromtimestamp(mtime)
+            })
+        return len(sessions), summaries
+
+    def delete_sessions_before(self, cutoff: datetime) -> int:
+        cutoff_time = cutoff.timestamp()
+        deleted = 0
+        for path in self.history_dir.glob("*.jsonl"):
+            with self._lock(path.stem):
+                try:
+                    if path.stat().st_mtime < cutoff_time:
+                        path.unlink()
+                        deleted += 1
+                except FileNotFoundError:
+                    continue
+        return deleted
+
+    def compact(self):
+        """Rewrite sessions cleared since the last compaction without their cleared records"""
+        cleared, self._cleared = self._cleared, set()
+        for session_id in cleared:
+            path = self._path(session_id)
+            with self._lock(session_id):
+                try:
+                    size = path.stat().st_size
+                except FileNotFoundError:
+                    continue
+                live = self._tail(path, None)
+                if live:
+                    tmp_path = path.with_name(path.name + ".tmp")
+                    with open(tmp_path, 'wb') as f:
+                        f.write(self._encode(live))
+                        f.flush()
+                        os.fsync(f.fileno())
+                    os.replace(tmp_path, path)
+                    self._bytes_reclaimed += size - path.stat().st_size
+                else:
+                    path.unlink()
+                    self._bytes_reclaimed += size
+            self._compactions += 1
+
+    def migrate_json_files(self) -> int:
+        """Convert history files from the old one-JSON-document-per-session format"""
+        migrated = 0
+        for json_file in self.history_dir.glob("*.json"):
+            try:
+                with open(json_file, 'r') as f:
+                    history_data = json.load(f)
+                messages = [ChatMessage(**message) for message in history_data.get("messages", [])]
+            except Exception as e:
+                print(f"Skipping unreadable chat history {json_file.name}: {str(e)}")
+                continue
+
+            path = self._path(json_file.stem)
+            tmp_path = path.with_name(path.name + ".tmp")
+            with open(tmp_path, 'wb') as f:
+                f.write(self._encode([self._message_record(message) for message in messages]))
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_path, path)
+            json_file.unlink()
+            migrated += 1
+
+        if migrated:
+            print(f"Migrated {migrated} chat histories to JSONL")
+        return migrated
+
+    def close(self):
+        self.compact()
+        self.sync()
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "backend": "jsonl",
+            "fsync_policy": self.fsync_policy,
+            "appends": self._appends,
+            "messages_appended": self._messages_appended,
+            "fsyncs": self._fsyncs,
+            "reads": self._reads,
+            "pending_compaction": len(self._cleared),
+            "compactions": self._compactions,
+            "bytes_reclaimed": self._bytes_reclaimed
+        }
+
+
+class SqliteHistoryStore(HistoryStore):
+    """Chat history in a single SQLite database (WAL mode).
+
+    Messages are indexed by session and insertion order, so reading the last
+    N messages of a session is an index range scan. A sessions table keeps
+    message counts and last activity, indexed by last activity, so session
+    listing and age-based cleanup don't touch the messages.
+
+    The fsync policy maps to ``PRAGMA synchronous``: "always" is FULL,
+    "interval" and "never" are NORMAL (with WAL, a commit may be lost on power
+    failure but the database is never corrupted).
+
+    Sessions left in ``history_dir`` by the JSONL store are imported on
+    start, so switching HISTORY_BACKEND to sqlite keeps existing history.
+    """
+
+    def __init__(
+        self,
+        db_path: Path = config.HISTORY_DB_FILE,
+        fsync_policy: str = config.HISTORY_FSYNC_POLICY,
+        history_dir: Optional[Path] = config.CHAT_HISTORY_DIR
+    ):
+        if fsync_policy not in FSYNC_POLICIES:
+            raise ValueError(f"Unknown fsync policy: {fsync_policy}. Supported: {', '.join(FSYNC_POLICIES)}")
+
+        self.db_path = Path(db_path)
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self.fsync_policy = fsync_policy
+
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(self.db_path), check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(f"PRAGMA synchronous={'FULL' if fsync_policy == 'always' else 'NORMAL'}")
+        self._conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS sessions (
+                session_id TEXT PRIMARY KEY,
+                message_count INTEGER NOT NULL,
+                created_at REAL NOT NULL,
+                last_activity REAL NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS idx_sessions_last_activity ON sessions(last_activity);
+            CREATE TABLE IF NOT EXISTS messages (
+                seq INTEGER PRIMARY KEY AUTOINCREMENT,
+                session_id TEXT NOT NULL,
+                message_id TEXT NOT NULL,
+                role TEXT NOT NULL,
+                content TEXT NOT NULL,
+                timestamp REAL NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS idx_messages_session_seq ON messages(session_id, seq);
+            """
+        )
+        self._conn.commit()
+
+        # Metrics
+        self._appends = 0
+        self._messages_appended = 0
+        self._reads = 0
+
+        if history_dir is not None:
+            self.import_history_files(history_dir)
+
+    def append(self, session_id: str, messages: List[ChatMessage]):
+        if not messages:
+            return
+        with self._lock, self._conn:
+            self._insert(session_id, messages)
+        self._appends += 1
+        self._messages_appended += len(messages)
+
+    def _insert(self, session_id: str, messages: List[ChatMessage]):
+        """Insert messages and update the session row; the caller holds the lock and transaction"""
+        rows = [
+            (session_id, message.id, message.role.value, message.content, message.timestamp.timestamp())
+            for message in messages
+        ]
+        first, last = rows[0][4], rows[-1][4]
+        self._conn.executemany(
+            "INSERT INTO messages (session_id, message_id, role, content, timestamp) VALUES (?, ?, ?, ?, ?)",
+            rows
+        )
+        self._conn.execute(
+            """
+            INSERT INTO sessions (session_id, message_count, created_at, last_activity) VALUES (?, ?, ?, ?)
+            ON CONFLICT(session_id) DO UPDATE SET
+                message_count = message_count + excluded.message_count,
+                last_activity = excluded.last_activity
+            """,
+            (session_id, len(rows), first, last)
+        )
+
+    def import_history_files(self, history_dir: Path) -> int:
+        """Import sessions from JSONL store files (and the older .json files) into the database.
+
+        Each file is removed once its session is committed. Messages already in
+        the database are skipped, so an import interrupted between the commit
+        and the removal is safe to run again.
+        """
+        history_dir = Path(history_dir)
+        # Older .json files first: the JSONL store converted them in place
+        paths = sorted(history_dir.glob("*.json")) + sorted(history_dir.glob("*.jsonl"))
+        imported = 0
+        for path in paths:
+            try:
+                messages = self._read_history_file(path)
+            except Exception as e:
+                print(f"Skipping unreadable chat history {path.name}: {str(e)}")
+                continue
+
+            session_id = path.stem
+            with self._lock, self._conn:
+                existing = {
+                    row["message_id"]
+                    for row in self._conn.execute("SELECT message_id FROM messages WHERE session_id = ?", (session_id,))
+                }
+                messages = [message for message in messages if message.id not in existing]
+                if messages:
+                    self._insert(session_id, messages)
+            path.unlink()
+            imported += 1
+
+        if imported:
+            print(f"Imported {imported} chat histories into SQLite")
+        return imported
+
+    @staticmethod
+    def _read_history_file(path: Path) -> List[ChatMessage]:
+        """The live messages of a JSONL session log or an old .json history file"""
+        if path.suffix == ".json":
+            with open(path, 'r') as f:
+                history_data = json.load(f)
+            return [ChatMessage(**message) for message in history_data.get("messages", [])]
+
+        records: List[Dict[str, Any]] = []
+        with open(path, 'rb') as f:
+            for line in f:
+                record = JsonlHistoryStore._decode(line)
+                if record is None:
+                    continue
+                if record.get("type") == "clear":
+                    records = []
+                else:
+                    records.append(record)
+        return [
+            ChatMessage(**{key: value for key, value in record.items() if key != "type"})
+            for record in records
+        ]
+
+    def read(self, session_id: str, limit: Optional[int] = None) -> List[ChatMessage]:
+        with self._lock:
+            rows = self._conn.execute(
+                """
+                SELECT message_id, role, content, timestamp FROM messages
+                WHERE session_id = ? ORDER BY seq DESC LIMIT ?
+                """,
+                (session_id, limit if limit is not None else -1)
+            ).fetchall()
+        self._reads += 1
+        return [
+            ChatMessage(
+                id=row["message_id"],
+                role=row["role"],
+                content=row["content"],
+                timestamp=datetime.fromtimestamp(row["timestamp"]),
+                session_id=session_id
+            )
+            for row in reversed(rows)
+        ]
+
+    def clear(self, session_id: str):
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM messages WHERE session_id = ?", (session_id,))
+            self._conn.execute("DELETE FROM sessions WHERE session_id = ?", (session_id,))
+
+    def list_sessions(self) -> List[str]:
+        with self._lock:
+            rows = self._conn.execute("SELECT session_id FROM sessions").fetchall()
+        return [row["session_id"] for row in rows]
+
+    def list_session_summaries(self, offset: int = 0, limit: int = 100) -> Tuple[int, List[Dict[str, Any]]]:
+        with self._lock:
+            total = self._conn.execute("SELECT COUNT(*) FROM sessions").fetchone()[0]
+            rows = self._conn.execute(
+                """
+                SELECT session_id, message_count, created_at, last_activity FROM sessions
+                ORDER BY last_activity DESC LIMIT ? OFFSET ?
+                """,
+                (limit, offset)
+            ).fetchall()
+        return total, [
+            {
+                "session_id": row["session_id"],
+                "message_count": row["message_count"],
+                "created_at": datetime.fromtimestamp(row["created_at"]),
+                "last_activity": datetime.fromtimestamp(row["last_activity"])
+            }
+            for row in rows
+        ]
+
+    def delete_sessions_before(self, cutoff: datetime) -> int:
+        with self._lock, self._conn:
+            self._conn.execute(
+                """
+                DELETE FROM messages WHERE session_id IN (
+                    SELECT session_id FROM sessions WHERE last_activity < ?
+                )
+                """,
+                (cutoff.timestamp(),)
+            )
+            deleted = self._conn.execute(
+                "DELETE FROM sessions WHERE last_activity < ?", (cutoff.timestamp(),)
+            ).rowcount
+        return deleted
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            sessions = self._conn.execute("SELECT COUNT(*) FROM sessions").fetchone()[0]
+        return {
+            "backend": "sqlite",
+            "fsync_policy": self.fsync_policy,
+            "sessions": sessions,
+            "appends": self._appends,
+            "messages_appended": self._messages_appended,
+            "reads": self._reads
+        }
+
+
+def create_history_store(backend: str = config.HISTORY_BACKEND) -> HistoryStore:
+    """Create the chat history store selected in config"""
+    if backend == "jsonl":
+        return JsonlHistoryStore()
+    if backend == "sqlite":
+        return SqliteHistoryStore()
+    raise ValueError(f"Unknown chat history backend: {backend}. Supported: jsonl, sqlite")
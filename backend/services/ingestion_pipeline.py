@@ -0,0 +1,129 @@
+import asyncio
+import time
+from typing import List, Dict, Any, Optional, Callable
+
+from backend import config
+from backend.services.chunking import create_chunker
+
+# Marks the end of a stage's output
+_DONE = None
+
+ProgressCallback = Callable[[str, Dict[str, Any]], None]
+
+
+class IngestionPipeline:
+    """Streaming extract -> chunk -> embed -> index pipeline for one document.
+
+    Stages run concurrently and hand batches of chunks to each other over
+    bounded queues, so only a few batches are in memory at a time however
+    large the document is, and each batch is searchable as soon as it has
+    been indexed.
+    """
+
+    def __init__(
+        self,
+        document_service,
+        embedding_service,
+        batch_size: int = config.PIPELINE_BATCH_SIZE,
+        queue_size: int = config.PIPELINE_QUEUE_SIZE,
+        write_queue_size: int = config.INDEX_WRITE_QUEUE_SIZE
+    ):
+        self.document_service = document_service
+        self.embedding_service = embedding_service
+        self.batch_size = max(1, batch_size)
+        self.queue_size = max(1, queue_size)
+        # Encoded batches waiting for an index write before the embed stage pauses
+        self.write_queue_size = max(1, write_queue_size)
+
+    async def _create_chunker(self):
+        # The token chunker needs the embedding model's tokenizer
+        await self.embedding_service.ensure_ready()
+        return create_chunker(self.embedding_service.embedding_model)
+
+    async def chunk_document(self, file_path: str, parallel: Optional[bool] = None) -> List[str]:
+        """Extract and chunk a whole document without indexing it"""
+        chunker = await self._create_chunker()
+        chunks: List[str] = []
+        async for text in self.document_service.iter_text(file_path, parallel):
+            chunks.extend(await asyncio.to_thread(lambda: list(chunker.feed(text))))
+        chunks.extend(await asyncio.to_thread(lambda: list(chunker.finish())))
+        return chunks
+
+    async def run(
+        self,
+        doc_id: str,
+        file_path: str,
+        filename: str,
+        progress: Optional[ProgressCallback] = None
+    ) -> int:
+        """Ingest a document and return its chunk count"""
+        chunk_queue: asyncio.Queue = asyncio.Queue(maxsize=self.queue_size)
+        index_queue: asyncio.Queue = asyncio.Queue(maxsize=self.write_queue_size)
+        state = {
+            "chunks_extracted": 0,
+            "chunks_indexed": 0,
+            "batches_indexed": 0,
+            "started_at": time.perf_counter()
+        }
+
+        def report(stage: str):
+            if progress is not None:
+                progress(stage, {
+                    "chunks_extracted": state["chunks_extracted"],
+                    "chunks_indexed": state["chunks_indexed"],
+                    "batches_indexed": state["batches_indexed"],
+                    "elapsed_seconds": round(time.perf_counter() - state["started_at"], 3)
+                })
+
+        chunker = await self._create_chunker()
+
+        async def chunk_stage():
+            batch: List[str] = []
+            start_index = 0
+
+            async def emit(chunks: List[str]):
+                nonlocal batch, start_index
+                for chunk in chunks:
+                    batch.append(chunk)
+                    if len(batch) == self.batch_size:
+                        await chunk_queue.put((start_index, batch))
+                        state["chunks_extracted"] += len(batch)
+                        start_index += len(batch)
+                        batch = []
+
+            # Tokenizing a window takes a while, so chunk off the event loop
+            async for text in self.document_service.iter_text(file_path):
+                await emit(await asyncio.to_thread(lambda: list(chunker.feed(text))))
+            await emit(await asyncio.to_thread(lambda: list(chunker.finish())))
+            if batch:
+                await chunk_queue.put((start_index, batch))
+                state["chunks_extracted"] += len(batch)
+            await chunk_queue.put(_DONE)
+
+        async def embed_stage():
+            while (item := await chunk_queue.get()) is not _DONE:
+                start_index, chunks = item
+                embeddings = await self.embedding_service.embed_chunks(chunks)
+                await index_queue.put((start_index, chunks, embeddings))
+            await index_queue.put(_DONE)
+
+        async def index_stage():
+            while (item := await index_queue.get()) is not _DONE:
+                start_index, chunks, embeddings = item
+                await self.embedding_service.index_chunks(chunks, embeddings, doc_id, filename, start_index=start_index)
+                state["chunks_indexed"] += len(chunks)
+                state["batches_indexed"] += 1
+                report("indexing")
+
+        report("extracting")
+        tasks = [asyncio.create_task(stage()) for stage in (chunk_stage, embed_stage, index_stage)]
+        try:
+            await asyncio.gather(*tasks)
+        except BaseException:
+            # A failed stage would leave the others blocked on their queues
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            raise
+
+        return state["chunks_indexed"]
@@ -0,0 +1,299 @@
+import asyncio
+import json
+import sqlite3
+import threading
+import time
+import uuid
+from pathlib import Path
+from typing import List, Dict, Any, Optional, Tuple, Callable, Awaitable
+
+from backend import config
+
+# Job status values
+QUEUED = "queued"
+RUNNING = "running"
+COMPLETED = "completed"
+FAILED = "failed"
+
+# Processing stages reported while a job runs. Extraction, chunking and
+# embedding overlap in the streaming pipeline, so a job is "extracting" until
+# its first batch is indexed and "indexing" from then on.
+STAGES = ["queued", "extracting", "indexing", "done"]
+
+JobProcessor = Callable[[Dict[str, Any], Callable[..., None]], Awaitable[None]]
+FailureHandler = Callable[[Dict[str, Any]], Awaitable[None]]
+
+
+class IngestionQueue:
+    """Durable document-ingestion queue with a bounded worker pool.
+
+    Jobs are persisted in SQLite, so queued and in-flight work survives a
+    restart: jobs left running by a crash are re-queued on ``start``. Failed
+    jobs are retried with exponential backoff up to ``max_attempts``; after
+    the last attempt ``on_failed`` gets to clean up after the job.
+
+    The methods are synchronous SQLite calls; async callers run them with
+    ``asyncio.to_thread``, as the workers do.
+    """
+
+    def __init__(
+        self,
+        processor: JobProcessor,
+        on_failed: Optional[FailureHandler] = None,
+        db_path: Path = config.JOBS_DB_FILE,
+        workers: int = config.INGESTION_WORKERS,
+        max_attempts: int = config.INGESTION_MAX_ATTEMPTS,
+        backoff_seconds: float = config.INGESTION_RETRY_BACKOFF_SECONDS,
+        poll_interval: float = 1.0
+    ):
+        self.processor = processor
+        self.on_failed = on_failed
+        self.db_path = Path(db_path)
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self.workers = max(1, workers)
+        self.max_attempts = max(1, max_attempts)
+        self.backoff_seconds = backoff_seconds
+        self.poll_interval = poll_interval
+
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(self.db_path), check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS jobs (
+                id TEXT PRIMARY KEY,
+                document_id TEXT NOT NULL,
+                file_path TEXT NOT NULL,
+                filename TEXT NOT NULL,
+                status TEXT NOT NULL,
+                stage TEXT NOT NULL,
+                attempts INTEGER NOT NULL DEFAULT 0,
+                next_run_at REAL NOT NULL,
+                error TEXT,
+                progress TEXT,
+                created_at REAL NOT NULL,
+                updated_at REAL NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS idx_jobs_status_next_run ON jobs(status, next_run_at);
+            CREATE INDEX IF NOT EXISTS idx_jobs_document_id ON jobs(document_id);
+            """
+        )
+        self._conn.commit()
+
+        self._wakeup: Optional[asyncio.Event] = None
+        self._tasks: List[asyncio.Task] = []
+
+    def _execute(self, sql: str, params=()):
+        with self._lock:
+            cursor = self._conn.execute(sql, params)
+            self._conn.commit()
+            return cursor
+
+    def enqueue(self, document_id: str, file_path: str, filename: str) -> str:
+        """Persist a new ingestion job and wake a worker"""
+        job_id = str(uuid.uuid4())
+        now = time.time()
+        self._execute(
+            "INSERT INTO jobs (id, document_id, file_path, filename, status, stage, attempts, "
+            "next_run_at, created_at, updated_at) VALUES (?, ?, ?, ?, ?, ?, 0, ?, ?, ?)",
+            (job_id, document_id, file_path, filename, QUEUED, "queued", now, now, now)
+        )
+        if self._wakeup is not None:
+            self._wakeup.set()
+        return job_id
+
+    def open_job(self, document_id: str, file_path: str, filename: str) -> str:
+        """Record a job that the caller runs itself (bulk ingest).
+
+        The job starts out running; if the process dies before ``close_job``,
+        ``start`` re-queues it and a worker re-ingests the document.
+        """
+        job_id = str(uuid.uuid4())
+        now = time.time()
+        self._execute(
+            "INSERT INTO jobs (id, document_id, file_path, filename, status, stage, attempts, "
+            "next_run_at, created_at, updated_at) VALUES (?, ?, ?, ?, ?, ?, 1, ?, ?, ?)",
+            (job_id, document_id, file_path, filename, RUNNING, "extracting", now, now, now)
+        )
+        return job_id
+
+    def close_job(self, job_id: str, error: Optional[Exception] = None):
+        """Mark a job opened with ``open_job`` completed, or failed with ``error``"""
+        if error is None:
+            self._execute(
+                "UPDATE jobs SET status = ?, stage = 'done', error = NULL, updated_at = ? WHERE id = ?",
+                (COMPLETED, time.time(), job_id)
+            )
+        else:
+            self._execute(
+                "UPDATE jobs SET status = ?, error = ?, updated_at = ? WHERE id = ?",
+                (FAILED, str(error), time.time(), job_id)
+            )
+
+    def get_job(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """Get a job's status, or None if it doesn't exist"""
+        with self._lock:
+            row = self._conn.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        if row is None:
+            return None
+        job = dict(row)
+        job["progress"] = json.loads(job["progress"]) if job["progress"] else None
+        return job
+
+    def set_stage(self, job_id: str, stage: str, progress: Optional[Dict[str, Any]] = None):
+        """Record the stage (and optional progress details) of a running job"""
+        self._execute(
+            "UPDATE jobs SET stage = ?, progress = ?, updated_at = ? WHERE id = ?",
+            (stage, json.dumps(progress) if progress is not None else None, time.time(), job_id)
+        )
+
+    def _claim_next(self) -> Optional[Dict[str, Any]]:
+        """Atomically move the oldest runnable job to running"""
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT * FROM jobs WHERE status = ? AND next_run_at <= ? ORDER BY created_at LIMIT 1",
+                (QUEUED, now)
+            ).fetchone()
+            if row is None:
+                return None
+            self._conn.execute(
+                "UPDATE jobs SET status = ?, attempts = attempts + 1, updated_at = ? WHERE id = ?",
+                (RUNNING, now, row["id"])
+            )
+            self._conn.commit()
+        job = dict(row)
+        job["attempts"] += 1
+        return job
+
+    def _finish(self, job: Dict[str, Any], error: Optional[Exception] = None) -> bool:
+        """Record a job's outcome; returns True if it failed for good"""
+        now = time.time()
+        if error is None:
+            self._execute(
+                "UPDATE jobs SET status = ?, stage = 'done', error = NULL, updated_at = ? WHERE id = ?",
+                (COMPLETED, now, job["id"])
+            )
+        elif job["attempts"] < self.max_attempts:
+            delay = self.backoff_seconds * (2 ** (job["attempts"] - 1))
+            self._execute(
+                "UPDATE jobs SET status = ?, stage = 'queued', error = ?, next_run_at = ?, updated_at = ? WHERE id = ?",
+                (QUEUED, str(error), now + delay, now, job["id"])
+            )
+            print(f"Job {job['id']} failed (attempt {job['attempts']}), retrying in {delay:.1f}s: {error}")
+            return False
+        else:
+            self._execute(
+                "UPDATE jobs SET status = ?, error = ?, updated_at = ? WHERE id = ?",
+                (FAILED, str(error), now, job["id"])
+            )
+            print(f"Job {job['id']} failed permanently: {error}")
+            return True
+        return False
+
+    def _requeue(self, job_id: str):
+        self._execute(
+            "UPDATE jobs SET status = ?, stage = 'queued', attempts = attempts - 1, updated_at = ? WHERE id = ?",
+            (QUEUED, time.time(), job_id)
+        )
+
+    async def _worker(self):
+        while True:
+            try:
+                job = await asyncio.to_thread(self._claim_next)
+            except Exception as e:
+                print(f"Error claiming ingestion job: {str(e)}")
+                job = None
+            if job is None:
+                self._wakeup.clear()
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout=self.poll_interval)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+
+            try:
+                await self._run(job)
+            except Exception as e:
+                # Recording the job's stage or outcome failed (e.g. the database
+                # is locked); it stays running and is resumed on the next start
+                print(f"Error running ingestion job {job['id']}: {str(e)}")
+
+    async def _run(self, job: Dict[str, Any]):
+        # The processor reports stages synchronously; a writer task stores the
+        # latest one off the event loop, in order, skipping superseded updates
+        latest: List[Tuple[str, Optional[Dict[str, Any]]]] = []
+        changed = asyncio.Event()
+        finished = False
+
+        def set_stage(stage: str, progress: Optional[Dict[str, Any]] = None):
+            latest[:] = [(stage, progress)]
+            changed.set()
+
+        async def write_stages():
+            while not finished or latest:
+                await changed.wait()
+                changed.clear()
+                if latest:
+                    stage, progress = latest.pop()
+                    await asyncio.to_thread(self.set_stage, job["id"], stage, progress)
+
+        async def drain():
+            # Pending stage writes land before the job's final status
+            nonlocal finished
+            finished = True
+            changed.set()
+            await writer
+
+        writer = asyncio.create_task(write_stages())
+        error: Optional[Exception] = None
+        try:
+            await self.processor(job, set_stage)
+        except asyncio.CancelledError:
+            # Shutting down mid-job: leave it runnable for the next start
+            await drain()
+            await asyncio.to_thread(self._requeue, job["id"])
+            raise
+        except Exception as e:
+            error = e
+        await drain()
+
+        if await asyncio.to_thread(self._finish, job, error) and self.on_failed is not None:
+            try:
+                await self.on_failed(job)
+            except Exception as e:
+                print(f"Error cleaning up failed job {job['id']}: {str(e)}")
+
+    async def start(self):
+        """Re-queue jobs interrupted by a crash and start the workers"""
+        resumed = await asyncio.to_thread(lambda: self._execute(
+            "UPDATE jobs SET status = ?, stage = 'queued', updated_at = ? WHERE status = ?",
+            (QUEUED, time.time(), RUNNING)
+        ).rowcount)
+        if resumed:
+            print(f"Resuming {resumed} interrupted ingestion job(s)")
+
+        self._wakeup = asyncio.Event()
+        self._tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+
+    async def stop(self):
+        """Stop the workers; unfinished jobs stay queued"""
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get job counts by status"""
+        with self._lock:
+            rows = self._conn.execute("SELECT status, COUNT(*) FROM jobs GROUP BY status").fetchall()
+        return {
+            "workers": self.workers,
+            "jobs": {status: count for status, count in rows}
+        }
+
+    def close(self):
+        """Close the SQLite connection"""
+        with self._lock:
+            self._conn.close()
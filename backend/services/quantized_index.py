@@ -0,0 +1,249 @@
+import hashlib
+import json
+import threading
+from pathlib import Path
+from typing import Iterable, List, Dict, Any, Optional, Tuple
+
+import numpy as np
+
+from backend import config
+
+SUPPORTED_DTYPES = ("int8", "float16")
+
+
+def normalize_rows(vectors: np.ndarray) -> np.ndarray:
+    """L2-normalize vectors so dot products are cosine similarities"""
+    vectors = np.asarray(vectors, dtype=np.float32)
+    if vectors.ndim == 1:
+        vectors = vectors[None, :]
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return vectors / norms
+
+
+def quantize(vectors: np.ndarray, dtype: str) -> Tuple[np.ndarray, np.ndarray]:
+    """Quantize normalized vectors, returning (codes, per-row scales)"""
+    if dtype == "float16":
+        return vectors.astype(np.float16), np.ones(len(vectors), dtype=np.float32)
+    if dtype == "int8":
+        # Symmetric per-vector scaling onto [-127, 127]
+        max_abs = np.abs(vectors).max(axis=1)
+        max_abs[max_abs == 0] = 1.0
+        scales = (max_abs / 127.0).astype(np.float32)
+        codes = np.clip(np.rint(vectors / scales[:, None]), -127, 127).astype(np.int8)
+        return codes, scales
+    raise ValueError(f"Unsupported quantized dtype: {dtype}. Supported: {SUPPORTED_DTYPES}")
+
+
+def id_set_checksum(pages: Iterable[List[str]]) -> str:
+    """Order-independent checksum of a set of ids, fed in pages"""
+    total = 0
+    for ids in pages:
+        for chunk_id in ids:
+            total += int.from_bytes(hashlib.blake2b(chunk_id.encode("utf-8"), digest_size=8).digest(), "little")
+    return f"{total & 0xFFFFFFFFFFFFFFFF:016x}"
+
+
+class QuantizedVectorIndex:
+    """Exact-scan index over int8 or float16 vectors.
+
+    Holds a compact copy of every chunk embedding for the candidate search;
+    callers re-score the returned candidates against the full float32
+    vectors. The index is saved on ``save`` and can be rebuilt from the
+    vector store at any time.
+    """
+
+    def __init__(self, dtype: str = "int8", index_dir: Path = config.QUANTIZED_INDEX_DIR):
+        if dtype not in SUPPORTED_DTYPES:
+            raise ValueError(f"Unsupported quantized dtype: {dtype}. Supported: {SUPPORTED_DTYPES}")
+
+        self.dtype = dtype
+        self.index_dir = Path(index_dir)
+        self._lock = threading.RLock()
+
+        self._codes: Optional[np.ndarray] = None
+        self._scales: Optional[np.ndarray] = None
+        self._ids: List[str] = []
+        self._positions: Dict[str, int] = {}
+        self._size = 0
+
+        self.load()
+
+    def __len__(self) -> int:
+        return len(self._positions)
+
+    def _reserve(self, dim: int, extra: int):
+        """Grow the backing arrays geometrically so appends stay amortized O(1)"""
+        capacity = 0 if self._codes is None else len(self._codes)
+        needed = self._size + extra
+        if needed <= capacity:
+            return
+
+        new_capacity = max(needed, capacity * 2, 1024)
+        codes = np.zeros((new_capacity, dim), dtype=np.int8 if self.dtype == "int8" else np.float16)
+        scales = np.zeros(new_capacity, dtype=np.float32)
+        if self._codes is not None:
+            codes[:self._size] = self._codes[:self._size]
+            scales[:self._size] = self._scales[:self._size]
+        self._codes, self._scales = codes, scales
+
+    def add(self, ids: List[str], embeddings):
+        """Add (or replace) vectors for the given ids"""
+        if not ids:
+            return
+
+        codes, scales = quantize(normalize_rows(embeddings), self.dtype)
+
+        with self._lock:
+            self.remove(ids)
+            self._reserve(codes.shape[1], len(ids))
+            start = self._size
+            self._codes[start:start + len(ids)] = codes
+            self._scales[start:start + len(ids)] = scales
+            for offset, chunk_id in enumerate(ids):
+                self._ids.append(chunk_id)
+                self._positions[chunk_id] = start + offset
+            self._size += len(ids)
+
+    def remove(self, ids: List[str]):
+        """Remove vectors by id; rows are tombstoned and reclaimed by compaction"""
+        with self._lock:
+            for chunk_id in ids:
+                position = self._positions.pop(chunk_id, None)
+                if position is not None:
+                    self._ids[position] = None
+                    self._scales[position] = 0.0
+
+            if self._size and len(self._positions) < self._size // 2:
+                self._compact()
+
+    def _compact(self):
+        """Drop tombstoned rows"""
+        live = [i for i, chunk_id in enumerate(self._ids) if chunk_id is not None]
+        self._codes = self._codes[live].copy() if live else None
+        self._scales = self._scales[live].copy() if live else None
+        self._ids = [self._ids[i] for i in live]
+        self._positions = {chunk_id: i for i, chunk_id in enumerate(self._ids)}
+        self._size = len(self._ids)
+
+    def search(
+        self,
+        query_embedding,
+        n_candidates: int,
+        block_size: int = 16384,
+        restrict_to: Optional[List[str]] = None
+    ) -> List[Tuple[str, float]]:
+        """Return up to n_candidates (id, approximate cosine similarity) pairs.
+
+        ``restrict_to`` limits the scan to the rows of the given ids.
+        """
+        query = normalize_rows(query_embedding)[0]
+
+        with self._lock:
+            if not self._positions:
+                return []
+
+            if restrict_to is not None:
+                candidate_rows = np.asarray(sorted(
+                    self._positions[chunk_id] for chunk_id in restrict_to if chunk_id in self._positions
+                ), dtype=np.int64)
+                if not len(candidate_rows):
+                    return []
+                blocks = (
+                    (rows, self._codes[rows], self._scales[rows])
+                    for rows in (candidate_rows[i:i + block_size] for i in range(0, len(candidate_rows), block_size))
+                )
+            else:
+                # Full scans read contiguous slices, which avoids a gather copy
+                blocks = (
+                    (np.arange(i, end), self._codes[i:end], self._scales[i:end])
+                    for i, end in ((i, min(i + block_size, self._size)) for i in range(0, self._size, block_size))
+                )
+
+            best_scores = np.empty(0, dtype=np.float32)
+            best_rows = np.empty(0, dtype=np.int64)
+
+            # Score in cache-sized blocks so the float32 working set stays small
+            for rows, codes, scales in blocks:
+                scores = (codes.astype(np.float32) @ query) * scales
+                # Tombstoned rows have scale 0; push them below any real score
+                scores[scales == 0] = -np.inf
+                if len(scores) > n_candidates:
+                    top = np.argpartition(-scores, n_candidates)[:n_candidates]
+                    scores, rows = scores[top], rows[top]
+
+                best_scores = np.concatenate([best_scores, scores])
+                best_rows = np.concatenate([best_rows, rows])
+                if len(best_scores) > n_candidates:
+                    top = np.argpartition(-best_scores, n_candidates)[:n_candidates]
+                    best_scores, best_rows = best_scores[top], best_rows[top]
+
+            order = np.argsort(-best_scores)
+            return [
+                (self._ids[best_rows[i]], float(best_scores[i]))
+                for i in order
+                if np.isfinite(best_scores[i])
+            ]
+
+    def save(self):
+        """Write the index to disk"""
+        with self._lock:
+            if self._size and len(self._positions) < self._size:
+                self._compact()
+
+            self.index_dir.mkdir(parents=True, exist_ok=True)
+            codes = self._codes[:self._size] if self._codes is not None else np.zeros((0, 0), dtype=np.int8)
+            scales = self._scales[:self._size] if self._scales is not None else np.zeros(0, dtype=np.float32)
+            np.save(self.index_dir / f"codes_{self.dtype}.npy", codes)
+            np.save(self.index_dir / f"scales_{self.dtype}.npy", scales)
+            with open(self.index_dir / f"ids_{self.dtype}.json", 'w') as f:
+                json.dump(self._ids, f)
+
+    def load(self):
+        """Load the index from disk, if present"""
+        codes_file = self.index_dir / f"codes_{self.dtype}.npy"
+        ids_file = self.index_dir / f"ids_{self.dtype}.json"
+        if not codes_file.exists() or not ids_file.exists():
+            return
+
+        try:
+            codes = np.load(codes_file)
+            scales = np.load(self.index_dir / f"scales_{self.dtype}.npy")
+            with open(ids_file, 'r') as f:
+                ids = json.load(f)
+        except Exception as e:
+            print(f"Error loading quantized index: {str(e)}")
+            return
+
+        with self._lock:
+            self._codes = codes if len(ids) else None
+            self._scales = scales if len(ids) else None
+            self._ids = ids
+            self._positions = {chunk_id: i for i, chunk_id in enumerate(ids) if chunk_id is not None}
+            self._size = len(ids)
+
+    def clear(self):
+        """Drop all vectors"""
+        with self._lock:
+            self._codes = None
+            self._scales = None
+            self._ids = []
+            self._positions = {}
+            self._size = 0
+
+    def checksum(self) -> str:
+        """Checksum of the indexed ids, comparable with ``id_set_checksum`` of the vector store"""
+        with self._lock:
+            ids = list(self._positions)
+        return id_set_checksum([ids])
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get size and memory metrics"""
+        return {
+            "dtype": self.dtype,
+            "vectors": len(self._positions),
+            "bytes": int(
+                (self._codes.nbytes if self._codes is not None else 0)
+                + (self._scales.nbytes if self._scales is not None else 0)
+            )
+        }
@@ -0,0 +1,87 @@
+import asyncio
+from typing import List, Dict, Any, Optional, Tuple
+
+from backend import config
+from backend.services.encoder_pool import EncoderPool
+
+
+class QueryBatcher:
+    """Coalesces concurrent query encodes into a single encoder call.
+
+    Queries are collected until either the batching window elapses or the
+    batch is full, then encoded together; each caller gets its own row.
+    """
+
+    def __init__(
+        self,
+        encoder_pool: EncoderPool,
+        window_ms: float = config.QUERY_BATCH_WINDOW_MS,
+        max_batch_size: int = config.QUERY_BATCH_MAX_SIZE
+    ):
+        self.encoder_pool = encoder_pool
+        self.window = max(0.0, window_ms) / 1000
+        self.max_batch_size = max(1, max_batch_size)
+
+        self._pending: List[Tuple[str, asyncio.Future]] = []
+        self._flush_handle: Optional[asyncio.TimerHandle] = None
+        self._tasks = set()
+
+        # Metrics
+        self._batches = 0
+        self._queries = 0
+        self._max_batch = 0
+
+    async def encode(self, query: str):
+        """Encode a single query as part of the next batch"""
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.append((query, future))
+
+        if len(self._pending) >= self.max_batch_size:
+            self._flush_now()
+        elif self._flush_handle is None:
+            self._flush_handle = loop.call_later(self.window, self._flush_now)
+
+        return await future
+
+    def _flush_now(self):
+        """Hand the pending queries to the encoder as one batch"""
+        if self._flush_handle is not None:
+            self._flush_handle.cancel()
+            self._flush_handle = None
+
+        batch, self._pending = self._pending, []
+        if batch:
+            task = asyncio.get_running_loop().create_task(self._encode_batch(batch))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+    async def _encode_batch(self, batch: List[Tuple[str, asyncio.Future]]):
+        """Encode a batch and resolve each caller's future"""
+        self._batches += 1
+        self._queries += len(batch)
+        self._max_batch = max(self._max_batch, len(batch))
+
+        try:
+            embeddings = await self.encoder_pool.encode([query for query, _ in batch])
+        except Exception as e:
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+
+        for (_, future), embedding in zip(batch, embeddings):
+            if not future.done():
+                future.set_result(embedding)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get batching metrics"""
+        return {
+            "window_ms": self.window * 1000,
+            "max_batch_size": self.max_batch_size,
+            "batches": self._batches,
+            "queries": self._queries,
+            "avg_batch_size": (self._queries / self._batches) if self._batches else 0.0,
+            "largest_batch": self._max_batch,
+            "pending": len(self._pending)
+        }
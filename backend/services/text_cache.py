@@ -0,0 +1,102 @@
+import gzip
+import json
+import os
+import tempfile
+import threading
+from pathlib import Path
+from typing import Dict, Any, Iterator, Optional
+
+from backend import config
+
+
+class TextCacheWriter:
+    """Streams one cache entry to a temporary file; commit() publishes it"""
+
+    def __init__(self, path: Path, content_hash: str, version: str):
+        self.path = path
+        # Unique, so concurrent extractions of the same content don't share a file
+        fd, tmp_path = tempfile.mkstemp(dir=path.parent, prefix=path.name + ".", suffix=".tmp")
+        self.tmp_path = Path(tmp_path)
+        self._raw = os.fdopen(fd, 'wb')
+        self._file = gzip.open(self._raw, 'wt', encoding='utf-8')
+        self._file.write(json.dumps({"content_hash": content_hash, "extractor_version": version}) + "\n")
+
+    def write(self, piece: str):
+        """Append one text piece"""
+        self._file.write(json.dumps(piece) + "\n")
+
+    def commit(self):
+        """Finish the entry and atomically move it into place"""
+        self._file.close()
+        self._raw.close()
+        os.replace(self.tmp_path, self.path)
+
+    def abort(self):
+        """Drop the partial entry"""
+        self._file.close()
+        self._raw.close()
+        self.tmp_path.unlink(missing_ok=True)
+
+
+class ExtractedTextCache:
+    """On-disk cache of extracted document text, keyed by content hash and extractor version.
+
+    An entry holds a document's text as the pieces it was extracted in (PDF
+    pages, DOCX paragraphs), so page boundaries survive. Entries are
+    gzip-compressed JSON lines, one piece per line, so they are written and
+    read as a stream rather than held in memory whole. Writes are atomic;
+    changing the extractor version simply misses the old entries.
+    """
+
+    def __init__(self, cache_dir: Path = config.TEXT_CACHE_DIR):
+        self.cache_dir = Path(cache_dir)
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def _path(self, content_hash: str, version: str) -> Path:
+        return self.cache_dir / content_hash[:2] / f"{content_hash}.{version}.jsonl.gz"
+
+    def get(self, content_hash: str, version: str) -> Optional[Iterator[str]]:
+        """Iterator over the cached text pieces, or None on a miss"""
+        path = self._path(content_hash, version)
+        try:
+            f = gzip.open(path, 'rt', encoding='utf-8')
+            f.readline()
+        except (FileNotFoundError, OSError, ValueError):
+            with self._lock:
+                self.misses += 1
+            return None
+
+        with self._lock:
+            self.hits += 1
+        return self._read_pieces(f)
+
+    @staticmethod
+    def _read_pieces(f) -> Iterator[str]:
+        with f:
+            for line in f:
+                yield json.loads(line)
+
+    def writer(self, content_hash: str, version: str) -> TextCacheWriter:
+        """Start writing a document's text pieces"""
+        path = self._path(content_hash, version)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        return TextCacheWriter(path, content_hash, version)
+
+    def delete(self, content_hash: str):
+        """Drop every cached version of a document"""
+        for path in (self.cache_dir / content_hash[:2]).glob(f"{content_hash}.*.jsonl.gz"):
+            path.unlink(missing_ok=True)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get hit/miss counts"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": (self.hits / lookups) if lookups else 0.0
+            }
@@ -0,0 +1,578 @@
+import json
+import os
+import sqlite3
+import threading
+from abc import ABC, abstractmethod
+from pathlib import Path
+from typing import List, Dict, Any, Optional, Iterator, Tuple
+
+import numpy as np
+
+from backend import config
+
+
+class VectorStore(ABC):
+    """Storage and nearest-neighbour search for chunk embeddings.
+
+    ``query`` returns results shaped like ChromaDB's ``collection.query``
+    (one inner list per query embedding, cosine distances); ``get_by_ids`` and
+    ``get_document`` return flat results like ``collection.get``. Passing
+    ``document_ids`` restricts a query to those documents inside the index.
+    """
+
+    @abstractmethod
+    def add(self, ids: List[str], embeddings, documents: List[str], metadatas: List[Dict[str, Any]]):
+        """Add chunks with their embeddings"""
+
+    @abstractmethod
+    def query(
+        self,
+        query_embeddings,
+        n_results: int,
+        document_ids: Optional[List[str]] = None
+    ) -> Dict[str, List[List[Any]]]:
+        """Find the nearest chunks for each query embedding"""
+
+    @abstractmethod
+    def get_chunk_ids(self, document_ids: List[str]) -> List[str]:
+        """Get the ids of all chunks belonging to the given documents"""
+
+    @abstractmethod
+    def get_by_ids(self, ids: List[str], include_embeddings: bool = False) -> Dict[str, List[Any]]:
+        """Get chunks by id"""
+
+    @abstractmethod
+    def get_document(self, doc_id: str) -> Dict[str, List[Any]]:
+        """Get all chunks for a document"""
+
+    @abstractmethod
+    def delete_document(self, doc_id: str) -> List[str]:
+        """Delete all chunks for a document, returning the deleted ids"""
+
+    @abstractmethod
+    def delete(self, ids: List[str]):
+        """Delete chunks by id"""
+
+    @abstractmethod
+    def update_metadata(self, ids: List[str], metadatas: List[Dict[str, Any]]):
+        """Replace the metadata of existing chunks"""
+
+    @abstractmethod
+    def count(self) -> int:
+        """Number of stored chunks"""
+
+    @abstractmethod
+    def iter_embeddings(self, page_size: int = 5000) -> Iterator[Tuple[List[str], np.ndarray]]:
+        """Iterate over (ids, embeddings) pages of every stored chunk"""
+
+    @abstractmethod
+    def iter_ids(self, page_size: int = 50000) -> Iterator[List[str]]:
+        """Iterate over pages of every stored chunk id"""
+
+    def close(self):
+        """Release resources held by the store"""
+
+
+class ChromaVectorStore(VectorStore):
+    """Vector store backed by a persistent ChromaDB collection"""
+
+    def __init__(self, path: Path = config.EMBEDDINGS_DIR, collection_name: str = "documents"):
+        import chromadb
+        from chromadb.config import Settings
+
+        self.chroma_client = chromadb.PersistentClient(
+            path=str(path),
+            settings=Settings(anonymized_telemetry=False)
+        )
+        self.collection = self.chroma_client.get_or_create_collection(
+            name=collection_name,
+            metadata={"hnsw:space": "cosine"}
+        )
+
+        # Chroma rejects add/update/delete calls with more records than this
+        if hasattr(self.chroma_client, "get_max_batch_size"):
+            self.max_batch_size = self.chroma_client.get_max_batch_size()
+        else:
+            self.max_batch_size = getattr(self.chroma_client, "max_batch_size", 5000)
+
+    def _batches(self, count: int) -> Iterator[slice]:
+        for start in range(0, count, self.max_batch_size):
+            yield slice(start, start + self.max_batch_size)
+
+    def add(self, ids, embeddings, documents, metadatas):
+        embeddings = np.asarray(embeddings, dtype=np.float32)
+        for batch in self._batches(len(ids)):
+            self.collection.add(
+                ids=ids[batch],
+                embeddings=embeddings[batch].tolist(),
+                documents=documents[batch],
+                metadatas=metadatas[batch]
+            )
+
+    @staticmethod
+    def _document_filter(document_ids: List[str]) -> Dict[str, Any]:
+        if len(document_ids) == 1:
+            return {"document_id": document_ids[0]}
+        return {"document_id": {"$in": list(document_ids)}}
+
+    def query(self, query_embeddings, n_results, document_ids=None):
+        results = self.collection.query(
+            query_embeddings=np.asarray(query_embeddings, dtype=np.float32).tolist(),
+            n_results=n_results,
+            where=self._document_filter(document_ids) if document_ids else None
+        )
+        return {
+            "ids": results['ids'],
+            "documents": results['documents'],
+            "metadatas": results['metadatas'],
+            "distances": results['distances']
+        }
+
+    def get_chunk_ids(self, document_ids):
+        if not document_ids:
+            return []
+        return self.collection.get(where=self._document_filter(document_ids), include=[])['ids']
+
+    def get_by_ids(self, ids, include_embeddings=False):
+        include = ["documents", "metadatas"] + (["embeddings"] if include_embeddings else [])
+        results = self.collection.get(ids=ids, include=include)
+        return {
+            "ids": results['ids'],
+            "documents": results['documents'],
+            "metadatas": results['metadatas'],
+            "embeddings": results.get('embeddings') if include_embeddings else None
+        }
+
+    def get_document(self, doc_id):
+        results = self.collection.get(where={"document_id": doc_id})
+        return {
+            "ids": results['ids'],
+            "documents": results['documents'],
+            "metadatas": results['metadatas']
+        }
+
+    def delete_document(self, doc_id):
+        results = self.collection.get(where={"document_id": doc_id}, include=[])
+        self.delete(results['ids'])
+        return results['ids']
+
+    def delete(self, ids):
+        for batch in self._batches(len(ids)):
+            self.collection.delete(ids=ids[batch])
+
+    def update_metadata(self, ids, metadatas):
+        for batch in self._batches(len(ids)):
+            self.collection.update(ids=ids[batch], metadatas=metadatas[batch])
+
+    def count(self):
+        return self.collection.count()
+
+    def iter_embeddings(self, page_size=5000):
+        total = self.collection.count()
+        for offset in range(0, total, page_size):
+            page = self.collection.get(include=["embeddings"], limit=page_size, offset=offset)
+            if page['ids']:
+                yield page['ids'], np.asarray(page['embeddings'], dtype=np.float32)
+
+    def iter_ids(self, page_size=50000):
+        total = self.collection.count()
+        for offset in range(0, total, page_size):
+            page = self.collection.get(include=[], limit=page_size, offset=offset)
+            if page['ids']:
+                yield page['ids']
+
+
+class MmapVectorStore(VectorStore):
+    """In-process exact-search store over a memory-mapped float32 matrix.
+
+    Normalized vectors are appended to a flat binary file and searched with a
+    single matmul plus argpartition; chunk text and metadata live in SQLite
+    alongside it. A document-filtered query looks up the rows of those
+    documents' chunks in SQLite (they need not be contiguous, since batches
+    mix documents and updates append) and scores only those rows.
+    Deleted rows are masked out and reclaimed by compaction, which writes a
+    new generation of the vectors file and switches to it in the same SQLite
+    transaction that renumbers the rows, so a crash leaves either the old
+    file and rows or the new ones.
+    """
+
+    def __init__(self, path: Path = config.MMAP_STORE_DIR, block_size: int = 262144):
+        self.path = Path(path)
+        self.path.mkdir(parents=True, exist_ok=True)
+        self.block_size = block_size
+
+        self._lock = threading.RLock()
+        self._conn = sqlite3.connect(str(self.path / "chunks.db"), check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS chunks (
+                id TEXT PRIMARY KEY,
+                row INTEGER NOT NULL UNIQUE,
+                document_id TEXT,
+                document TEXT,
+                metadata TEXT
+            );
+            CREATE INDEX IF NOT EXISTS idx_chunks_document_id ON chunks(document_id);
+            CREATE TABLE IF NOT EXISTS store_info (key TEXT PRIMARY KEY, value TEXT);
+            """
+        )
+        self._conn.commit()
+
+        row = self._conn.execute("SELECT value FROM store_info WHERE key = 'dim'").fetchone()
+        self.dim: Optional[int] = int(row[0]) if row else None
+
+        row = self._conn.execute("SELECT value FROM store_info WHERE key = 'generation'").fetchone()
+        self.generation = int(row[0]) if row else 0
+        self.vectors_file = self._vectors_path(self.generation)
+        # Files of other generations are left over from an interrupted compaction
+        for stale_file in self.path.glob("vectors*"):
+            if stale_file != self.vectors_file:
+                stale_file.unlink(missing_ok=True)
+
+        self._matrix: Optional[np.memmap] = None
+        self._rows = 0
+        self._live = np.zeros(0, dtype=bool)
+        self._repair_vectors_file()
+        self._open_matrix()
+
+        live_rows = [r for (r,) in self._conn.execute("SELECT row FROM chunks")]
+        self._live = np.zeros(self._rows, dtype=bool)
+        if live_rows:
+            self._live[np.asarray(live_rows, dtype=np.int64)] = True
+
+    def _vectors_path(self, generation: int) -> Path:
+        return self.path / ("vectors.f32" if generation == 0 else f"vectors.{generation}.f32")
+
+    def _repair_vectors_file(self):
+        """Bring the vectors file and the row numbers back in step after a crash.
+
+        Rows are committed only after their vectors are fsynced, so the file can
+        run past the last committed row (an append whose commit never happened,
+        possibly cut off mid-row) but rows past the end of the file should not
+        exist; any that do are dropped rather than pointed at missing vectors.
+        """
+        if self.dim is None:
+            return
+        row_bytes = self.dim * 4
+        size = self.vectors_file.stat().st_size if self.vectors_file.exists() else 0
+        file_rows = size // row_bytes
+
+        lost = self._conn.execute("DELETE FROM chunks WHERE row >= ?", (file_rows,)).rowcount
+        self._conn.commit()
+        if lost:
+            print(f"Dropped {lost} chunks whose vectors are missing from {self.vectors_file.name}")
+
+        max_row = self._conn.execute("SELECT MAX(row) FROM chunks").fetchone()[0]
+        keep_rows = max_row + 1 if max_row is not None else 0
+        if size != keep_rows * row_bytes and self.vectors_file.exists():
+            with open(self.vectors_file, 'r+b') as f:
+                f.truncate(keep_rows * row_bytes)
+                os.fsync(f.fileno())
+
+    def _open_matrix(self):
+        """(Re)map the vectors file after it has grown or been rewritten"""
+        if self.dim is None or not self.vectors_file.exists():
+            self._matrix, self._rows = None, 0
+            return
+        rows = self.vectors_file.stat().st_size // (self.dim * 4)
+        self._matrix = np.memmap(self.vectors_file, dtype=np.float32, mode="r", shape=(rows, self.dim)) if rows else None
+        self._rows = rows
+
+    def add(self, ids, embeddings, documents, metadatas):
+        vectors = np.asarray(embeddings, dtype=np.float32)
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        vectors = vectors / norms
+
+        with self._lock:
+            if self.dim is None:
+                self.dim = int(vectors.shape[1])
+                self._conn.execute("INSERT OR REPLACE INTO store_info (key, value) VALUES ('dim', ?)", (str(self.dim),))
+
+            # Re-adding an id replaces the old row
+            self._delete_ids(ids)
+
+            start = self._rows
+            with open(self.vectors_file, 'ab') as f:
+                f.write(vectors.tobytes())
+                f.flush()
+                # The vectors are on disk before any row points at them
+                os.fsync(f.fileno())
+
+            self._conn.executemany(
+                "INSERT INTO chunks (id, row, document_id, document, metadata) VALUES (?, ?, ?, ?, ?)",
+                [
+                    (chunk_id, start + i, metadata.get("document_id"), document, json.dumps(metadata))
+                    for i, (chunk_id, document, metadata) in enumerate(zip(ids, documents, metadatas))
+                ]
+            )
+            self._conn.commit()
+
+            self._open_matrix()
+            live = np.zeros(self._rows, dtype=bool)
+            live[:len(self._live)] = self._live
+            live[start:start + len(ids)] = True
+            self._live = live
+
+    def _blocks(self, rows: Optional[np.ndarray]) -> Iterator[Tuple[np.ndarray, np.ndarray]]:
+        """Yield (row numbers, vectors) blocks over all rows or a subset of rows"""
+        if rows is None:
+            for start in range(0, self._rows, self.block_size):
+                end = min(start + self.block_size, self._rows)
+                yield np.arange(start, end), np.asarray(self._matrix[start:end])
+        else:
+            for start in range(0, len(rows), self.block_size):
+                block = rows[start:start + self.block_size]
+                yield block, np.asarray(self._matrix[block])
+
+    def _rows_for_documents(self, document_ids: List[str]) -> np.ndarray:
+        """Row numbers of the given documents' chunks, in file order"""
+        rows = []
+        for start in range(0, len(document_ids), 500):
+            batch = document_ids[start:start + 500]
+            placeholders = ",".join("?" * len(batch))
+            rows.extend(r for (r,) in self._conn.execute(
+                f"SELECT row FROM chunks WHERE document_id IN ({placeholders})", batch
+            ))
+        return np.asarray(sorted(rows), dtype=np.int64)
+
+    def _top_rows(
+        self,
+        queries: np.ndarray,
+        n_results: int,
+        candidate_rows: Optional[np.ndarray] = None
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """Exact top-k rows and similarities for each query"""
+        best_scores = np.full((len(queries), 0), -np.inf, dtype=np.float32)
+        best_rows = np.zeros((len(queries), 0), dtype=np.int64)
+
+        for block_rows, vectors in self._blocks(candidate_rows):
+            scores = queries @ vectors.T
+            scores[:, ~self._live[block_rows]] = -np.inf
+            rows = np.broadcast_to(block_rows, scores.shape)
+
+            if scores.shape[1] > n_results:
+                top = np.argpartition(-scores, n_results - 1, axis=1)[:, :n_results]
+                scores = np.take_along_axis(scores, top, axis=1)
+                rows = np.take_along_axis(rows, top, axis=1)
+
+            best_scores = np.concatenate([best_scores, scores], axis=1)
+            best_rows = np.concatenate([best_rows, rows], axis=1)
+            if best_scores.shape[1] > n_results:
+                top = np.argpartition(-best_scores, n_results - 1, axis=1)[:, :n_results]
+                best_scores = np.take_along_axis(best_scores, top, axis=1)
+                best_rows = np.take_along_axis(best_rows, top, axis=1)
+
+        order = np.argsort(-best_scores, axis=1)
+        return np.take_along_axis(best_rows, order, axis=1), np.take_along_axis(best_scores, order, axis=1)
+
+    def _fetch_rows(self, rows: List[int]) -> Dict[int, Tuple[str, str, Dict[str, Any]]]:
+        found = {}
+        for start in range(0, len(rows), 500):
+            batch = rows[start:start + 500]
+            placeholders = ",".join("?" * len(batch))
+            for chunk_id, row, document, metadata in self._conn.execute(
+                f"SELECT id, row, document, metadata FROM chunks WHERE row IN ({placeholders})",
+                batch
+            ):
+                found[row] = (chunk_id, document, json.loads(metadata))
+        return found
+
+    def query(self, query_embeddings, n_results, document_ids=None):
+        queries = np.asarray(query_embeddings, dtype=np.float32)
+        if queries.ndim == 1:
+            queries = queries[None, :]
+        norms = np.linalg.norm(queries, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        queries = queries / norms
+
+        results = {"ids": [], "documents": [], "metadatas": [], "distances": []}
+        with self._lock:
+            candidate_rows = self._rows_for_documents(document_ids) if document_ids is not None else None
+            if self._matrix is None or not self._live.any() or (candidate_rows is not None and not len(candidate_rows)):
+                for key in results:
+                    results[key] = [[] for _ in range(len(queries))]
+                return results
+
+            top_rows, top_scores = self._top_rows(queries, n_results, candidate_rows)
+            wanted = sorted({int(r) for r, s in zip(top_rows.ravel(), top_scores.ravel()) if np.isfinite(s)})
+            chunks = self._fetch_rows(wanted)
+
+        for rows, scores in zip(top_rows, top_scores):
+            ids, documents, metadatas, distances = [], [], [], []
+            for row, score in zip(rows, scores):
+                if not np.isfinite(score) or int(row) not in chunks:
+                    continue
+                chunk_id, document, metadata = chunks[int(row)]
+                ids.append(chunk_id)
+                documents.append(document)
+                metadatas.append(metadata)
+                distances.append(float(1 - score))
+            results["ids"].append(ids)
+            results["documents"].append(documents)
+            results["metadatas"].append(metadatas)
+            results["distances"].append(distances)
+        return results
+
+    def _select(self, where_sql: str, params: List[Any], include_embeddings: bool = False) -> Dict[str, List[Any]]:
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT id, row, document, metadata FROM chunks WHERE {where_sql} ORDER BY row",
+                params
+            ).fetchall()
+            embeddings = None
+            if include_embeddings and rows and self._matrix is not None:
+                embeddings = np.asarray(self._matrix[[row for _, row, _, _ in rows]])
+
+        return {
+            "ids": [chunk_id for chunk_id, _, _, _ in rows],
+            "documents": [document for _, _, document, _ in rows],
+            "metadatas": [json.loads(metadata) for _, _, _, metadata in rows],
+            "embeddings": embeddings
+        }
+
+    def get_chunk_ids(self, document_ids):
+        ids = []
+        with self._lock:
+            for start in range(0, len(document_ids), 500):
+                batch = document_ids[start:start + 500]
+                placeholders = ",".join("?" * len(batch))
+                ids.extend(chunk_id for (chunk_id,) in self._conn.execute(
+                    f"SELECT id FROM chunks WHERE document_id IN ({placeholders})", batch
+                ))
+        return ids
+
+    def get_by_ids(self, ids, include_embeddings=False):
+        if not ids:
+            return {"ids": [], "documents": [], "metadatas": [], "embeddings": None}
+        merged = {"ids": [], "documents": [], "metadatas": [], "embeddings": []}
+        for start in range(0, len(ids), 500):
+            batch = ids[start:start + 500]
+            part = self._select(f"id IN ({','.join('?' * len(batch))})", batch, include_embeddings)
+            for key in ("ids", "documents", "metadatas"):
+                merged[key].extend(part[key])
+            if part["embeddings"] is not None:
+                merged["embeddings"].append(part["embeddings"])
+        merged["embeddings"] = np.concatenate(merged["embeddings"]) if merged["embeddings"] else None
+        return merged
+
+    def get_document(self, doc_id):
+        return self._select("document_id = ?", [doc_id])
+
+    def _delete_ids(self, ids: List[str]):
+        for start in range(0, len(ids), 500):
+            batch = ids[start:start + 500]
+            placeholders = ",".join("?" * len(batch))
+            rows = [r for (r,) in self._conn.execute(f"SELECT row FROM chunks WHERE id IN ({placeholders})", batch)]
+            if rows:
+                self._live[np.asarray(rows, dtype=np.int64)] = False
+                self._conn.execute(f"DELETE FROM chunks WHERE id IN ({placeholders})", batch)
+
+    def delete_document(self, doc_id):
+        with self._lock:
+            ids = [chunk_id for (chunk_id,) in self._conn.execute(
+                "SELECT id FROM chunks WHERE document_id = ?", (doc_id,)
+            )]
+            self._delete_ids(ids)
+            self._conn.commit()
+
+            if self._rows and self._live.sum() < self._rows // 2:
+                self.compact()
+        return ids
+
+    def delete(self, ids):
+        with self._lock:
+            self._delete_ids(ids)
+            self._conn.commit()
+
+            if self._rows and self._live.sum() < self._rows // 2:
+                self.compact()
+
+    def update_metadata(self, ids, metadatas):
+        with self._lock:
+            self._conn.executemany(
+                "UPDATE chunks SET document_id = ?, metadata = ? WHERE id = ?",
+                [
+                    (metadata.get("document_id"), json.dumps(metadata), chunk_id)
+                    for chunk_id, metadata in zip(ids, metadatas)
+                ]
+            )
+            self._conn.commit()
+
+    def compact(self):
+        """Rewrite the vectors file without deleted rows"""
+        with self._lock:
+            if self._matrix is None:
+                return
+            live_rows = np.flatnonzero(self._live)
+            generation = self.generation + 1
+            new_file = self._vectors_path(generation)
+            with open(new_file, 'wb') as f:
+                for start in range(0, len(live_rows), self.block_size):
+                    f.write(np.asarray(self._matrix[live_rows[start:start + self.block_size]]).tobytes())
+                f.flush()
+                os.fsync(f.fileno())
+
+            # The new file is complete on disk before any row points into it
+            self._conn.executemany(
+                "UPDATE chunks SET row = ? WHERE row = ?",
+                # Negative rows first so the UNIQUE constraint never sees a collision
+                [(-(new_row + 1), int(old_row)) for new_row, old_row in enumerate(live_rows)]
+            )
+            self._conn.execute("UPDATE chunks SET row = -row - 1")
+            self._conn.execute(
+                "INSERT OR REPLACE INTO store_info (key, value) VALUES ('generation', ?)", (str(generation),)
+            )
+            self._conn.commit()
+
+            self._matrix = None
+            old_file, self.vectors_file, self.generation = self.vectors_file, new_file, generation
+            old_file.unlink(missing_ok=True)
+            self._open_matrix()
+            self._live = np.ones(self._rows, dtype=bool)
+
+    def count(self):
+        with self._lock:
+            return int(self._conn.execute("SELECT COUNT(*) FROM chunks").fetchone()[0])
+
+    def iter_embeddings(self, page_size=5000):
+        last_row = -1
+        while True:
+            with self._lock:
+                rows = self._conn.execute(
+                    "SELECT id, row FROM chunks WHERE row > ? ORDER BY row LIMIT ?",
+                    (last_row, page_size)
+                ).fetchall()
+                if not rows:
+                    return
+                embeddings = np.asarray(self._matrix[[row for _, row in rows]])
+            last_row = rows[-1][1]
+            yield [chunk_id for chunk_id, _ in rows], embeddings
+
+    def iter_ids(self, page_size=50000):
+        last_row = -1
+        while True:
+            with self._lock:
+                rows = self._conn.execute(
+                    "SELECT id, row FROM chunks WHERE row > ? ORDER BY row LIMIT ?",
+                    (last_row, page_size)
+                ).fetchall()
+            if not rows:
+                return
+            last_row = rows[-1][1]
+            yield [chunk_id for chunk_id, _ in rows]
+
+    def close(self):
+        with self._lock:
+            self._matrix = None
+            self._conn.close()
+
+
+def create_vector_store(backend: str = config.VECTOR_STORE) -> VectorStore:
+    """Create the vector store selected in config"""
+    if backend == "chroma":
+        return ChromaVectorStore()
+    if backend == "mmap":
+        return MmapVectorStore()
+    raise ValueError(f"Unknown vector store backend: {backend}. Supported: chroma, mmap")
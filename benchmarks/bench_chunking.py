@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+"""
+Benchmark for the document chunkers.
+Chunks a document with the character chunker (CHUNK_SIZE/CHUNK_OVERLAP)
+and the token chunker, and reports throughput in MB/s plus embedding
+coverage: the fraction of the document's characters that fall inside the
+part of some chunk the embedding model actually sees (chunk tokens past
+the model's max sequence length are truncated by the encoder).
+
+Run from the repository root:
+    python -m benchmarks.bench_chunking --size-mb 5
+    python -m benchmarks.bench_chunking --file path/to/document.txt
+"""
+
+import argparse
+import random
+import time
+
+from sentence_transformers import SentenceTransformer
+
+from backend import config
+from backend.services.chunking import StreamingChunker, TokenChunker
+
+WORDS = (
+    "the agreement shall terminate upon written notice by either party liability indemnification "
+    "payment invoice warranty confidential information supplier customer obligations pursuant "
+    "section clause schedule amendment governing law jurisdiction force majeure"
+).split()
+
+
+def make_text(size_bytes: int, seed: int = 0) -> str:
+    """Synthetic prose with sentences and paragraphs of varying length"""
+    rng = random.Random(seed)
+    parts = []
+    size = 0
+    while size < size_bytes:
+        sentence = " ".join(rng.choice(WORDS) for _ in range(rng.randint(5, 40))).capitalize() + rng.choice(".!?")
+        if rng.random() < 0.02:
+            # Identifiers that tokenize into many word-pieces
+            sentence += f" Ref {rng.randint(10 ** 8, 10 ** 9)}-{rng.choice(WORDS).upper()}/{rng.randint(1, 999)}."
+        parts.append(sentence)
+        parts.append("\n\n" if rng.random() < 0.1 else " ")
+        size += len(sentence) + 1
+    return "".join(parts)
+
+
+def run_chunker(chunker, text: str, piece_size: int = 1024 * 1024):
+    """Feed the text in pieces, as the ingestion pipeline does"""
+    chunks = []
+    for start in range(0, len(text), piece_size):
+        chunks.extend(chunker.feed(text[start:start + piece_size]))
+    chunks.extend(chunker.finish())
+    return chunks
+
+
+def coverage(text: str, chunks, tokenizer, max_tokens: int) -> float:
+    """Fraction of the text's non-space characters the encoder sees"""
+    covered = bytearray(len(text))
+    position = 0
+    for chunk in chunks:
+        found = text.find(chunk, max(0, position - len(chunk)))
+        if found < 0:
+            found = text.find(chunk)
+        if found < 0:
+            continue
+        position = found + len(chunk)
+
+        offsets = tokenizer(chunk, add_special_tokens=False, return_offsets_mapping=True, verbose=False)["offset_mapping"]
+        seen = offsets[min(len(offsets), max_tokens) - 1][1] if offsets else 0
+        covered[found:found + seen] = b"\x01" * seen
+
+    content = [i for i, char in enumerate(text) if not char.isspace()]
+    return sum(covered[i] for i in content) / len(content) if content else 1.0
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--size-mb", type=float, default=5.0)
+    parser.add_argument("--file", help="Chunk this UTF-8 text file instead of synthetic text")
+    args = parser.parse_args()
+
+    if args.file:
+        with open(args.file, "r", encoding="utf-8") as f:
+            text = f.read()
+    else:
+        text = make_text(int(args.size_mb * 1024 * 1024))
+    size_mb = len(text.encode("utf-8")) / (1024 * 1024)
+
+    model = SentenceTransformer(config.EMBEDDING_MODEL)
+    token_chunker = TokenChunker.from_model(model)
+    # What the encoder keeps of each chunk
+    encoder_tokens = model.max_seq_length - model.tokenizer.num_special_tokens_to_add(pair=False)
+    print(f"{size_mb:.1f} MB of text, model limit {encoder_tokens} tokens, "
+          f"token chunks of up to {token_chunker.max_tokens} tokens\n")
+
+    print(f"{'chunker':>12} {'MB/s':>8} {'chunks':>8} {'avg chars':>10} {'coverage':>9}")
+    for name, chunker in (
+        ("characters", StreamingChunker(config.CHUNK_SIZE, config.CHUNK_OVERLAP)),
+        ("tokens", token_chunker),
+    ):
+        start = time.perf_counter()
+        chunks = run_chunker(chunker, text)
+        seconds = time.perf_counter() - start
+
+        avg_chars = sum(len(chunk) for chunk in chunks) / len(chunks) if chunks else 0
+        covered = coverage(text, chunks, model.tokenizer, encoder_tokens)
+        print(f"{name:>12} {size_mb / seconds:>8.2f} {len(chunks):>8} {avg_chars:>10.0f} {covered:>8.1%}")
+
+
+if __name__ == "__main__":
+    main()
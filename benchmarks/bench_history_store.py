@@ -0,0 +1,113 @@
+#!/usr/bin/env python3
+"""
+Benchmark for the chat history stores.
+Fills a fresh store with S sessions of M messages (default 100k x 100, last
+activity spread over the past 100 days), then reports tail-read and append
+latency for random sessions, paginated session listing at the start and deep
+into the list, and deleting the sessions idle for more than 90 days.
+
+Run from the repository root:
+    python -m benchmarks.bench_history_store --backend sqlite
+    python -m benchmarks.bench_history_store --backend jsonl --sessions 10000
+"""
+
+import argparse
+import os
+import random
+import shutil
+import tempfile
+import time
+import uuid
+from datetime import datetime, timedelta
+from pathlib import Path
+
+from backend import config
+from backend.models.chat_model import ChatMessage, MessageRole
+from backend.services.history_store import JsonlHistoryStore, SqliteHistoryStore
+
+SAMPLES = 1000
+
+
+def percentile(values, pct):
+    """Nearest-rank percentile"""
+    ordered = sorted(values)
+    index = max(0, min(len(ordered) - 1, int(round(pct / 100 * len(ordered))) - 1))
+    return ordered[index]
+
+
+def make_messages(session_id: str, count: int, last_activity: datetime):
+    roles = [MessageRole.USER, MessageRole.ASSISTANT]
+    return [
+        ChatMessage(
+            id=str(uuid.uuid4()),
+            role=roles[i % 2],
+            content=f"Message {i} of {session_id}: what does the contract say about termination notice?" * 2,
+            timestamp=last_activity - timedelta(seconds=count - i),
+            session_id=session_id
+        )
+        for i in range(count)
+    ]
+
+
+def create_store(backend: str, directory: Path):
+    if backend == "sqlite":
+        return SqliteHistoryStore(directory / "history.db", fsync_policy="never", history_dir=None)
+    return JsonlHistoryStore(directory, fsync_policy="never")
+
+
+def timed(fn, *args):
+    start = time.perf_counter()
+    result = fn(*args)
+    return result, time.perf_counter() - start
+
+
+def report(name, latencies):
+    print(f"{name:<28} p50 {percentile(latencies, 50) * 1000:>8.3f}ms   p99 {percentile(latencies, 99) * 1000:>8.3f}ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--backend", choices=["sqlite", "jsonl"], default=config.HISTORY_BACKEND)
+    parser.add_argument("--sessions", type=int, default=100_000)
+    parser.add_argument("--messages", type=int, default=100)
+    parser.add_argument("--dir", type=Path, default=None, help="where to build the store (default: a temp dir)")
+    args = parser.parse_args()
+
+    directory = args.dir or Path(tempfile.mkdtemp(prefix="history_bench_"))
+    directory.mkdir(parents=True, exist_ok=True)
+    store = create_store(args.backend, directory)
+    now = datetime.now()
+    session_ids = [f"session-{i:07d}" for i in range(args.sessions)]
+
+    print(f"Filling {args.backend} store in {directory}: {args.sessions} sessions x {args.messages} messages")
+    start = time.perf_counter()
+    for i, session_id in enumerate(session_ids):
+        last_activity = now - timedelta(days=100 * i / args.sessions)
+        store.append(session_id, make_messages(session_id, args.messages, last_activity))
+        if args.backend == "jsonl":
+            # The JSONL store uses file modification time as last activity
+            os.utime(directory / f"{session_id}.jsonl", (last_activity.timestamp(), last_activity.timestamp()))
+    elapsed = time.perf_counter() - start
+    total = args.sessions * args.messages
+    print(f"Filled in {elapsed:.1f}s ({total / elapsed:,.0f} messages/s)\n")
+
+    sample = random.sample(session_ids, min(SAMPLES, len(session_ids)))
+    report("read last 10 messages", [timed(store.read, session_id, config.MAX_HISTORY_MESSAGES)[1] for session_id in sample])
+    report("read whole session", [timed(store.read, session_id)[1] for session_id in sample[:100]])
+    turn = lambda session_id: make_messages(session_id, 2, datetime.now())
+    report("append a turn", [timed(store.append, session_id, turn(session_id))[1] for session_id in sample])
+
+    for offset in (0, args.sessions // 2):
+        (count, page), elapsed = timed(store.list_session_summaries, offset, 100)
+        print(f"{'list 100 at offset ' + str(offset):<28} {elapsed * 1000:>12.3f}ms   ({count} sessions)")
+
+    deleted, elapsed = timed(store.delete_sessions_before, now - timedelta(days=90))
+    print(f"{'delete idle > 90 days':<28} {elapsed * 1000:>12.3f}ms   ({deleted} sessions)")
+
+    store.close()
+    if args.dir is None:
+        shutil.rmtree(directory)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+"""
+Benchmark for the async LLM client.
+Starts a mock OpenAI-compatible server and sends it N concurrent completions
+through ChatService, which should take about as long as one completion (not
+N times as long). Compares time to first token with and
+without streaming, then points the client at a failing server and shows the
+circuit breaker cutting off calls.
+
+Run from the repository root:
+    python -m benchmarks.bench_llm_client --delay 0.5
+"""
+
+import argparse
+import asyncio
+import time
+
+from backend import config
+from backend.services.chat_service import ChatService
+from benchmarks.mock_llm_server import start_server
+
+CONCURRENCY_LEVELS = [1, 8, 32, 64]
+
+MESSAGES = [
+    {"role": "system", "content": "You are a helpful assistant."},
+    {"role": "user", "content": "Summarize the termination clause."}
+]
+
+
+async def run_concurrent(chat_service: ChatService, concurrency: int) -> float:
+    start = time.perf_counter()
+    await asyncio.gather(*(chat_service._complete(MESSAGES) for _ in range(concurrency)))
+    return time.perf_counter() - start
+
+
+async def run_streaming(chat_service: ChatService):
+    """Stream one completion; returns (time to first token, total seconds)"""
+    start = time.perf_counter()
+    first_token = None
+    async for _ in chat_service._stream_completion(MESSAGES):
+        if first_token is None:
+            first_token = time.perf_counter() - start
+    return first_token, time.perf_counter() - start
+
+
+async def run_failing(chat_service: ChatService, calls: int):
+    """Send sequential calls to a failing upstream; returns (upstream calls, fallbacks, seconds)"""
+    start = time.perf_counter()
+    fallbacks = 0
+    for _ in range(calls):
+        try:
+            await chat_service._complete(MESSAGES)
+        except Exception:
+            fallbacks += 1
+    return chat_service.get_stats()["calls"], fallbacks, time.perf_counter() - start
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--delay", type=float, default=0.5, help="mock server time to first token in seconds")
+    parser.add_argument("--failing-calls", type=int, default=50)
+    args = parser.parse_args()
+
+    server = start_server(delay=args.delay)
+    config.GROK_BASE_URL = f"http://127.0.0.1:{server.server_port}/v1"
+    chat_service = ChatService()
+
+    blocking = await run_concurrent(chat_service, 1)
+    print(f"{'concurrent':>10} {'wall s':>10} {'x single':>10}")
+    for concurrency in CONCURRENCY_LEVELS:
+        elapsed = await run_concurrent(chat_service, concurrency)
+        print(f"{concurrency:>10} {elapsed:>10.2f} {elapsed / blocking:>10.2f}")
+    first_token, total = await run_streaming(chat_service)
+    print(f"\nFirst token: {blocking * 1000:.0f}ms without streaming, {first_token * 1000:.0f}ms streaming "
+          f"(stream total {total * 1000:.0f}ms)")
+    print(f"\nClient stats: {chat_service.get_stats()}")
+    await chat_service.close()
+    server.shutdown()
+
+    failing = start_server(delay=args.delay / 10, fail_rate=1.0)
+    config.GROK_BASE_URL = f"http://127.0.0.1:{failing.server_port}/v1"
+    chat_service = ChatService()
+    upstream, fallbacks, elapsed = await run_failing(chat_service, args.failing_calls)
+    print(f"\nFailing upstream: {args.failing_calls} calls, {upstream} reached the server, "
+          f"{fallbacks} fell back, {elapsed:.2f}s")
+    print(f"Breaker: {chat_service.circuit_breaker.get_stats()}")
+    await chat_service.close()
+    failing.shutdown()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+"""
+Benchmark for page-parallel PDF extraction.
+Generates a synthetic multi-page text PDF and streams it through the live
+extraction path serially and through the process pool, checks both produce
+the same text and reports pages/s. The service logs per-page timings for
+each run.
+
+Run from the repository root:
+    python -m benchmarks.bench_pdf_extraction --pages 500
+"""
+
+import argparse
+import asyncio
+import tempfile
+import time
+from pathlib import Path
+
+from backend import config
+from backend.services.document_service import DocumentService
+
+LINES_PER_PAGE = 45
+
+
+def make_pdf(path: Path, pages: int, seed_text: str = "Section {page}.{line}: synthetic report text for extraction benchmarks"):
+    """Write a plain PDF with `pages` pages of Helvetica text lines"""
+    objects = [
+        b"<< /Type /Catalog /Pages 2 0 R >>",
+        None,  # page tree, filled in once the page object numbers are known
+        b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>",
+    ]
+    page_refs = []
+    for page in range(pages):
+        lines = [seed_text.format(page=page + 1, line=line + 1) for line in range(LINES_PER_PAGE)]
+        stream = "BT /F1 10 Tf 12 TL 50 760 Td " + " ".join(f"({line}) '" for line in lines) + " ET"
+        stream = stream.encode("latin-1")
+        objects.append(b"<< /Length %d >>\nstream\n%s\nendstream" % (len(stream), stream))
+        content_ref = len(objects)
+        objects.append(
+            b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] "
+            b"/Resources << /Font << /F1 3 0 R >> >> /Contents %d 0 R >>" % content_ref
+        )
+        page_refs.append(len(objects))
+    objects[1] = b"<< /Type /Pages /Kids [%s] /Count %d >>" % (
+        b" ".join(b"%d 0 R" % ref for ref in page_refs), pages
+    )
+
+    out = bytearray(b"%PDF-1.4\n")
+    offsets = []
+    for number, body in enumerate(objects, start=1):
+        offsets.append(len(out))
+        out += b"%d 0 obj\n%s\nendobj\n" % (number, body)
+    xref_offset = len(out)
+    out += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1)
+    out += b"".join(b"%010d 00000 n \n" % offset for offset in offsets)
+    out += b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objects) + 1, xref_offset)
+    path.write_bytes(bytes(out))
+
+
+async def extract(service: DocumentService, pdf_path: Path, parallel: bool):
+    """Page texts from the same streaming extractor ingestion uses"""
+    return [text async for text in service._iter_pdf_text(pdf_path, parallel=parallel)]
+
+
+async def run(args):
+    service = DocumentService()
+    with tempfile.TemporaryDirectory() as tmp:
+        pdf_path = Path(tmp) / "synthetic.pdf"
+        make_pdf(pdf_path, args.pages)
+        print(f"Synthetic PDF: {args.pages} pages, {pdf_path.stat().st_size / 1024:.0f} KB, "
+              f"{config.PDF_EXTRACT_WORKERS} workers, {config.PDF_PAGES_PER_TASK} pages/task\n")
+
+        results = {}
+        try:
+            for mode, parallel in (("serial", False), ("parallel", True)):
+                if parallel:
+                    # Start the pool outside the timed run
+                    await extract(service, pdf_path, parallel=True)
+                start = time.perf_counter()
+                pages = await extract(service, pdf_path, parallel=parallel)
+                results[mode] = (time.perf_counter() - start, pages)
+        finally:
+            service.close()
+
+    assert results["serial"][1] == results["parallel"][1], "parallel extraction changed the text"
+
+    print(f"\n{'mode':>10} {'seconds':>10} {'pages/s':>10}")
+    for mode, (seconds, pages) in results.items():
+        print(f"{mode:>10} {seconds:>10.2f} {len(pages) / seconds:>10.1f}")
+    print(f"\nSpeedup: {results['serial'][0] / results['parallel'][0]:.1f}x")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--pages", type=int, default=500)
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
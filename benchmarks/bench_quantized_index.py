@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+"""
+Benchmark for quantized embedding storage.
+Builds a synthetic corpus of clustered 384-dim vectors (MiniLM's size) and
+compares an exact float32 scan against int8 and float16 scans followed by
+float32 re-scoring. Reports index memory, query latency and recall@k.
+
+Run from the repository root:
+    python -m benchmarks.bench_quantized_index --chunks 1000000
+"""
+
+import argparse
+import tempfile
+import time
+
+import numpy as np
+
+from backend.services.quantized_index import QuantizedVectorIndex, normalize_rows
+
+
+def make_corpus(n: int, dim: int, clusters: int, seed: int = 0) -> np.ndarray:
+    """Clustered unit vectors, closer to real embeddings than uniform noise"""
+    rng = np.random.default_rng(seed)
+    centers = normalize_rows(rng.standard_normal((clusters, dim)).astype(np.float32))
+    corpus = np.empty((n, dim), dtype=np.float32)
+    for start in range(0, n, 100_000):
+        end = min(start + 100_000, n)
+        assignment = rng.integers(0, clusters, end - start)
+        noise = rng.standard_normal((end - start, dim)).astype(np.float32) * 0.6 / np.sqrt(dim)
+        corpus[start:end] = normalize_rows(centers[assignment] + noise)
+    return corpus
+
+
+def exact_top_k(corpus: np.ndarray, query: np.ndarray, k: int) -> np.ndarray:
+    scores = corpus @ query
+    top = np.argpartition(-scores, k)[:k]
+    return top[np.argsort(-scores[top])]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--chunks", type=int, default=1_000_000)
+    parser.add_argument("--dim", type=int, default=384)
+    parser.add_argument("--queries", type=int, default=100)
+    parser.add_argument("--top-k", type=int, default=10)
+    parser.add_argument("--rescore-factors", type=int, nargs="+", default=[1, 4, 10])
+    args = parser.parse_args()
+
+    print(f"Building {args.chunks} x {args.dim} synthetic corpus...")
+    corpus = make_corpus(args.chunks, args.dim, clusters=max(16, args.chunks // 1000))
+    rng = np.random.default_rng(1)
+    query_rows = rng.integers(0, args.chunks, args.queries)
+    queries = normalize_rows(corpus[query_rows] + rng.standard_normal((args.queries, args.dim)).astype(np.float32) * 0.02)
+    ids = [str(i) for i in range(args.chunks)]
+
+    truth = []
+    start = time.perf_counter()
+    for query in queries:
+        truth.append(set(exact_top_k(corpus, query, args.top_k).tolist()))
+    exact_ms = (time.perf_counter() - start) / args.queries * 1000
+
+    print(f"\n{'storage':>10} {'rescore':>8} {'index MB':>10} {'ms/query':>10} {'recall@k':>10}")
+    print(f"{'float32':>10} {'-':>8} {corpus.nbytes / 2**20:>10.1f} {exact_ms:>10.2f} {1.0:>10.3f}")
+
+    with tempfile.TemporaryDirectory() as index_dir:
+        for dtype in ("float16", "int8"):
+            index = QuantizedVectorIndex(dtype, index_dir=index_dir)
+            for offset in range(0, args.chunks, 100_000):
+                index.add(ids[offset:offset + 100_000], corpus[offset:offset + 100_000])
+            # Reload so the arrays are sized as at startup, without growth headroom
+            index.save()
+            index.load()
+            index_mb = index.get_stats()["bytes"] / 2**20
+
+            for factor in args.rescore_factors:
+                hits = 0
+                start = time.perf_counter()
+                for query, expected in zip(queries, truth):
+                    candidates = index.search(query, n_candidates=args.top_k * factor)
+                    rows = np.array([int(chunk_id) for chunk_id, _ in candidates])
+                    # Re-score candidates with the exact float32 vectors
+                    exact = corpus[rows] @ query
+                    found = rows[np.argsort(-exact)[:args.top_k]]
+                    hits += len(expected.intersection(found.tolist()))
+                elapsed_ms = (time.perf_counter() - start) / args.queries * 1000
+                recall = hits / (args.queries * args.top_k)
+                print(f"{dtype:>10} {factor:>7}x {index_mb:>10.1f} {elapsed_ms:>10.2f} {recall:>10.3f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+"""
+Benchmark for query micro-batching.
+Compares one encode call per query against the QueryBatcher at several
+client concurrencies and reports throughput and p99 latency.
+
+Run from the repository root:
+    python -m benchmarks.bench_query_batcher
+"""
+
+import argparse
+import asyncio
+import statistics
+import time
+
+from sentence_transformers import SentenceTransformer
+
+from backend import config
+from backend.services.encoder_pool import EncoderPool
+from backend.services.query_batcher import QueryBatcher
+
+CONCURRENCY_LEVELS = [1, 8, 32, 128]
+
+
+def make_queries(count: int):
+    """Generate distinct, realistic-length queries"""
+    return [
+        f"What does clause {i} of the service agreement say about termination notice period {i % 17}?"
+        for i in range(count)
+    ]
+
+
+def percentile(values, pct):
+    """Nearest-rank percentile"""
+    ordered = sorted(values)
+    index = max(0, min(len(ordered) - 1, int(round(pct / 100 * len(ordered))) - 1))
+    return ordered[index]
+
+
+async def run_clients(encode, queries, concurrency):
+    """Run `concurrency` clients that each encode their share of the queries"""
+    latencies = []
+    queue = asyncio.Queue()
+    for query in queries:
+        queue.put_nowait(query)
+
+    async def client():
+        while True:
+            try:
+                query = queue.get_nowait()
+            except asyncio.QueueEmpty:
+                return
+            start = time.perf_counter()
+            await encode(query)
+            latencies.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(client() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - start
+    return len(queries) / elapsed, percentile(latencies, 99) * 1000, statistics.mean(latencies) * 1000
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--queries", type=int, default=1024, help="queries per run")
+    parser.add_argument("--window-ms", type=float, default=config.QUERY_BATCH_WINDOW_MS)
+    parser.add_argument("--max-batch", type=int, default=config.QUERY_BATCH_MAX_SIZE)
+    args = parser.parse_args()
+
+    model = SentenceTransformer(config.EMBEDDING_MODEL)
+    pool = EncoderPool(model)
+    batcher = QueryBatcher(pool, window_ms=args.window_ms, max_batch_size=args.max_batch)
+    queries = make_queries(args.queries)
+
+    async def unbatched(query):
+        return await pool.encode([query])
+
+    # Warm up the model and the executor threads
+    await pool.encode(queries[:32])
+
+    print(f"{'clients':>8} {'mode':>10} {'q/s':>10} {'p99 ms':>10} {'mean ms':>10}")
+    for concurrency in CONCURRENCY_LEVELS:
+        for name, encode in [("single", unbatched), ("batched", batcher.encode)]:
+            qps, p99, mean = await run_clients(encode, queries, concurrency)
+            print(f"{concurrency:>8} {name:>10} {qps:>10.1f} {p99:>10.2f} {mean:>10.2f}")
+
+    print(f"\nBatcher stats: {batcher.get_stats()}")
+    pool.shutdown()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,55 @@
+#!/usr/bin/env python3
+"""
+Benchmark for the batch search API.
+Sends N retrieval queries to a running backend, first as N sequential
+/search calls and then as a single /search/batch call, and reports
+throughput for both.
+
+Start the backend, upload some documents, then run from the repository root:
+    python -m benchmarks.bench_search_batch --queries 1000
+"""
+
+import argparse
+import time
+
+import requests
+
+API_BASE_URL = "http://localhost:8000"
+
+
+def make_queries(count: int):
+    topics = ["termination", "liability", "payment terms", "warranty", "confidentiality", "renewal"]
+    return [f"What does the contract say about {topics[i % len(topics)]} (case {i})?" for i in range(count)]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--queries", type=int, default=1000)
+    parser.add_argument("--top-k", type=int, default=5)
+    parser.add_argument("--url", default=API_BASE_URL)
+    args = parser.parse_args()
+
+    queries = make_queries(args.queries)
+    session = requests.Session()
+
+    start = time.perf_counter()
+    for query in queries:
+        response = session.post(f"{args.url}/search", json={"query": query, "top_k": args.top_k})
+        response.raise_for_status()
+    sequential = time.perf_counter() - start
+
+    # Different query text, so the query-embedding cache doesn't favour the batch run
+    batch_queries = [f"{query} (batch)" for query in queries]
+    start = time.perf_counter()
+    response = session.post(f"{args.url}/search/batch", json={"queries": batch_queries, "top_k": args.top_k})
+    response.raise_for_status()
+    batched = time.perf_counter() - start
+
+    print(f"{'mode':>12} {'seconds':>10} {'queries/s':>12}")
+    print(f"{'sequential':>12} {sequential:>10.2f} {args.queries / sequential:>12.1f}")
+    print(f"{'batch':>12} {batched:>10.2f} {args.queries / batched:>12.1f}")
+    print(f"\nSpeedup: {sequential / batched:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,76 @@
+#!/usr/bin/env python3
+"""
+Benchmark for vector store backends.
+Loads the same synthetic corpus into the ChromaDB store and the
+memory-mapped NumPy store, then compares ingest time, single-query latency
+and recall@k against exact search.
+
+Run from the repository root:
+    python -m benchmarks.bench_vector_store --chunks 10000 100000 1000000
+"""
+
+import argparse
+import tempfile
+import time
+
+import numpy as np
+
+from backend.services.quantized_index import normalize_rows
+from backend.services.vector_store import ChromaVectorStore, MmapVectorStore
+from benchmarks.bench_quantized_index import make_corpus, exact_top_k
+
+
+def load(store, corpus: np.ndarray, batch_size: int = 5000) -> float:
+    """Add the corpus in batches and return the elapsed time"""
+    start = time.perf_counter()
+    for offset in range(0, len(corpus), batch_size):
+        end = min(offset + batch_size, len(corpus))
+        ids = [str(i) for i in range(offset, end)]
+        store.add(
+            ids,
+            corpus[offset:end],
+            [f"chunk {i}" for i in range(offset, end)],
+            [{"document_id": f"doc{i // 100}", "chunk_index": i % 100} for i in range(offset, end)]
+        )
+    return time.perf_counter() - start
+
+
+def measure(store, queries: np.ndarray, truth, top_k: int):
+    """Return (p50 ms, p99 ms, recall@k) for single-query searches"""
+    latencies = []
+    hits = 0
+    for query, expected in zip(queries, truth):
+        start = time.perf_counter()
+        results = store.query([query], top_k)
+        latencies.append((time.perf_counter() - start) * 1000)
+        hits += len(expected.intersection(int(chunk_id) for chunk_id in results["ids"][0]))
+    return np.percentile(latencies, 50), np.percentile(latencies, 99), hits / (len(queries) * top_k)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--chunks", type=int, nargs="+", default=[10_000, 100_000, 1_000_000])
+    parser.add_argument("--dim", type=int, default=384)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--top-k", type=int, default=10)
+    args = parser.parse_args()
+
+    print(f"{'chunks':>9} {'backend':>8} {'ingest s':>10} {'p50 ms':>8} {'p99 ms':>8} {'recall@k':>9}")
+    for n in args.chunks:
+        corpus = make_corpus(n, args.dim, clusters=max(16, n // 1000))
+        rng = np.random.default_rng(1)
+        rows = rng.integers(0, n, args.queries)
+        queries = normalize_rows(corpus[rows] + rng.standard_normal((args.queries, args.dim)).astype(np.float32) * 0.02)
+        truth = [set(exact_top_k(corpus, query, args.top_k).tolist()) for query in queries]
+
+        for name, factory in [("chroma", ChromaVectorStore), ("mmap", MmapVectorStore)]:
+            with tempfile.TemporaryDirectory() as path:
+                store = factory(path)
+                ingest = load(store, corpus)
+                p50, p99, recall = measure(store, queries, truth, args.top_k)
+                store.close()
+            print(f"{n:>9} {name:>8} {ingest:>10.1f} {p50:>8.2f} {p99:>8.2f} {recall:>9.3f}")
+
+
+if __name__ == "__main__":
+    main()
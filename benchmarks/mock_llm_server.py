@@ -0,0 +1,163 @@
+#!/usr/bin/env python3
+"""
+Mock OpenAI-compatible chat completions server.
+Answers POST /v1/chat/completions like a model that takes --delay seconds to
+the first token and --token-delay seconds per further token, optionally
+failing a fraction of requests with --fail-status (503 by default), so the
+chat client's concurrency, timeouts, circuit breaker and streaming can be
+exercised without calling Grok. Streaming requests get one server-sent
+event per word.
+
+Run from the repository root:
+    python -m benchmarks.mock_llm_server --port 8100 --delay 1.0
+and point the backend at it:
+    GROK_BASE_URL=http://localhost:8100/v1 python start_app.py
+"""
+
+import argparse
+import json
+import random
+import sys
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+REPLY = "This is a mock completion. " * 8
+
+
+class MockLLMServer(ThreadingHTTPServer):
+    daemon_threads = True
+    # Room for bursts of concurrent connections
+    request_queue_size = 1024
+
+    def handle_error(self, request, client_address):
+        # Clients that time out or stop reading a stream are expected here
+        if not isinstance(sys.exc_info()[1], ConnectionError):
+            super().handle_error(request, client_address)
+
+
+class MockLLMHandler(BaseHTTPRequestHandler):
+    delay = 1.0
+    token_delay = 0.02
+    fail_rate = 0.0
+    fail_status = 503
+
+    def do_POST(self):
+        if self.path.rstrip("/") != "/v1/chat/completions":
+            self.send_error(404)
+            return
+
+        body = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+        time.sleep(self.delay)
+
+        if random.random() < self.fail_rate:
+            self._send_json(self.fail_status, {"error": {"message": "mock upstream failure", "type": "mock_error"}})
+            return
+
+        if body.get("stream"):
+            self._stream(body)
+            return
+
+        # Generate the whole answer before responding
+        time.sleep(self.token_delay * (len(REPLY.split()) - 1))
+        prompt_tokens = sum(len(message.get("content", "").split()) for message in body.get("messages", []))
+        completion_tokens = len(REPLY.split())
+        self._send_json(200, {
+            "id": f"chatcmpl-{uuid.uuid4().hex}",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": body.get("model", "mock"),
+            "choices": [{
+                "index": 0,
+                "message": {"role": "assistant", "content": REPLY.strip()},
+                "finish_reason": "stop"
+            }],
+            "usage": {
+                "prompt_tokens": prompt_tokens,
+                "completion_tokens": completion_tokens,
+                "total_tokens": prompt_tokens + completion_tokens
+            }
+        })
+
+    def _stream(self, body):
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Cache-Control", "no-cache")
+        self.end_headers()
+
+        completion_id = f"chatcmpl-{uuid.uuid4().hex}"
+        words = REPLY.split()
+        for i, word in enumerate(words):
+            if i:
+                time.sleep(self.token_delay)
+            self._send_event({
+                "id": completion_id,
+                "object": "chat.completion.chunk",
+                "created": int(time.time()),
+                "model": body.get("model", "mock"),
+                "choices": [{"index": 0, "delta": {"content": word if i == 0 else f" {word}"}, "finish_reason": None}]
+            })
+        self._send_event({
+            "id": completion_id,
+            "object": "chat.completion.chunk",
+            "created": int(time.time()),
+            "model": body.get("model", "mock"),
+            "choices": [{"index": 0, "delta": {}, "finish_reason": "stop"}]
+        })
+        self.wfile.write(b"data: [DONE]\n\n")
+        self.wfile.flush()
+
+    def _send_event(self, payload):
+        self.wfile.write(f"data: {json.dumps(payload)}\n\n".encode("utf-8"))
+        self.wfile.flush()
+
+    def _send_json(self, status: int, payload):
+        data = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def start_server(
+    port: int = 0,
+    delay: float = 1.0,
+    fail_rate: float = 0.0,
+    token_delay: float = 0.02,
+    fail_status: int = 503
+) -> MockLLMServer:
+    """Serve in a background thread; port 0 picks a free port (see server.server_port)"""
+    handler = type(
+        "Handler",
+        (MockLLMHandler,),
+        {"delay": delay, "fail_rate": fail_rate, "token_delay": token_delay, "fail_status": fail_status}
+    )
+    server = MockLLMServer(("127.0.0.1", port), handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--port", type=int, default=8100)
+    parser.add_argument("--delay", type=float, default=1.0, help="seconds to the first token")
+    parser.add_argument("--token-delay", type=float, default=0.02, help="seconds between streamed tokens")
+    parser.add_argument("--fail-rate", type=float, default=0.0, help="fraction of requests answered with an error")
+    parser.add_argument("--fail-status", type=int, default=503, help="HTTP status of failed requests")
+    args = parser.parse_args()
+
+    server = start_server(args.port, args.delay, args.fail_rate, args.token_delay, args.fail_status)
+    print(f"Mock LLM server on http://127.0.0.1:{server.server_port}/v1 (delay {args.delay}s, fail rate {args.fail_rate})")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,69 @@
+import tempfile
+import unittest
+from pathlib import Path
+
+from backend.services.bm25_index import BM25Index, reciprocal_rank_fusion, tokenize
+
+
+class BM25IndexTest(unittest.TestCase):
+    def setUp(self):
+        workdir = tempfile.TemporaryDirectory()
+        self.addCleanup(workdir.cleanup)
+        self.db_path = Path(workdir.name) / "bm25.db"
+        self.index = self.open_index()
+        self.index.add(
+            ["a_0", "a_1", "b_0", "b_1"],
+            [
+                "the termination notice period is thirty days",
+                "the invoice lists part ZX-900/B",
+                "the warranty covers the pump",
+                "the notice must be given in writing",
+            ],
+            ["a", "a", "b", "b"]
+        )
+
+    def open_index(self) -> BM25Index:
+        index = BM25Index(self.db_path)
+        self.addCleanup(index.close)
+        return index
+
+    def ids(self, hits):
+        return [chunk_id for chunk_id, _ in hits]
+
+    def test_tokenize_indexes_compound_identifiers_by_their_parts(self):
+        self.assertEqual(tokenize("Part ZX-900/B"), ["part", "zx-900/b", "zx", "900", "b"])
+
+    def test_rarer_terms_rank_higher(self):
+        self.assertEqual(self.ids(self.index.search("termination notice", 4)), ["a_0", "b_1"])
+        self.assertEqual(self.ids(self.index.search("zx-900", 4)), ["a_1"])
+
+    def test_ubiquitous_terms_are_skipped_unless_alone(self):
+        # "the" is in every chunk: it adds nothing next to "pump"
+        self.assertEqual(self.ids(self.index.search("the pump", 4)), ["b_0"])
+        self.assertEqual(len(self.index.search("the", 4)), 4)
+
+    def test_batch_matches_single_searches(self):
+        queries = ["notice", "the pump", "warranty invoice", "unknown"]
+        self.assertEqual(self.index.search_batch(queries, 3), [self.index.search(q, 3) for q in queries])
+
+    def test_document_filter(self):
+        self.assertEqual(self.ids(self.index.search("notice", 4, ["b"])), ["b_1"])
+        self.assertEqual(self.index.search("notice", 4, []), [])
+
+    def test_delete_updates_document_frequencies(self):
+        self.index.delete_document("a")
+        reopened = self.open_index()
+        self.assertEqual(len(reopened), 2)
+        self.assertEqual(self.ids(reopened.search("notice", 4)), ["b_1"])
+        self.assertEqual(
+            reopened._conn.execute("SELECT df FROM terms WHERE term = 'the'").fetchone()[0], 2
+        )
+        self.assertIsNone(reopened._conn.execute("SELECT df FROM terms WHERE term = 'invoice'").fetchone())
+
+    def test_reciprocal_rank_fusion(self):
+        fused = reciprocal_rank_fusion([["x", "y"], ["y", "z"]])
+        self.assertEqual([chunk_id for chunk_id, _ in fused], ["y", "x", "z"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,114 @@
+import asyncio
+import os
+import tempfile
+import unittest
+from pathlib import Path
+
+import numpy as np
+
+from backend.services.bulk_ingest_service import BulkIngestService
+from backend.services.document_service import DocumentService
+from backend.services.ingestion_queue import IngestionQueue
+
+
+class LinePipeline:
+    """One chunk per line of the stored file"""
+
+    async def chunk_document(self, file_path, parallel=None):
+        return Path(file_path).read_text().splitlines()
+
+
+class FakeEmbeddingService:
+    """In-memory index; encoding a chunk containing "bad" fails.
+
+    An index write can be held until ``release`` is set, to line writes up
+    with failures of the same document.
+    """
+
+    def __init__(self):
+        self.index = {}
+        self.release = asyncio.Event()
+        self.release.set()
+
+    async def embed_chunks(self, texts):
+        # Let earlier batches reach the index stage, as a real encode would
+        for _ in range(5):
+            await asyncio.sleep(0)
+        if any("bad" in text for text in texts):
+            self.release.set()
+            raise RuntimeError("encoder failed")
+        return np.ones((len(texts), 4), dtype=np.float32)
+
+    async def index_chunk_batch(self, entries, embeddings):
+        await self.release.wait()
+        for doc_id, _, i, text in entries:
+            self.index[f"{doc_id}_{i}"] = (doc_id, text)
+
+    async def delete_document_embeddings(self, doc_id):
+        self.index = {key: value for key, value in self.index.items() if value[0] != doc_id}
+
+
+class BulkIngestServiceTest(unittest.IsolatedAsyncioTestCase):
+    def setUp(self):
+        # Documents and metadata are stored under data/ relative to the working directory
+        cwd = os.getcwd()
+        workdir = tempfile.TemporaryDirectory()
+        os.chdir(workdir.name)
+        self.addCleanup(workdir.cleanup)
+        self.addCleanup(os.chdir, cwd)
+        self.source_dir = Path(workdir.name) / "import"
+        self.source_dir.mkdir()
+
+    async def asyncSetUp(self):
+        self.documents = DocumentService()
+        self.embeddings = FakeEmbeddingService()
+        self.queue = IngestionQueue(processor=None, db_path=Path("data/jobs.db"))
+        self.addCleanup(self.queue.close)
+        self.service = BulkIngestService(
+            self.documents,
+            self.embeddings,
+            LinePipeline(),
+            self.queue,
+            extract_concurrency=1,
+            encode_batch_size=2,
+            index_batch_size=2
+        )
+
+    def write_files(self, files):
+        for name, lines in files.items():
+            (self.source_dir / name).write_text("\n".join(lines))
+        sources, _ = self.service.open_source(self.source_dir)
+        return sources
+
+    async def test_failed_document_leaves_nothing_behind(self):
+        # a.txt's first batch is being written when its second batch fails to encode
+        sources = self.write_files({"a.txt": ["a0", "a1", "bad", "a3"], "b.txt": ["b0", "b1"]})
+        self.embeddings.release.clear()
+
+        report = await self.service.ingest(sources)
+
+        self.assertEqual(report["status"], "completed")
+        self.assertEqual(report["files_failed"], 1)
+        self.assertEqual(report["files_processed"], 1)
+        self.assertEqual(sorted(text for _, text in self.embeddings.index.values()), ["b0", "b1"])
+        self.assertEqual([m["filename"] for m in self.documents.metadata.values()], ["b.txt"])
+        self.assertEqual(self.queue.get_stats()["jobs"], {"completed": 1, "failed": 1})
+
+    async def test_background_job_failure_is_recorded_not_raised(self):
+        sources = self.write_files({"a.txt": ["a0"]})
+
+        def broken_mark_processed(doc_id, chunk_count, index_generation=None):
+            raise RuntimeError("metadata write failed")
+
+        self.documents.mark_processed = broken_mark_processed
+        report = self.service.start(sources, lambda: None)
+        task = self.service._tasks[report["id"]]
+        await task
+
+        self.assertIsNone(task.exception())
+        self.assertEqual(report["status"], "failed")
+        self.assertEqual(report["errors"][-1]["error"], "metadata write failed")
+
+
+if __name__ == "__main__":
+    unittest.main()
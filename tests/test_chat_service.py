@@ -0,0 +1,112 @@
+import asyncio
+import os
+import tempfile
+import time
+import unittest
+from unittest import mock
+
+from openai import BadRequestError
+
+from backend import config
+from backend.services.chat_service import ChatService
+from backend.services.circuit_breaker import CircuitBreaker, CircuitOpenError
+from benchmarks.mock_llm_server import start_server
+
+MESSAGES = [{"role": "user", "content": "What is the notice period?"}]
+
+
+class ChatServiceLLMTest(unittest.IsolatedAsyncioTestCase):
+    """LLM calls against the mock server in benchmarks/mock_llm_server.py"""
+
+    def setUp(self):
+        # Chat history is written under data/ relative to the working directory
+        cwd = os.getcwd()
+        workdir = tempfile.TemporaryDirectory()
+        os.chdir(workdir.name)
+        self.addCleanup(workdir.cleanup)
+        self.addCleanup(os.chdir, cwd)
+
+    async def asyncSetUp(self):
+        self.server = None
+        self.service = None
+
+    async def asyncTearDown(self):
+        if self.service is not None:
+            await self.service.close()
+        if self.server is not None:
+            self.server.shutdown()
+            self.server.server_close()
+
+    def start(self, **server_options):
+        self.server = start_server(0, **server_options)
+        overrides = {
+            "GROK_BASE_URL": f"http://127.0.0.1:{self.server.server_port}/v1",
+            "GROK_API_KEY": "test",
+            "LLM_MAX_RETRIES": 0
+        }
+        for name, value in overrides.items():
+            patcher = mock.patch.object(config, name, value)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        self.service = ChatService()
+        self.service.circuit_breaker = CircuitBreaker(failure_threshold=3, reset_timeout=60)
+
+    async def test_completion_succeeds(self):
+        self.start(delay=0, token_delay=0)
+        response = await self.service._complete(MESSAGES)
+        self.assertTrue(response.choices[0].message.content)
+        self.assertEqual(self.service.circuit_breaker.get_stats()["consecutive_failures"], 0)
+
+    async def test_deadline_bounds_a_slow_completion(self):
+        self.start(delay=2.0, token_delay=0)
+        with mock.patch.object(config, "LLM_DEADLINE_SECONDS", 0.3):
+            start = time.perf_counter()
+            with self.assertRaises(TimeoutError):
+                await self.service._complete(MESSAGES)
+        self.assertLess(time.perf_counter() - start, 1.5)
+        self.assertEqual(self.service.circuit_breaker.get_stats()["consecutive_failures"], 1)
+
+    async def test_deadline_bounds_a_slow_stream(self):
+        self.start(delay=0, token_delay=0.5)
+        tokens = []
+        with mock.patch.object(config, "LLM_DEADLINE_SECONDS", 0.3):
+            start = time.perf_counter()
+            with self.assertRaises(TimeoutError):
+                async for token in self.service._stream_completion(MESSAGES):
+                    tokens.append(token)
+        self.assertLess(time.perf_counter() - start, 1.5)
+        self.assertEqual(len(tokens), 1)
+        self.assertEqual(self.service.circuit_breaker.get_stats()["consecutive_failures"], 1)
+
+    async def test_client_errors_leave_the_breaker_closed(self):
+        self.start(delay=0, fail_rate=1.0, fail_status=400)
+        for _ in range(5):
+            with self.assertRaises(BadRequestError):
+                await self.service._complete(MESSAGES)
+        stats = self.service.get_stats()
+        self.assertEqual(stats["client_errors"], 5)
+        self.assertEqual(stats["circuit_breaker"]["state"], CircuitBreaker.CLOSED)
+
+    async def test_server_errors_open_the_breaker(self):
+        self.start(delay=0, fail_rate=1.0, fail_status=503)
+        for _ in range(3):
+            with self.assertRaises(Exception):
+                await self.service._complete(MESSAGES)
+        self.assertEqual(self.service.circuit_breaker.state, CircuitBreaker.OPEN)
+        with self.assertRaises(CircuitOpenError):
+            await self.service._complete(MESSAGES)
+
+    async def test_abandoned_stream_releases_the_trial(self):
+        self.start(delay=0, token_delay=0.01)
+        breaker = self.service.circuit_breaker = CircuitBreaker(failure_threshold=1, reset_timeout=0)
+        breaker.record_failure(breaker.allow_request())
+        self.assertEqual(breaker.state, CircuitBreaker.HALF_OPEN)
+
+        stream = self.service._stream_completion(MESSAGES)
+        await stream.__anext__()
+        await stream.aclose()
+        self.assertIsNotNone(breaker.allow_request())
+
+
+if __name__ == "__main__":
+    unittest.main()
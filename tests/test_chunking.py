@@ -0,0 +1,54 @@
+import re
+import unittest
+
+from backend.services.chunking import TokenChunker
+
+
+class FakeTokenizer:
+    """Splits on whitespace, then into tokens of at most four characters"""
+
+    def __init__(self):
+        self.calls = 0
+        self.characters = 0
+
+    def __call__(self, text, add_special_tokens=False, return_offsets_mapping=True, verbose=False):
+        self.calls += 1
+        self.characters += len(text)
+        return {"offset_mapping": [match.span() for match in re.finditer(r"\S{1,4}", text)]}
+
+
+class TokenChunkerTest(unittest.TestCase):
+    def chunk(self, chunker, pieces):
+        chunks = []
+        for piece in pieces:
+            chunks.extend(chunker.feed(piece))
+        chunks.extend(chunker.finish())
+        return chunks
+
+    def test_chunks_fit_the_token_budget(self):
+        tokenizer = FakeTokenizer()
+        chunker = TokenChunker(tokenizer, max_tokens=50, overlap_tokens=5, window_chars=1000)
+        text = " ".join(f"Sentence number {i} ends here." for i in range(500))
+        chunks = self.chunk(chunker, [text[i:i + 300] for i in range(0, len(text), 300)])
+
+        self.assertGreater(len(chunks), 1)
+        for chunk in chunks:
+            self.assertLessEqual(len(tokenizer(chunk)["offset_mapping"]), 50)
+        self.assertTrue(chunks[0].startswith("Sentence number 0 "))
+        self.assertTrue(chunks[-1].endswith("Sentence number 499 ends here."))
+
+    def test_text_without_whitespace_is_cut_at_token_boundaries(self):
+        tokenizer = FakeTokenizer()
+        chunker = TokenChunker(tokenizer, max_tokens=50, overlap_tokens=0, window_chars=1000)
+        pieces = ["abcdefgh" * 125] * 200
+        chunks = self.chunk(chunker, pieces)
+
+        self.assertEqual("".join(chunks), "".join(pieces))
+        self.assertTrue(all(len(chunk) <= 200 for chunk in chunks))
+        # The buffer stays around one window instead of growing with the document
+        self.assertLess(len(chunker._buffer), 1000)
+        self.assertLess(tokenizer.characters, 3 * len("".join(pieces)))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,86 @@
+import unittest
+from unittest import mock
+
+from backend.services.circuit_breaker import CircuitBreaker
+
+
+class CircuitBreakerTest(unittest.TestCase):
+    def setUp(self):
+        self.now = 1000.0
+        patcher = mock.patch("backend.services.circuit_breaker.time.monotonic", lambda: self.now)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.breaker = CircuitBreaker(failure_threshold=3, reset_timeout=30)
+
+    def open_breaker(self):
+        for _ in range(3):
+            self.breaker.record_failure(self.breaker.allow_request())
+        self.assertEqual(self.breaker.state, CircuitBreaker.OPEN)
+
+    def test_opens_after_consecutive_failures(self):
+        for _ in range(2):
+            self.breaker.record_failure(self.breaker.allow_request())
+        self.assertEqual(self.breaker.state, CircuitBreaker.CLOSED)
+        self.breaker.record_failure(self.breaker.allow_request())
+        self.assertEqual(self.breaker.state, CircuitBreaker.OPEN)
+        self.assertIsNone(self.breaker.allow_request())
+        self.assertEqual(self.breaker.get_stats()["rejected"], 1)
+
+    def test_success_resets_the_failure_count(self):
+        for _ in range(2):
+            self.breaker.record_failure(self.breaker.allow_request())
+        self.breaker.record_success(self.breaker.allow_request())
+        for _ in range(2):
+            self.breaker.record_failure(self.breaker.allow_request())
+        self.assertEqual(self.breaker.state, CircuitBreaker.CLOSED)
+
+    def test_half_open_admits_a_single_trial(self):
+        self.open_breaker()
+        self.now += 30
+        self.assertEqual(self.breaker.state, CircuitBreaker.HALF_OPEN)
+        trial = self.breaker.allow_request()
+        self.assertIsNotNone(trial)
+        self.assertIsNone(self.breaker.allow_request())
+
+        self.breaker.record_success(trial)
+        self.assertEqual(self.breaker.state, CircuitBreaker.CLOSED)
+        self.assertIsNotNone(self.breaker.allow_request())
+
+    def test_failed_trial_reopens(self):
+        self.open_breaker()
+        self.now += 30
+        self.breaker.record_failure(self.breaker.allow_request())
+        self.assertEqual(self.breaker.state, CircuitBreaker.OPEN)
+        self.now += 29
+        self.assertIsNone(self.breaker.allow_request())
+
+    def test_released_trial_frees_the_slot(self):
+        self.open_breaker()
+        self.now += 30
+        self.breaker.release(self.breaker.allow_request())
+        self.assertEqual(self.breaker.state, CircuitBreaker.HALF_OPEN)
+        self.assertIsNotNone(self.breaker.allow_request())
+
+    def test_late_failure_does_not_free_the_trial_slot(self):
+        # A slow call admitted while closed fails only after the trial started
+        slow_call = self.breaker.allow_request()
+        self.open_breaker()
+        self.now += 30
+        trial = self.breaker.allow_request()
+        self.breaker.record_failure(slow_call)
+
+        self.assertEqual(self.breaker.state, CircuitBreaker.HALF_OPEN)
+        self.assertIsNone(self.breaker.allow_request())
+        self.breaker.record_success(trial)
+        self.assertEqual(self.breaker.state, CircuitBreaker.CLOSED)
+
+    def test_late_success_does_not_close_an_open_breaker(self):
+        slow_call = self.breaker.allow_request()
+        self.open_breaker()
+        self.breaker.record_success(slow_call)
+        self.assertEqual(self.breaker.state, CircuitBreaker.OPEN)
+        self.assertEqual(self.breaker.get_stats()["stale_outcomes"], 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,94 @@
+import hashlib
+import io
+import os
+import tempfile
+import unittest
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from unittest import mock
+
+from backend import config
+from backend.services.document_service import DocumentService, DuplicateDocumentError, FileTooLargeError
+
+
+class DocumentServiceTest(unittest.IsolatedAsyncioTestCase):
+    def setUp(self):
+        # Documents and metadata are stored under data/ relative to the working directory
+        cwd = os.getcwd()
+        workdir = tempfile.TemporaryDirectory()
+        os.chdir(workdir.name)
+        self.addCleanup(workdir.cleanup)
+        self.addCleanup(os.chdir, cwd)
+
+        self.service = DocumentService()
+        self.addCleanup(self.service.close)
+
+    async def save(self, content: bytes, filename: str = "notes.txt", doc_id: str = "doc") -> str:
+        return await self.service.save_document_from_stream(io.BytesIO(content), filename, doc_id)
+
+    def stored_files(self):
+        return sorted(path.name for path in self.service.document_dir.iterdir())
+
+    async def test_upload_is_streamed_and_hashed(self):
+        content = os.urandom(3 * 1024 + 17)
+        with mock.patch.object(config, "UPLOAD_BLOCK_SIZE", 1024):
+            file_path = await self.save(content)
+
+        self.assertEqual(Path(file_path).read_bytes(), content)
+        metadata = self.service.metadata["doc"]
+        self.assertEqual(metadata["file_size"], len(content))
+        self.assertEqual(metadata["content_hash"], hashlib.sha256(content).hexdigest())
+        self.assertEqual(self.stored_files(), ["doc.txt"])
+
+    async def test_oversized_upload_leaves_nothing_behind(self):
+        with mock.patch.object(config, "MAX_FILE_SIZE", 2048), mock.patch.object(config, "UPLOAD_BLOCK_SIZE", 1024):
+            with self.assertRaises(FileTooLargeError):
+                await self.save(b"x" * 4096)
+
+        self.assertEqual(self.stored_files(), [])
+        self.assertNotIn("doc", self.service.metadata)
+
+    async def test_duplicate_upload_references_the_original(self):
+        original_path = await self.save(b"same bytes", "a.txt", "a")
+        duplicate_path = await self.save(b"same bytes", "b.txt", "b")
+
+        self.assertEqual(duplicate_path, original_path)
+        self.assertEqual(self.stored_files(), ["a.txt"])
+        self.assertEqual(self.service.get_canonical_id("b"), "a")
+        # The shared file outlives the original while the duplicate references it
+        self.assertEqual(await self.service.delete_document("a"), [])
+        self.assertTrue(Path(original_path).exists())
+        self.assertEqual(await self.service.delete_document("b"), ["a"])
+        self.assertEqual(self.stored_files(), [])
+        self.assertEqual(self.service.metadata, {})
+
+    async def test_duplicate_upload_rejected_by_policy(self):
+        await self.save(b"same bytes", "a.txt", "a")
+        with mock.patch.object(config, "DUPLICATE_UPLOAD_POLICY", "reject"):
+            with self.assertRaises(DuplicateDocumentError) as raised:
+                await self.save(b"same bytes", "b.txt", "b")
+
+        self.assertEqual(raised.exception.existing_id, "a")
+        self.assertEqual(self.stored_files(), ["a.txt"])
+        self.assertNotIn("b", self.service.metadata)
+
+    async def test_filters_resolve_to_canonical_documents(self):
+        await self.save(b"report", "Report.txt", "a")
+        await self.save(b"report", "copy.txt", "b")
+        await self.save(b"notes", "notes.txt", "c")
+        self.service.metadata["c"]["upload_date"] = (datetime.now() - timedelta(days=10)).isoformat()
+
+        self.assertIsNone(self.service.resolve_filters())
+        self.assertEqual(self.service.resolve_filters(filename="report.TXT"), ["a"])
+        # A duplicate is searched through the document holding its embeddings
+        self.assertEqual(self.service.resolve_filters(document_ids=["b"]), ["a"])
+        self.assertEqual(self.service.resolve_filters(filename="missing.txt"), [])
+
+        # Timezone-aware bounds compare with the naive local upload dates
+        cutoff = datetime.now(timezone.utc) - timedelta(days=1)
+        self.assertEqual(self.service.resolve_filters(uploaded_after=cutoff), ["a"])
+        self.assertEqual(self.service.resolve_filters(uploaded_before=cutoff), ["c"])
+
+
+if __name__ == "__main__":
+    unittest.main()
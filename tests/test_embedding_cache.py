@@ -0,0 +1,85 @@
+import tempfile
+import time
+import unittest
+from pathlib import Path
+
+import numpy as np
+
+from backend.services.embedding_cache import ChunkEmbeddingCache, QueryEmbeddingCache
+
+
+class QueryEmbeddingCacheTest(unittest.TestCase):
+    def setUp(self):
+        workdir = tempfile.TemporaryDirectory()
+        self.addCleanup(workdir.cleanup)
+        self.cache_file = Path(workdir.name) / "query_cache.npz"
+
+    def test_normalized_queries_share_an_entry(self):
+        cache = QueryEmbeddingCache("model", max_size=10, ttl_seconds=0, cache_file=None)
+        cache.put("What is  the notice period?", np.ones(4))
+        np.testing.assert_array_equal(cache.get("  what is the NOTICE period? "), np.ones(4))
+        self.assertIsNone(cache.get("what is the notice period"))
+
+    def test_least_recently_used_entry_is_evicted(self):
+        cache = QueryEmbeddingCache("model", max_size=2, ttl_seconds=0, cache_file=None)
+        cache.put("a", np.zeros(4))
+        cache.put("b", np.zeros(4))
+        cache.get("a")
+        cache.put("c", np.zeros(4))
+
+        self.assertIsNone(cache.get("b"))
+        self.assertIsNotNone(cache.get("a"))
+        self.assertEqual(cache.get_stats()["evictions"], 1)
+
+    def test_expired_entries_are_misses(self):
+        cache = QueryEmbeddingCache("model", max_size=10, ttl_seconds=60, cache_file=None)
+        cache.put("old", np.zeros(4), created_at=time.time() - 120)
+        cache.put("new", np.zeros(4))
+        self.assertIsNone(cache.get("old"))
+        self.assertIsNotNone(cache.get("new"))
+
+    def test_saved_entries_reload_for_the_same_model_only(self):
+        cache = QueryEmbeddingCache("model", max_size=10, ttl_seconds=60, cache_file=self.cache_file)
+        cache.put("kept", np.full(4, 2.0))
+        cache.put("expired", np.zeros(4), created_at=time.time() - 120)
+        cache.save()
+
+        reloaded = QueryEmbeddingCache("model", max_size=10, ttl_seconds=60, cache_file=self.cache_file)
+        np.testing.assert_array_equal(reloaded.get("kept"), np.full(4, 2.0))
+        self.assertEqual(reloaded.get_stats()["size"], 1)
+        other_model = QueryEmbeddingCache("other", max_size=10, ttl_seconds=60, cache_file=self.cache_file)
+        self.assertIsNone(other_model.get("kept"))
+
+
+class ChunkEmbeddingCacheTest(unittest.TestCase):
+    def setUp(self):
+        workdir = tempfile.TemporaryDirectory()
+        self.addCleanup(workdir.cleanup)
+        self.db_path = Path(workdir.name) / "chunk_cache.db"
+
+    def open_cache(self, model_name="model") -> ChunkEmbeddingCache:
+        cache = ChunkEmbeddingCache(model_name, self.db_path)
+        self.addCleanup(cache.close)
+        return cache
+
+    def test_hits_are_keyed_by_content_and_model(self):
+        cache = self.open_cache()
+        cache.put_many(["alpha", "beta"], np.arange(8, dtype=np.float32).reshape(2, 4))
+
+        # Repeated and reordered chunks hit; unseen text misses
+        hits = self.open_cache().get_many(["beta", "gamma", "alpha", "beta"])
+        self.assertEqual(sorted(hits), [0, 2, 3])
+        np.testing.assert_array_equal(hits[2], [0, 1, 2, 3])
+        np.testing.assert_array_equal(hits[3], [4, 5, 6, 7])
+        self.assertEqual(self.open_cache("other").get_many(["alpha"]), {})
+
+    def test_lookups_span_many_parameter_batches(self):
+        cache = self.open_cache()
+        texts = [f"chunk {i}" for i in range(1200)]
+        cache.put_many(texts, np.ones((1200, 4), dtype=np.float32))
+        self.assertEqual(len(cache.get_many(texts)), 1200)
+        self.assertEqual(cache.get_stats()["hits"], 1200)
+
+
+if __name__ == "__main__":
+    unittest.main()
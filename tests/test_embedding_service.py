@@ -0,0 +1,202 @@
+import os
+import tempfile
+import unittest
+from pathlib import Path
+from unittest import mock
+
+import numpy as np
+
+from backend import config
+from backend.services.bm25_index import BM25Index
+from backend.services.embedding_service import EmbeddingService
+from backend.services.quantized_index import QuantizedVectorIndex
+from backend.services.vector_store import MmapVectorStore
+
+DIM = 16
+
+
+def add_chunks(store: MmapVectorStore, document_id: str, count: int, seed: int):
+    ids = [f"{document_id}_{i}" for i in range(count)]
+    embeddings = np.random.default_rng(seed).normal(size=(count, DIM)).astype(np.float32)
+    store.add(ids, embeddings, [f"{document_id} chunk {i}" for i in range(count)], [{"document_id": document_id}] * count)
+    return ids, embeddings
+
+
+class IndexSyncTest(unittest.TestCase):
+    """Rebuilding the derived indexes when they no longer match the vector store"""
+
+    def setUp(self):
+        # The service's caches live under data/ relative to the working directory
+        cwd = os.getcwd()
+        workdir = tempfile.TemporaryDirectory()
+        os.chdir(workdir.name)
+        self.addCleanup(workdir.cleanup)
+        self.addCleanup(os.chdir, cwd)
+        self.path = Path(workdir.name)
+
+        self.service = EmbeddingService()
+        self.service.vector_store = MmapVectorStore(self.path / "store")
+        self.addCleanup(self.service.vector_store.close)
+
+    def test_bm25_index_rebuilt_after_id_drift(self):
+        store = self.service.vector_store
+        add_chunks(store, "a", 3, seed=1)
+        self.service.bm25_index = bm25 = BM25Index(self.path / "bm25.db")
+        self.addCleanup(bm25.close)
+        self.service._sync_bm25_index()
+        self.assertEqual(len(bm25), 3)
+
+        # Same count, different chunks: as after a crash between the two writes
+        store.delete(["a_2"])
+        add_chunks(store, "b", 1, seed=2)
+        self.service._sync_bm25_index()
+
+        self.assertEqual(sorted(chunk_id for page in bm25.iter_ids() for chunk_id in page), ["a_0", "a_1", "b_0"])
+        self.assertEqual([chunk_id for chunk_id, _ in bm25.search("b chunk", 1)], ["b_0"])
+
+    def test_quantized_index_rebuilt_after_id_drift(self):
+        store = self.service.vector_store
+        ids, _ = add_chunks(store, "a", 3, seed=1)
+        self.service.quantized_index = index = QuantizedVectorIndex("int8", self.path / "quantized")
+        self.service._sync_quantized_index()
+        self.assertEqual(len(index), 3)
+
+        store.delete(["a_2"])
+        _, embeddings = add_chunks(store, "b", 1, seed=2)
+        self.service._sync_quantized_index()
+
+        self.assertEqual(len(index), 3)
+        self.assertEqual([chunk_id for chunk_id, _ in index.search(embeddings[0], 1)], ["b_0"])
+
+
+class QuantizedSearchTest(unittest.TestCase):
+    def setUp(self):
+        cwd = os.getcwd()
+        workdir = tempfile.TemporaryDirectory()
+        os.chdir(workdir.name)
+        self.addCleanup(workdir.cleanup)
+        self.addCleanup(os.chdir, cwd)
+        path = Path(workdir.name)
+
+        self.service = EmbeddingService()
+        self.service.vector_store = store = MmapVectorStore(path / "store")
+        self.addCleanup(store.close)
+        _, self.embeddings = add_chunks(store, "a", 40, seed=1)
+        add_chunks(store, "b", 40, seed=2)
+        self.service.quantized_index = QuantizedVectorIndex("int8", path / "quantized")
+        self.service._sync_quantized_index()
+
+    def count_calls(self, name):
+        calls = []
+        method = getattr(self.service.vector_store, name)
+
+        def counted(*args, **kwargs):
+            calls.append(args)
+            return method(*args, **kwargs)
+
+        setattr(self.service.vector_store, name, counted)
+        return calls
+
+    def test_batch_matches_single_queries_with_one_hydration(self):
+        queries = self.embeddings[:3] + 0.01
+        singles = [self.service._query_quantized(query, 5, ["a"]) for query in queries]
+        hydrations = self.count_calls("get_by_ids")
+        filters = self.count_calls("get_chunk_ids")
+
+        batch = self.service._query_quantized(queries, 5, ["a"])
+
+        self.assertEqual((len(hydrations), len(filters)), (1, 1))
+        for i, single in enumerate(singles):
+            self.assertEqual(batch["ids"][i], single["ids"][0])
+            self.assertEqual(batch["ids"][i][0], f"a_{i}")
+            np.testing.assert_allclose(batch["distances"][i], single["distances"][0], rtol=1e-5)
+
+
+class HashEncoder:
+    """Deterministic stand-in for the encoder pool"""
+
+    async def encode(self, texts, convert_to_tensor=False):
+        return np.stack([np.random.default_rng(sum(map(ord, text))).normal(size=DIM) for text in texts]).astype(np.float32)
+
+
+class UpdateDocumentChunksTest(unittest.IsolatedAsyncioTestCase):
+    def setUp(self):
+        cwd = os.getcwd()
+        workdir = tempfile.TemporaryDirectory()
+        os.chdir(workdir.name)
+        self.addCleanup(workdir.cleanup)
+        self.addCleanup(os.chdir, cwd)
+        path = Path(workdir.name)
+
+        self.service = EmbeddingService()
+        self.service.vector_store = MmapVectorStore(path / "store")
+        self.addCleanup(self.service.vector_store.close)
+        self.service.bm25_index = BM25Index(path / "bm25.db")
+        self.addCleanup(self.service.bm25_index.close)
+        self.service.encoder_pool = HashEncoder()
+        self.service.chunk_cache = None
+        self.service._ready = True
+
+        patcher = mock.patch.object(config, "INDEX_WRITE_BATCH_SIZE", 2)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def stored(self):
+        return sorted(self.service.vector_store.get_document("doc")["documents"])
+
+    async def test_new_chunks_are_written_in_batches(self):
+        await self.service.update_document_chunks(["one", "two", "three"], "doc", "doc.txt", 0)
+        batches = self.service._write_batches
+
+        result = await self.service.update_document_chunks(["one", "2", "3", "4", "5", "three"], "doc", "doc.txt", 1)
+
+        self.assertEqual(result, {"added": 4, "removed": 1, "unchanged": 2})
+        self.assertEqual(self.service._write_batches - batches, 2)
+        self.assertEqual(self.stored(), sorted(["one", "2", "3", "4", "5", "three"]))
+        self.assertEqual(len(self.service.bm25_index), 6)
+
+    async def test_unchanged_chunks_are_kept_and_repositioned(self):
+        await self.service.update_document_chunks(["one", "two", "three"], "doc", "doc.txt", 0)
+        before = dict(zip(*[self.service.vector_store.get_document("doc")[key] for key in ("documents", "ids")]))
+
+        result = await self.service.update_document_chunks(["zero", "one", "three"], "doc", "doc.txt", 1)
+
+        self.assertEqual(result, {"added": 1, "removed": 1, "unchanged": 2})
+        stored = self.service.vector_store.get_document("doc")
+        chunks = {text: (chunk_id, metadata["chunk_index"]) for text, chunk_id, metadata in zip(
+            stored["documents"], stored["ids"], stored["metadatas"]
+        )}
+        self.assertEqual(chunks["one"], (before["one"], 1))
+        self.assertEqual(chunks["three"], (before["three"], 2))
+        self.assertEqual(chunks["zero"], ("doc_r1_0", 0))
+
+    async def test_chunks_of_another_model_are_re_embedded(self):
+        await self.service.update_document_chunks(["one", "two"], "doc", "doc.txt", 0)
+        with mock.patch.object(config, "EMBEDDING_MODEL", "other-model"):
+            result = await self.service.update_document_chunks(["one", "two"], "doc", "doc.txt", 0, generation=1)
+
+        self.assertEqual(result, {"added": 2, "removed": 2, "unchanged": 0})
+        self.assertEqual(sorted(self.service.vector_store.get_document("doc")["ids"]), ["doc_r0g1_0", "doc_r0g1_1"])
+
+    async def test_failed_update_keeps_the_old_version(self):
+        await self.service.update_document_chunks(["one", "two"], "doc", "doc.txt", 0)
+        store = self.service.vector_store
+        add = store.add
+        calls = []
+
+        def failing_add(*args):
+            calls.append(args)
+            if len(calls) == 2:
+                raise OSError("disk full")
+            add(*args)
+
+        store.add = failing_add
+        with self.assertRaises(OSError):
+            await self.service.update_document_chunks(["1", "2", "3", "4"], "doc", "doc.txt", 1)
+
+        self.assertEqual(self.stored(), ["one", "two"])
+        self.assertEqual(len(self.service.bm25_index), 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,76 @@
+import tempfile
+import unittest
+from datetime import datetime
+from pathlib import Path
+
+from backend.models.chat_model import ChatMessage, MessageRole
+from backend.services.history_cache import HistoryCache
+from backend.services.history_store import JsonlHistoryStore
+
+
+class FlakyStore(JsonlHistoryStore):
+    """Fails appends to the sessions in ``failing``"""
+
+    def __init__(self, history_dir: Path):
+        super().__init__(history_dir, fsync_policy="never")
+        self.failing = set()
+
+    def append(self, session_id, messages):
+        if session_id in self.failing:
+            raise OSError("disk full")
+        super().append(session_id, messages)
+
+
+def message(session_id: str, content: str) -> ChatMessage:
+    return ChatMessage(
+        id=f"{session_id}-{content}",
+        role=MessageRole.USER,
+        content=content,
+        timestamp=datetime.now(),
+        session_id=session_id
+    )
+
+
+class HistoryCacheTest(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        workdir = tempfile.TemporaryDirectory()
+        self.addCleanup(workdir.cleanup)
+        self.store = FlakyStore(Path(workdir.name))
+        self.cache = HistoryCache(self.store, write_behind_seconds=60, flush_on_shutdown=False)
+
+    def contents(self, session_id):
+        return [m.content for m in self.store.read(session_id)]
+
+    async def test_failed_flush_does_not_duplicate_written_sessions(self):
+        for session_id in ("a", "b", "c"):
+            await self.cache.append(session_id, [message(session_id, "1")])
+        self.store.failing = {"b"}
+        with self.assertRaises(OSError):
+            await self.cache.flush()
+        self.assertEqual(self.cache.get_stats()["pending_messages"], 2)
+
+        await self.cache.append("b", [message("b", "2")])
+        self.store.failing = set()
+        await self.cache.flush()
+
+        self.assertEqual(self.contents("a"), ["1"])
+        self.assertEqual(self.contents("b"), ["1", "2"])
+        self.assertEqual(self.contents("c"), ["1"])
+        self.assertEqual(self.cache.get_stats()["pending_messages"], 0)
+
+    async def test_failed_flush_keeps_writes_after_an_applied_clear(self):
+        self.store.append("a", [message("a", "old")])
+        await self.cache.clear("a")
+        await self.cache.append("a", [message("a", "new")])
+        self.store.failing = {"a"}
+        with self.assertRaises(OSError):
+            await self.cache.flush()
+        self.assertEqual(self.contents("a"), [])
+
+        self.store.failing = set()
+        await self.cache.flush()
+        self.assertEqual(self.contents("a"), ["new"])
+
+
+if __name__ == "__main__":
+    unittest.main()
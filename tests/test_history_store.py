@@ -0,0 +1,77 @@
+import json
+import tempfile
+import unittest
+from datetime import datetime, timedelta
+from pathlib import Path
+
+from backend.models.chat_model import ChatMessage, MessageRole
+from backend.services.history_store import JsonlHistoryStore, SqliteHistoryStore
+
+
+def make_messages(session_id: str, count: int, start: int = 0):
+    now = datetime.now()
+    return [
+        ChatMessage(
+            id=f"{session_id}-{i}",
+            role=MessageRole.USER if i % 2 == 0 else MessageRole.ASSISTANT,
+            content=f"message {i}",
+            timestamp=now + timedelta(seconds=i),
+            session_id=session_id
+        )
+        for i in range(start, start + count)
+    ]
+
+
+class SqliteImportTest(unittest.TestCase):
+    def setUp(self):
+        workdir = tempfile.TemporaryDirectory()
+        self.addCleanup(workdir.cleanup)
+        self.history_dir = Path(workdir.name)
+        self.db_path = self.history_dir / "history.db"
+
+    def open_sqlite(self):
+        store = SqliteHistoryStore(self.db_path, fsync_policy="never", history_dir=self.history_dir)
+        self.addCleanup(store.close)
+        return store
+
+    def test_imports_jsonl_sessions(self):
+        jsonl = JsonlHistoryStore(self.history_dir, fsync_policy="never")
+        jsonl.append("a", make_messages("a", 4))
+        jsonl.append("b", make_messages("b", 2))
+        jsonl.clear("b")
+        jsonl.append("b", make_messages("b", 3, start=2))
+        jsonl.sync()
+
+        store = self.open_sqlite()
+        self.assertEqual([m.id for m in store.read("a")], [f"a-{i}" for i in range(4)])
+        self.assertEqual([m.id for m in store.read("b")], ["b-2", "b-3", "b-4"])
+        total, summaries = store.list_session_summaries()
+        self.assertEqual(total, 2)
+        self.assertEqual(sorted(s["message_count"] for s in summaries), [3, 4])
+        self.assertEqual(list(self.history_dir.glob("*.jsonl")), [])
+
+    def test_imports_old_json_files(self):
+        messages = [m.model_dump(mode="json") for m in make_messages("old", 2)]
+        (self.history_dir / "old.json").write_text(json.dumps({"session_id": "old", "messages": messages}))
+
+        store = self.open_sqlite()
+        self.assertEqual([m.content for m in store.read("old")], ["message 0", "message 1"])
+        self.assertFalse((self.history_dir / "old.json").exists())
+
+    def test_interrupted_import_does_not_duplicate(self):
+        jsonl = JsonlHistoryStore(self.history_dir, fsync_policy="never")
+        jsonl.append("a", make_messages("a", 3))
+        jsonl.sync()
+        backup = (self.history_dir / "a.jsonl").read_bytes()
+
+        SqliteHistoryStore(self.db_path, fsync_policy="never", history_dir=self.history_dir).close()
+        # As if the process died after the commit but before the file was removed
+        (self.history_dir / "a.jsonl").write_bytes(backup)
+
+        store = self.open_sqlite()
+        self.assertEqual(len(store.read("a")), 3)
+        self.assertEqual(store.list_session_summaries()[1][0]["message_count"], 3)
+
+
+if __name__ == "__main__":
+    unittest.main()
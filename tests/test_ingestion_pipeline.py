@@ -0,0 +1,87 @@
+import asyncio
+import os
+import tempfile
+import unittest
+from pathlib import Path
+from unittest import mock
+
+import numpy as np
+
+from backend.services.chunking import StreamingChunker
+from backend.services.document_service import DocumentService
+from backend.services.ingestion_pipeline import IngestionPipeline
+
+
+class RecordingEmbeddingService:
+    embedding_model = None
+
+    def __init__(self, fail_on_batch=None):
+        self.indexed = []
+        self.fail_on_batch = fail_on_batch
+        self.batches = 0
+
+    async def ensure_ready(self):
+        pass
+
+    async def embed_chunks(self, chunks):
+        self.batches += 1
+        if self.batches == self.fail_on_batch:
+            raise RuntimeError("encoder failed")
+        return np.zeros((len(chunks), 4), dtype=np.float32)
+
+    async def index_chunks(self, chunks, embeddings, doc_id, filename, start_index=0):
+        self.indexed.append((start_index, chunks))
+
+
+def character_chunker(model):
+    return StreamingChunker(chunk_size=100, overlap=10)
+
+
+class IngestionPipelineTest(unittest.IsolatedAsyncioTestCase):
+    def setUp(self):
+        # Documents are stored under data/ relative to the working directory
+        cwd = os.getcwd()
+        workdir = tempfile.TemporaryDirectory()
+        os.chdir(workdir.name)
+        self.addCleanup(workdir.cleanup)
+        self.addCleanup(os.chdir, cwd)
+
+        self.text = " ".join(f"Sentence {i} of the document." for i in range(400))
+        self.path = Path(workdir.name) / "doc.txt"
+        self.path.write_text(self.text)
+        self.documents = DocumentService()
+        self.addCleanup(self.documents.close)
+
+        patcher = mock.patch("backend.services.ingestion_pipeline.create_chunker", character_chunker)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def expected_chunks(self):
+        chunker = character_chunker(None)
+        return list(chunker.feed(self.text)) + list(chunker.finish())
+
+    async def test_chunks_are_indexed_in_order_and_in_batches(self):
+        embeddings = RecordingEmbeddingService()
+        pipeline = IngestionPipeline(self.documents, embeddings, batch_size=8, queue_size=1, write_queue_size=1)
+        stages = []
+
+        count = await pipeline.run("doc", str(self.path), "doc.txt", lambda stage, _: stages.append(stage))
+
+        expected = self.expected_chunks()
+        self.assertEqual(count, len(expected))
+        self.assertEqual([chunk for _, chunks in embeddings.indexed for chunk in chunks], expected)
+        self.assertEqual([start for start, _ in embeddings.indexed], list(range(0, len(expected), 8)))
+        self.assertEqual(stages[0], "extracting")
+        self.assertEqual(set(stages[1:]), {"indexing"})
+
+    async def test_a_failed_stage_stops_the_others(self):
+        embeddings = RecordingEmbeddingService(fail_on_batch=2)
+        pipeline = IngestionPipeline(self.documents, embeddings, batch_size=8, queue_size=1, write_queue_size=1)
+
+        with self.assertRaises(RuntimeError):
+            await asyncio.wait_for(pipeline.run("doc", str(self.path), "doc.txt"), timeout=10)
+        self.assertEqual([start for start, _ in embeddings.indexed], [0])
+
+
+if __name__ == "__main__":
+    unittest.main()
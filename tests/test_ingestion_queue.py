@@ -0,0 +1,104 @@
+import asyncio
+import sqlite3
+import tempfile
+import unittest
+from pathlib import Path
+
+from backend.services.ingestion_queue import IngestionQueue
+
+
+class IngestionQueueTest(unittest.IsolatedAsyncioTestCase):
+    def setUp(self):
+        workdir = tempfile.TemporaryDirectory()
+        self.addCleanup(workdir.cleanup)
+        self.db_path = Path(workdir.name) / "jobs.db"
+        self.processed = []
+
+    async def process(self, job, set_stage):
+        set_stage("extracting")
+        set_stage("indexing", {"chunks": 1})
+        self.processed.append(job["document_id"])
+
+    def open_queue(self, processor=None, **options) -> IngestionQueue:
+        queue = IngestionQueue(
+            processor or self.process,
+            db_path=self.db_path,
+            workers=1,
+            backoff_seconds=0,
+            poll_interval=0.01,
+            **options
+        )
+        self.addCleanup(queue.close)
+        return queue
+
+    async def wait_for(self, queue, job_id, status):
+        for _ in range(500):
+            job = queue.get_job(job_id)
+            if job["status"] == status:
+                return job
+            await asyncio.sleep(0.01)
+        self.fail(f"job {job_id} is {job['status']}, not {status}")
+
+    async def test_jobs_left_running_by_a_crash_are_resumed(self):
+        crashed = self.open_queue()
+        job_id = crashed.enqueue("doc", "data/documents/doc.pdf", "doc.pdf")
+        # A worker claimed the job, then the process died
+        self.assertEqual(crashed._claim_next()["id"], job_id)
+        crashed.set_stage(job_id, "indexing")
+        crashed.close()
+
+        queue = self.open_queue()
+        await queue.start()
+        self.addAsyncCleanup(queue.stop)
+        job = await self.wait_for(queue, job_id, "completed")
+
+        self.assertEqual(self.processed, ["doc"])
+        self.assertEqual(job["stage"], "done")
+        self.assertEqual(job["attempts"], 2)
+
+    async def test_failed_jobs_are_retried_then_cleaned_up(self):
+        failed = []
+
+        async def processor(job, set_stage):
+            raise RuntimeError("extraction failed")
+
+        async def on_failed(job):
+            failed.append(job["id"])
+
+        queue = self.open_queue(processor, on_failed=on_failed, max_attempts=2)
+        await queue.start()
+        self.addAsyncCleanup(queue.stop)
+        job_id = queue.enqueue("doc", "doc.pdf", "doc.pdf")
+        job = await self.wait_for(queue, job_id, "failed")
+
+        self.assertEqual(job["attempts"], 2)
+        self.assertEqual(job["error"], "extraction failed")
+        await asyncio.sleep(0.05)
+        self.assertEqual(failed, [job_id])
+
+    async def test_worker_survives_a_failed_status_write(self):
+        queue = self.open_queue()
+        finish = queue._finish
+        calls = []
+
+        def flaky_finish(job, error=None):
+            calls.append(job["id"])
+            if len(calls) == 1:
+                raise sqlite3.OperationalError("database is locked")
+            return finish(job, error)
+
+        queue._finish = flaky_finish
+        await queue.start()
+        self.addAsyncCleanup(queue.stop)
+        first = queue.enqueue("first", "first.pdf", "first.pdf")
+        second = queue.enqueue("second", "second.pdf", "second.pdf")
+        await self.wait_for(queue, second, "completed")
+
+        self.assertEqual(self.processed, ["first", "second"])
+        # The first job's outcome was lost; the next start resumes it
+        self.assertEqual(queue.get_job(first)["status"], "running")
+        self.assertFalse(any(task.done() for task in queue._tasks))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,80 @@
+import asyncio
+import os
+import random
+import string
+import tempfile
+import unittest
+from pathlib import Path
+
+import docx
+
+from backend.services.document_service import DocumentService
+from backend.services.text_cache import ExtractedTextCache
+
+
+class ExtractedTextCacheTest(unittest.TestCase):
+    def setUp(self):
+        workdir = tempfile.TemporaryDirectory()
+        self.addCleanup(workdir.cleanup)
+        self.cache = ExtractedTextCache(Path(workdir.name))
+
+    def test_concurrent_writers_use_separate_files(self):
+        first = self.cache.writer("ab" * 32, "v1")
+        second = self.cache.writer("ab" * 32, "v1")
+        self.assertNotEqual(first.tmp_path, second.tmp_path)
+        for writer in (first, second):
+            writer.write("page one")
+        first.write("page two")
+        second.write("page two")
+        first.commit()
+        second.commit()
+
+        self.assertEqual(list(self.cache.get("ab" * 32, "v1")), ["page one", "page two"])
+        self.assertEqual([p.name for p in self.cache.cache_dir.rglob("*.tmp")], [])
+
+    def test_aborted_writer_leaves_nothing(self):
+        writer = self.cache.writer("cd" * 32, "v1")
+        writer.write("partial")
+        writer.abort()
+        self.assertIsNone(self.cache.get("cd" * 32, "v1"))
+        self.assertEqual(list(self.cache.cache_dir.rglob("*.tmp")), [])
+
+
+class CachedExtractionTest(unittest.IsolatedAsyncioTestCase):
+    def setUp(self):
+        # Documents and the text cache live under data/ relative to the working directory
+        cwd = os.getcwd()
+        workdir = tempfile.TemporaryDirectory()
+        os.chdir(workdir.name)
+        self.addCleanup(workdir.cleanup)
+        self.addCleanup(os.chdir, cwd)
+
+        rng = random.Random(0)
+        document = docx.Document()
+        for _ in range(300):
+            document.add_paragraph("".join(rng.choice(string.ascii_letters + " ") for _ in range(200)))
+        self.path = Path(workdir.name) / "report.docx"
+        document.save(self.path)
+
+        self.service = DocumentService()
+        self.addCleanup(self.service.close)
+
+    async def extract(self):
+        return [text async for text in self.service.iter_text(str(self.path))]
+
+    async def test_corrupt_entry_falls_back_to_extraction(self):
+        expected = await self.extract()
+        self.assertEqual(self.service.text_cache.hits, 0)
+        (entry,) = self.service.text_cache.cache_dir.rglob("*.jsonl.gz")
+        data = entry.read_bytes()
+        entry.write_bytes(data[:len(data) // 2])
+
+        self.assertEqual(await self.extract(), expected)
+        self.assertEqual(self.service.text_cache.hits, 1)
+        # The entry was written again and is served from the cache next time
+        self.assertEqual(await self.extract(), expected)
+        self.assertEqual(self.service.text_cache.hits, 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,80 @@
+import tempfile
+import unittest
+from pathlib import Path
+
+import numpy as np
+
+from backend.services.vector_store import MmapVectorStore
+
+DIM = 8
+
+
+def vectors(count: int, seed: int) -> np.ndarray:
+    return np.random.default_rng(seed).normal(size=(count, DIM)).astype(np.float32)
+
+
+class MmapVectorStoreTest(unittest.TestCase):
+    def setUp(self):
+        workdir = tempfile.TemporaryDirectory()
+        self.addCleanup(workdir.cleanup)
+        self.path = Path(workdir.name)
+
+    def open_store(self) -> MmapVectorStore:
+        store = MmapVectorStore(self.path)
+        self.addCleanup(store.close)
+        return store
+
+    def add(self, store, prefix: str, embeddings: np.ndarray):
+        ids = [f"{prefix}_{i}" for i in range(len(embeddings))]
+        store.add(ids, embeddings, [f"text {chunk_id}" for chunk_id in ids], [{"document_id": prefix} for _ in ids])
+        return ids
+
+    def nearest(self, store, embedding) -> str:
+        return store.query([embedding], 1)["ids"][0][0]
+
+    def test_reopen_after_a_torn_append(self):
+        store = MmapVectorStore(self.path)
+        self.add(store, "a", vectors(3, seed=1))
+        store.close()
+        # An append cut off mid-row whose rows were never committed
+        with open(store.vectors_file, 'ab') as f:
+            f.write(b"\0" * (DIM * 4 + 10))
+
+        store = self.open_store()
+        self.assertEqual(store.count(), 3)
+        new = vectors(2, seed=2)
+        ids = self.add(store, "b", new)
+        self.assertEqual([self.nearest(store, embedding) for embedding in new], ids)
+        self.assertEqual(store.vectors_file.stat().st_size, 5 * DIM * 4)
+
+    def test_reopen_drops_rows_missing_from_the_file(self):
+        store = MmapVectorStore(self.path)
+        existing = vectors(4, seed=1)
+        ids = self.add(store, "a", existing)
+        store.close()
+        # Committed rows whose vectors never reached the disk
+        with open(store.vectors_file, 'r+b') as f:
+            f.truncate(2 * DIM * 4 + 5)
+
+        store = self.open_store()
+        self.assertEqual(store.count(), 2)
+        self.assertEqual(self.nearest(store, existing[1]), ids[1])
+        new = vectors(1, seed=3)
+        self.assertEqual(self.add(store, "b", new), [self.nearest(store, new[0])])
+
+    def test_reopen_after_compaction(self):
+        store = MmapVectorStore(self.path)
+        self.add(store, "a", vectors(6, seed=1))
+        kept = vectors(2, seed=2)
+        ids = self.add(store, "b", kept)
+        store.delete_document("a")
+        self.assertEqual(store.generation, 1)
+        store.close()
+
+        store = self.open_store()
+        self.assertEqual(sorted(p.name for p in self.path.glob("vectors*")), ["vectors.1.f32"])
+        self.assertEqual([self.nearest(store, embedding) for embedding in kept], ids)
+
+
+if __name__ == "__main__":
+    unittest.main()